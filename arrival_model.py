@@ -0,0 +1,230 @@
+"""
+Adaptive polling schedule driven by observed posting arrival rates
+Keeps a decaying hour-of-week histogram of new-posting arrivals and spaces
+checks so each one expects the same number of new postings: short intervals
+when postings usually arrive, long ones when they don't.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_io import atomic_write_json, write_json_async
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+MINUTES_PER_WEEK = HOURS_PER_WEEK * 60
+
+
+class ArrivalRateModel:
+    """Hour-of-week arrival histogram with exponential decay, used to pick the next check time"""
+
+    # Persisted model (next to seen_jobs.json)
+    MODEL_FILE = Path("data/arrival_model.json")
+
+    # Weight (in weeks) of the uniform prior that smooths sparse buckets
+    PRIOR_WEEKS = 1.0
+
+    # Use the fixed interval until this much history has been observed
+    MIN_OBSERVED_WEEKS = 1.0
+
+    def __init__(self, base_interval_minutes: int = 30, min_interval_minutes: int = 10,
+                 max_interval_minutes: int = 120, half_life_days: float = 28.0,
+                 path: Path = MODEL_FILE):
+        """
+        Args:
+            base_interval_minutes: Fixed interval the adaptive schedule replaces;
+                                   sets the check budget (checks per week)
+            min_interval_minutes: Shortest allowed interval
+            max_interval_minutes: Longest allowed interval
+            half_life_days: Half-life of past observations
+            path: JSON file the model is persisted to
+        """
+        self.base_interval = base_interval_minutes
+        self.min_interval = min_interval_minutes
+        self.max_interval = max_interval_minutes
+        self.half_life_days = half_life_days
+        self.path = Path(path)
+
+        self.counts = [0.0] * HOURS_PER_WEEK  # Decayed arrivals per hour-of-week bucket
+        self.weeks = 0.0                      # Decayed observation time, in weeks
+        self.updated: Optional[datetime] = None
+        self._load()
+
+    @staticmethod
+    def _bucket(when: datetime) -> int:
+        """Hour-of-week index (Monday 00:00 = 0)"""
+        return when.weekday() * 24 + when.hour
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if len(data['counts']) == HOURS_PER_WEEK:
+                self.counts = [float(c) for c in data['counts']]
+                self.weeks = float(data['weeks'])
+                self.updated = datetime.fromisoformat(data['updated']) if data.get('updated') else None
+        except Exception as e:
+            logger.warning(f"Failed to load arrival model: {e}")
+
+    def _state(self) -> Dict:
+        """Snapshot of the persisted fields"""
+        return {
+            'counts': list(self.counts),
+            'weeks': self.weeks,
+            'updated': self.updated.isoformat() if self.updated else None,
+        }
+
+    def save(self):
+        """Persist the histogram"""
+        try:
+            atomic_write_json(self.path, self._state())
+        except Exception as e:
+            logger.error(f"Failed to save arrival model: {e}")
+
+    async def save_async(self):
+        """Like save, but writes the file on the writer thread instead of the event loop"""
+        try:
+            await write_json_async(self.path, self._state())
+        except Exception as e:
+            logger.error(f"Failed to save arrival model: {e}")
+
+    def _decay(self, now: datetime):
+        """Fade old observations according to the half-life"""
+        if self.updated is None or now <= self.updated:
+            return
+        elapsed_days = (now - self.updated).total_seconds() / 86400
+        factor = 0.5 ** (elapsed_days / self.half_life_days)
+        self.counts = [count * factor for count in self.counts]
+        self.weeks *= factor
+
+    def record_check(self, window_start: Optional[datetime], now: datetime, new_postings: int):
+        """
+        Record a completed check (persist it with save() or save_async())
+
+        Args:
+            window_start: Time of the previous check (postings found now first
+                          appeared between then and `now`)
+            now: Time of this check
+            new_postings: Number of postings seen for the first time
+        """
+        if window_start is None or now <= window_start:
+            self.updated = now
+            return
+
+        window = now - window_start
+        # Arrival times are only known to within the window; skip windows
+        # too long to attribute to an hour (e.g. after downtime)
+        if window > timedelta(minutes=2 * self.max_interval):
+            logger.info("Check window too long to attribute arrivals - not updating arrival model")
+            self.updated = now
+            return
+
+        self._decay(now)
+        self.weeks += window.total_seconds() / (7 * 86400)
+        if new_postings:
+            self.counts[self._bucket(window_start + window / 2)] += new_postings
+        self.updated = now
+
+    def rates(self) -> List[float]:
+        """Expected arrivals per hour for each hour-of-week bucket (smoothed toward the mean)"""
+        total = sum(self.counts)
+        weeks = max(self.weeks, 1e-9)
+        mean = total / (HOURS_PER_WEEK * weeks)
+        return [(count + self.PRIOR_WEEKS * mean) / (weeks + self.PRIOR_WEEKS) for count in self.counts]
+
+    def _is_trained(self) -> bool:
+        return self.weeks >= self.MIN_OBSERVED_WEEKS and sum(self.counts) > 0
+
+    def _interval_at(self, when: datetime, rates: List[float], target: float) -> int:
+        """Minutes until the expected number of arrivals since `when` reaches `target`"""
+        expected = 0.0
+        for minute in range(1, self.max_interval + 1):
+            expected += rates[self._bucket(when + timedelta(minutes=minute - 1))] / 60
+            if minute >= self.min_interval and expected >= target:
+                return minute
+        return self.max_interval
+
+    def next_interval(self, now: Optional[datetime] = None) -> int:
+        """
+        Choose the number of minutes until the next check
+
+        Each check is spaced to expect the same number of new postings as the
+        fixed schedule would on average, so the total number of checks per
+        week stays about the same while checks shift toward busy hours.
+        """
+        if not self._is_trained():
+            return self.base_interval
+
+        now = now or datetime.now()
+        rates = self.rates()
+        weekly_arrivals = sum(rates)
+        target = weekly_arrivals * self.base_interval / MINUTES_PER_WEEK
+        return self._interval_at(now, rates, target)
+
+    def describe(self) -> Dict:
+        """
+        Summarize the chosen schedule and its expected latency
+
+        Simulates one week of checks and compares the adaptive schedule with
+        the fixed base interval. Latency is the expected time from a posting
+        appearing to the next check (half the interval it lands in).
+        """
+        fixed_latency = self.base_interval / 2
+        summary = {
+            'trained': self._is_trained(),
+            'observed_weeks': round(self.weeks, 2),
+            'weekly_arrivals': round(sum(self.counts) / max(self.weeks, 1e-9), 2) if self.weeks else 0.0,
+            'base_interval_minutes': self.base_interval,
+            'checks_per_week_fixed': round(MINUTES_PER_WEEK / self.base_interval, 1),
+            'expected_median_latency_fixed_minutes': fixed_latency,
+        }
+        if not summary['trained']:
+            summary.update({
+                'checks_per_week_adaptive': summary['checks_per_week_fixed'],
+                'expected_median_latency_adaptive_minutes': fixed_latency,
+                'interval_by_hour': {},
+            })
+            return summary
+
+        rates = self.rates()
+        target = sum(rates) * self.base_interval / MINUTES_PER_WEEK
+        start = datetime(2024, 1, 1)  # A Monday, 00:00
+
+        # Simulate a week of checks; an arrival waits half the interval it lands in
+        checks = 0
+        latencies = []  # (expected latency, arrival weight)
+        minute = 0
+        while minute < MINUTES_PER_WEEK:
+            when = start + timedelta(minutes=minute)
+            interval = self._interval_at(when, rates, target)
+            weight = sum(rates[self._bucket(when + timedelta(minutes=m))] for m in range(0, interval, 10))
+            latencies.append((interval / 2, weight))
+            checks += 1
+            minute += interval
+
+        latencies.sort()
+        total_weight = sum(weight for _, weight in latencies)
+        cumulative = 0.0
+        median_latency = latencies[-1][0]
+        for latency, weight in latencies:
+            cumulative += weight
+            if cumulative >= total_weight / 2:
+                median_latency = latency
+                break
+
+        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        summary.update({
+            'checks_per_week_adaptive': checks,
+            'expected_median_latency_adaptive_minutes': median_latency,
+            'interval_by_hour': {
+                day: [self._interval_at(start + timedelta(days=d, hours=h), rates, target) for h in range(24)]
+                for d, day in enumerate(days)
+            },
+        })
+        return summary
@@ -0,0 +1,63 @@
+"""
+Atomic, event-loop-friendly file writes
+Files are written to a temporary file in the same directory and renamed over
+the target, so a crash mid-write never leaves a truncated file behind. Async
+writes run on one background thread, which keeps them in submission order.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Union
+
+# A single writer thread: later snapshots of a file can never be overwritten by earlier ones
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-writer')
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes):
+    """Write `data` to `path` atomically (temp file + fsync + rename)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: Union[str, Path], text: str, encoding: str = 'utf-8'):
+    """Write text to `path` atomically"""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_json(path: Union[str, Path], obj: Any, **dump_options):
+    """Serialize `obj` as JSON and write it to `path` atomically"""
+    atomic_write_text(path, json.dumps(obj, **dump_options))
+
+
+async def run_in_writer(func, *args, **kwargs):
+    """Run a blocking write function on the shared writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer, functools.partial(func, *args, **kwargs))
+
+
+async def write_json_async(path: Union[str, Path], obj: Any, **dump_options):
+    """
+    Write JSON atomically without blocking the event loop
+
+    `obj` is serialized on the writer thread, so pass a snapshot (e.g. a list
+    copy of a set) rather than an object the caller keeps mutating.
+    """
+    await run_in_writer(lambda: atomic_write_json(path, obj, **dump_options))
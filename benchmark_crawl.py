@@ -0,0 +1,154 @@
+"""
+End-to-end crawl benchmark against the local fake site
+Drives JobScraper (Playwright, pagination clicks, fixed waits, parsing) through
+fake_site.FakeJobSite at several page counts and reports crawl time,
+throughput, per-page fetch latency and whether every served posting was found,
+with no network access and no load on the real site.
+
+Usage:
+    python benchmark_crawl.py [--pages 5 10 20] [--runs 3] [--latency-ms 150] [--jitter-ms 100]
+                              [--error-rate 0.0] [--insertions 0] [--json results.json] [--headed]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from fake_site import FakeJobSite
+from metrics import metrics
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile (0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def crawl_once(scraper, site: FakeJobSite) -> Dict:
+    """Crawl the fake site once and return timings and correctness counts"""
+    metrics.reset()
+    started = time.perf_counter()
+    found_ids = set()
+    async for page_jobs in scraper.iter_page_jobs():
+        found_ids.update(job.id for job in page_jobs)
+    elapsed = time.perf_counter() - started
+
+    fetch_seconds = [span['total'] for (name, _), span in metrics.spans.items()
+                     if name == 'scraper_page_fetch_seconds']
+    fixed_wait = sum(span['total'] for (name, _), span in metrics.spans.items()
+                     if name == 'scraper_fixed_wait_seconds')
+    return {
+        'seconds': elapsed,
+        'pages': len(fetch_seconds),
+        'jobs': len(found_ids),
+        'served': len(site.postings),
+        'duplicates': scraper.last_crawl_duplicates,
+        'complete': scraper.last_crawl_complete,
+        'fetch_seconds': fetch_seconds,
+        'fixed_wait_seconds': fixed_wait,
+        'requests': site.requests,
+        'errors': site.errors,
+    }
+
+
+async def run_benchmark(args) -> List[Dict]:
+    from scraper import JobScraper
+
+    metrics.configure(enabled=True)
+    scraper = JobScraper(debug=False, url="http://127.0.0.1/")
+    launch_started = time.perf_counter()
+    await scraper.start_browser()
+    print(f"Browser launch: {time.perf_counter() - launch_started:.2f} s (excluded from crawl times)\n")
+
+    results = []
+    try:
+        for pages in args.pages:
+            runs = []
+            for run in range(args.runs):
+                site = FakeJobSite(pages=pages, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                   error_rate=args.error_rate, insertions=args.insertions,
+                                   insert_after_requests=args.insert_after, seed=run)
+                with site:
+                    scraper.url = site.url
+                    runs.append(await crawl_once(scraper, site))
+
+            fetch = [seconds for run in runs for seconds in run['fetch_seconds']]
+            crawl_seconds = statistics.median(run['seconds'] for run in runs)
+            total_pages = sum(run['pages'] for run in runs)
+            total_seconds = sum(run['seconds'] for run in runs)
+            results.append({
+                'pages': pages,
+                'runs': len(runs),
+                'crawl_seconds_median': round(crawl_seconds, 3),
+                'pages_per_second': round(total_pages / total_seconds, 3) if total_seconds else 0,
+                'jobs_per_second': round(sum(run['jobs'] for run in runs) / total_seconds, 2) if total_seconds else 0,
+                'fetch_ms_p50': round(_percentile(fetch, 0.5) * 1000, 1),
+                'fetch_ms_p95': round(_percentile(fetch, 0.95) * 1000, 1),
+                'fetch_ms_max': round(max(fetch, default=0) * 1000, 1),
+                'fixed_wait_share': round(sum(run['fixed_wait_seconds'] for run in runs) / total_seconds, 3)
+                if total_seconds else 0,
+                'jobs_found': sum(run['jobs'] for run in runs),
+                'jobs_served': sum(run['served'] for run in runs),
+                'duplicates_dropped': sum(run['duplicates'] for run in runs),
+                'complete_runs': sum(1 for run in runs if run['complete']),
+                'injected_errors': sum(run['errors'] for run in runs),
+            })
+    finally:
+        await scraper.stop_browser()
+        scraper.close()
+    return results
+
+
+def print_results(results: List[Dict]):
+    header = (f"{'pages':>5} {'crawl s':>8} {'pages/s':>8} {'jobs/s':>7} {'fetch p50':>10} {'p95':>8} "
+              f"{'max':>8} {'wait %':>7} {'found/served':>13} {'dups':>5} {'complete':>9}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['pages']:>5} {r['crawl_seconds_median']:>8.2f} {r['pages_per_second']:>8.2f} "
+              f"{r['jobs_per_second']:>7.1f} {r['fetch_ms_p50']:>8.0f}ms {r['fetch_ms_p95']:>6.0f}ms "
+              f"{r['fetch_ms_max']:>6.0f}ms {r['fixed_wait_share'] * 100:>6.0f}% "
+              f"{r['jobs_found']:>6}/{r['jobs_served']:<6} {r['duplicates_dropped']:>5} "
+              f"{r['complete_runs']:>4}/{r['runs']:<4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JobScraper crawls against a local fake site')
+    parser.add_argument('--pages', type=int, nargs='+', default=[5, 10, 20], help='Page counts to benchmark')
+    parser.add_argument('--runs', type=int, default=3, help='Crawls per page count')
+    parser.add_argument('--latency-ms', type=float, default=150, help='Server delay per page')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='Extra random server delay per page')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of page requests answered with 503')
+    parser.add_argument('--insertions', type=int, default=0, help='Postings inserted at the top mid-crawl')
+    parser.add_argument('--insert-after', type=int, default=2, help='Insert after this many page requests')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON')
+    parser.add_argument('--headed', action='store_true', help='Show the browser (default: headless)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.headed:
+        # JobScraper runs headless in CI environments
+        os.environ.setdefault('CI', 'true')
+
+    results = asyncio.run(run_benchmark(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+    if any(r['jobs_found'] < r['jobs_served'] for r in results):
+        print("\n✗ Some crawls missed postings")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
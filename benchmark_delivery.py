@@ -0,0 +1,210 @@
+"""
+Notification and translation throughput benchmark against local stub APIs
+Drives TelegramNotifier (through its rate-limited dispatcher) and JobTranslator
+against fake_apis.FakeApis, which enforces Telegram-style flood limits and can
+inject latency, 429s and 5xx errors, and reports messages/sec,
+translations/sec and tail latency with no bot, no network and no load on Google.
+
+Latencies are per call as the caller sees them, so they include rate-limit
+waits and retries, not just the HTTP round trip.
+
+Usage:
+    python benchmark_delivery.py [--messages 40] [--chats 4] [--edits 10] [--translations 200]
+                                 [--latency-ms 80] [--jitter-ms 40] [--error-rate 0.01]
+                                 [--rate-limit-rate 0.0] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from benchmark_crawl import _percentile
+from fake_apis import FakeApis
+from http_client import create_http_client
+from telegram_dispatcher import TelegramDispatcher
+from telegram_notifier import TelegramNotifier
+from translator import JobTranslator
+
+STUB_BOT_TOKEN = "123456:stub-token"
+
+
+class TimedDispatcher(TelegramDispatcher):
+    """TelegramDispatcher that records how long each call took, per Bot API method"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    async def call(self, client, method, chat_id, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().call(client, method, chat_id, **kwargs)
+        finally:
+            self.latencies[method].append(time.perf_counter() - started)
+
+
+def _summary(count: int, seconds: float, latencies: List[float]) -> Dict:
+    return {
+        'count': count,
+        'seconds': round(seconds, 3),
+        'per_second': round(count / seconds, 2) if seconds else 0,
+        'latency_ms_p50': round(_percentile(latencies, 0.5) * 1000, 1),
+        'latency_ms_p95': round(_percentile(latencies, 0.95) * 1000, 1),
+        'latency_ms_p99': round(_percentile(latencies, 0.99) * 1000, 1),
+        'latency_ms_max': round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+async def bench_notifier(apis: FakeApis, client, args) -> Dict:
+    """Send args.messages alerts spread over args.chats chats, then edit some of them"""
+    dispatcher_options = {
+        'workers': args.workers,
+        'per_chat_rate': args.per_chat_rate,
+        'per_chat_burst': args.per_chat_burst,
+        'global_rate': args.global_rate,
+    }
+    chat_ids = [str(-1000000000000 - number) for number in range(args.chats)]
+    notifier = TelegramNotifier(STUB_BOT_TOKEN, chat_ids[0], client=client, api_url=apis.url)
+    # All chats share one dispatcher, like one bot sending to several chats
+    dispatcher = TimedDispatcher(notifier.base_url, **dispatcher_options)
+    notifier.dispatcher = dispatcher
+
+    # getMe isn't retried by the notifier, so allow for an injected 5xx
+    for _ in range(3):
+        if await notifier.probe_connection(ttl=0):
+            break
+    else:
+        raise RuntimeError(f"getMe failed against the stub at {apis.url}")
+
+    per_chat: Dict[str, List] = {chat_id: [] for chat_id in chat_ids}
+    for number in range(args.messages):
+        chat_id = chat_ids[number % len(chat_ids)]
+        text = f"<b>🏥 職能治療師 #{number + 1}</b>\n📍 臺北市大安區\n💰 45,000~55,000"
+        per_chat[chat_id].append([{**notifier._message_payload(text), 'chat_id': chat_id}])
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(dispatcher.dispatch(client, chat_id, groups)
+                                     for chat_id, groups in per_chat.items()))
+    send_seconds = time.perf_counter() - started
+    message_ids = [ids[0] for chat_results in results for ids in chat_results]
+    delivered = sum(1 for message_id in message_ids if message_id is not None)
+
+    # Edits go to the notifier's own chat, like closing alerts
+    edit_ids = [ids[0] for ids in results[0] if ids[0]][:args.edits]
+    started = time.perf_counter()
+    edited = await asyncio.gather(*(notifier.edit_message(message_id, notifier.render_closed_message('已關閉', 'zh'))
+                                    for message_id in edit_ids))
+    edit_seconds = time.perf_counter() - started
+
+    return {
+        'sendMessage': {**_summary(delivered, send_seconds, dispatcher.latencies['sendMessage']),
+                        'failed': args.messages - delivered},
+        'editMessageText': {**_summary(sum(edited), edit_seconds, dispatcher.latencies['editMessageText']),
+                            'failed': len(edited) - sum(edited)},
+        'dispatcher': dispatcher.get_stats(),
+    }
+
+
+async def bench_translator(apis: FakeApis, client, args) -> Dict:
+    """Translate args.translations distinct texts with the translator's usual concurrency"""
+    translator = JobTranslator(client=client, api_url=apis.translate_url)
+    texts = [f"職缺編號 {number}：門診及住院病人職能治療。具職能治療師證照者佳。" for number in range(args.translations)]
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    latencies: List[float] = []
+
+    async def _translate(text: str) -> str:
+        async with semaphore:
+            call_started = time.perf_counter()
+            translated = await translator.translate_text(text)
+            latencies.append(time.perf_counter() - call_started)
+            return translated
+
+    started = time.perf_counter()
+    translated = await asyncio.gather(*(_translate(text) for text in texts))
+    seconds = time.perf_counter() - started
+    untranslated = sum(1 for text, result in zip(texts, translated) if result == text)
+    return {
+        'translate': {**_summary(len(texts) - untranslated, seconds, latencies), 'untranslated': untranslated},
+    }
+
+
+async def run_benchmark(args) -> Dict:
+    apis = FakeApis(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                    per_chat_rate=args.per_chat_rate, per_chat_burst=args.per_chat_burst,
+                    global_rate=args.global_rate, translate_rate=args.translate_rate, seed=args.seed)
+    with apis:
+        async with create_http_client() as client:
+            results = await bench_notifier(apis, client, args)
+            results.update(await bench_translator(apis, client, args))
+        results['stub'] = apis.summary()
+    return results
+
+
+def print_results(results: Dict):
+    header = f"{'':<16} {'done':>6} {'seconds':>8} {'per s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'lost':>5}"
+    print(header)
+    print('-' * len(header))
+    for name, lost_key in (('sendMessage', 'failed'), ('editMessageText', 'failed'), ('translate', 'untranslated')):
+        r = results[name]
+        print(f"{name:<16} {r['count']:>6} {r['seconds']:>8.2f} {r['per_second']:>7.2f} "
+              f"{r['latency_ms_p50']:>6.0f}ms {r['latency_ms_p95']:>6.0f}ms {r['latency_ms_p99']:>6.0f}ms "
+              f"{r['latency_ms_max']:>6.0f}ms {r[lost_key]:>5}")
+
+    stats = results['dispatcher']
+    stub = results['stub']
+    print(f"\nDispatcher: {stats['sent']} sent, {stats['retried']} retried "
+          f"({stats['rate_limited']} after 429), {stats['failed']} failed")
+    print(f"Stub: requests {stub['requests']}, 429s {stub['rate_limited']}, injected 5xx {stub['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Telegram sending and translation against local stub APIs')
+    parser.add_argument('--messages', type=int, default=40, help='sendMessage calls')
+    parser.add_argument('--chats', type=int, default=4, help='Chats the messages are spread over')
+    parser.add_argument('--edits', type=int, default=10, help='editMessageText calls (in the first chat)')
+    parser.add_argument('--translations', type=int, default=200, help='Distinct texts to translate')
+    parser.add_argument('--concurrency', type=int, default=JobTranslator.DEFAULT_CONCURRENCY,
+                        help='Concurrent translations')
+    parser.add_argument('--workers', type=int, default=TelegramDispatcher.DEFAULT_WORKERS, help='Send workers per chat')
+    parser.add_argument('--per-chat-rate', type=float, default=TelegramDispatcher.DEFAULT_PER_CHAT_RATE,
+                        help='Messages/second per chat (client limiter and stub limit)')
+    parser.add_argument('--per-chat-burst', type=int, default=TelegramDispatcher.DEFAULT_PER_CHAT_BURST,
+                        help='Message burst per chat (client limiter and stub limit)')
+    parser.add_argument('--global-rate', type=float, default=TelegramDispatcher.DEFAULT_GLOBAL_RATE,
+                        help='Messages/second overall (client limiter and stub limit)')
+    parser.add_argument('--translate-rate', type=float, default=0.0, help='Stub translations/second before 429s (0 = no limit)')
+    parser.add_argument('--latency-ms', type=float, default=80, help='Stub delay per request')
+    parser.add_argument('--jitter-ms', type=float, default=40, help='Extra random stub delay per request')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='Share of requests answered with 502')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of Bot API requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after seconds of injected 429s')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for injected faults')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Keep the benchmark's getMe probe out of the real probe cache (and out of data/)
+    with tempfile.TemporaryDirectory() as probe_dir:
+        TelegramNotifier.PROBE_CACHE_FILE = Path(probe_dir) / TelegramNotifier.PROBE_CACHE_FILE.name
+        results = asyncio.run(run_benchmark(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+    if results['sendMessage']['failed'] or results['editMessageText']['failed']:
+        print("\n✗ Some messages were not delivered")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Startup benchmark for main.py
+Measures how long `import main` and `main.py --help` take in fresh
+interpreters and fails when they exceed a budget, so heavy imports creeping
+back onto the startup path are caught in CI.
+
+Usage:
+    python benchmark_startup.py [--runs 5] [--import-budget-ms 250] [--help-budget-ms 400]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent
+
+# Modules that must not be imported just by loading main.py
+HEAVY_MODULES = ('playwright', 'bs4', 'apscheduler', 'httpx')
+
+
+def _timed_run(args: List[str]) -> float:
+    """Run a fresh interpreter and return its wall time in milliseconds"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def heavy_imports() -> List[str]:
+    """Return heavy top-level packages loaded by `import main` (via -X importtime)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                            capture_output=True, text=True)
+    loaded = set(re.findall(r'\|\s+(\S+)$', result.stderr, re.MULTILINE))
+    return sorted(module for module in HEAVY_MODULES if module in loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark main.py import and CLI startup time')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per measurement (median is reported)')
+    parser.add_argument('--import-budget-ms', type=float, default=250.0, help='Budget for `import main`')
+    parser.add_argument('--help-budget-ms', type=float, default=400.0, help='Budget for `main.py --help`')
+    args = parser.parse_args()
+
+    baseline = statistics.median(_timed_run(['-c', 'pass']) for _ in range(args.runs))
+    import_ms = statistics.median(_timed_run(['-c', 'import main']) for _ in range(args.runs)) - baseline
+    help_ms = statistics.median(_timed_run(['main.py', '--help']) for _ in range(args.runs)) - baseline
+    heavy = heavy_imports()
+
+    print(f"Interpreter baseline: {baseline:.0f} ms")
+    print(f"import main:          {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"main.py --help:       {help_ms:.0f} ms (budget {args.help_budget_ms:.0f} ms)")
+    print(f"Heavy modules loaded by import main: {', '.join(heavy) or 'none'}")
+
+    failed = import_ms > args.import_budget_ms or help_ms > args.help_budget_ms or heavy
+    if failed:
+        print("✗ Startup regression")
+        sys.exit(1)
+    print("✓ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
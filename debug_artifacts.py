@@ -0,0 +1,188 @@
+"""
+Debug artifact writer
+Writes each run's raw page HTML, extracted jobs and location analysis as
+compressed files into its own timestamped directory, off the event loop, and
+prunes old runs so debug_output/ stays within a run count and size budget.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_io import atomic_write_bytes
+from job import job_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def _zstd_available() -> bool:
+    """Return True if the optional 'zstandard' package is installed"""
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class DebugArtifactWriter:
+    """Compressed, size-capped debug output with one directory per run"""
+
+    DEFAULT_ROOT = Path("debug_output")
+    DEFAULT_KEEP_RUNS = 10
+    DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+    COMPRESSIONS = ('gzip', 'zstd')
+
+    # 'always' keeps every run's raw HTML; 'anomalies' only for runs with anomalies
+    HTML_MODES = ('always', 'anomalies')
+
+    def __init__(self, root: Path = DEFAULT_ROOT, keep_runs: int = DEFAULT_KEEP_RUNS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, compression: str = 'gzip', keep_html: str = 'anomalies'):
+        """
+        Args:
+            root: Directory holding the per-run directories
+            keep_runs: Number of most recent runs to keep
+            max_bytes: Total size cap for all kept runs (the current run is always kept)
+            compression: 'gzip' or 'zstd' (zstd needs the optional 'zstandard' package)
+            keep_html: 'always' or 'anomalies'
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown debug compression '{compression}' (use one of: {', '.join(self.COMPRESSIONS)})")
+        if keep_html not in self.HTML_MODES:
+            raise ValueError(f"Unknown debug HTML mode '{keep_html}' (use one of: {', '.join(self.HTML_MODES)})")
+        if compression == 'zstd' and not _zstd_available():
+            logger.warning("zstd requested but 'zstandard' is not installed (pip install zstandard); using gzip")
+            compression = 'gzip'
+
+        self.root = Path(root)
+        self.keep_runs = max(1, keep_runs)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.keep_html = keep_html
+        self.run_dir: Optional[Path] = None
+        # One writer thread keeps writes ordered and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-writer')
+        self._pending: List[asyncio.Future] = []
+
+    @property
+    def extension(self) -> str:
+        return '.zst' if self.compression == 'zstd' else '.gz'
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == 'zstd':
+            import zstandard
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _write(self, path: Path, text: str):
+        """Compress and write one file (runs in the writer thread)"""
+        atomic_write_bytes(path, self._compress(text.encode('utf-8')))
+
+    def _submit(self, func, *args):
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(self._executor, func, *args))
+
+    def start_run(self):
+        """Create the directory for a new run"""
+        self.run_dir = self.root / "runs" / datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Debug artifacts for this run: {self.run_dir}/")
+
+    def add_page(self, page_number: int, html: str):
+        """Queue a page's raw HTML to be written (returns immediately)"""
+        self._submit(self._write, self.run_dir / f"page_{page_number}.html{self.extension}", html)
+
+    @staticmethod
+    def find_anomalies(all_jobs: List[Dict], pages: int, complete: bool) -> List[str]:
+        """Describe what looks wrong with a run (an empty list means a normal run)"""
+        anomalies = []
+        if not complete:
+            anomalies.append("crawl did not reach the last page")
+        if not all_jobs:
+            anomalies.append("no jobs parsed")
+        missing_location = sum(1 for job in all_jobs if not job.get('location'))
+        if missing_location:
+            anomalies.append(f"{missing_location} jobs missing location")
+        parsed_pages = {job.get('page_number') for job in all_jobs}
+        empty_pages = [page for page in range(1, pages + 1) if page not in parsed_pages]
+        if empty_pages:
+            anomalies.append(f"no jobs on pages {empty_pages}")
+        return anomalies
+
+    @staticmethod
+    def _location_analysis(all_jobs: List[Dict], anomalies: List[str]) -> Dict:
+        return {
+            "total_jobs": len(all_jobs),
+            "jobs_with_location": sum(1 for j in all_jobs if j.get('location')),
+            "jobs_without_location": sum(1 for j in all_jobs if not j.get('location')),
+            "anomalies": anomalies,
+            "jobs_missing_location": [
+                {
+                    "id": j.get('id'),
+                    "page": j.get('page_number'),
+                    "position": j.get('listing_position'),
+                    "title": j.get('title'),
+                    "full_text_preview": j.get('full_text', '')[:200]
+                }
+                for j in all_jobs if not j.get('location')
+            ]
+        }
+
+    def _finish(self, all_jobs: List[Dict], anomalies: List[str]):
+        """Write the run summary, drop HTML of normal runs if sampling, prune old runs (writer thread)"""
+        self._write(self.run_dir / f"extracted_jobs.json{self.extension}",
+                    json.dumps([job_to_dict(job) for job in all_jobs], ensure_ascii=False, separators=(',', ':')))
+        self._write(self.run_dir / f"location_analysis.json{self.extension}",
+                    json.dumps(self._location_analysis(all_jobs, anomalies), ensure_ascii=False, indent=2))
+
+        if self.keep_html == 'anomalies' and not anomalies:
+            for html_file in self.run_dir.glob("page_*.html*"):
+                html_file.unlink()
+
+        self._prune()
+
+    def _prune(self):
+        """Delete the oldest runs beyond keep_runs or the total size cap"""
+        runs = sorted(path for path in (self.root / "runs").iterdir() if path.is_dir())
+        sizes = {run: sum(f.stat().st_size for f in run.rglob('*') if f.is_file()) for run in runs}
+        total = sum(sizes.values())
+
+        removed = 0
+        while len(runs) > 1 and (len(runs) > self.keep_runs or total > self.max_bytes):
+            oldest = runs.pop(0)
+            total -= sizes[oldest]
+            shutil.rmtree(oldest, ignore_errors=True)
+            removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} old debug runs ({total / 1024 / 1024:.1f} MB kept)")
+
+    async def finish_run(self, all_jobs: List[Dict], pages: int, complete: bool):
+        """
+        Wait for queued page writes, then write the run summary and apply retention
+
+        Args:
+            all_jobs: Every job parsed in this run
+            pages: Number of pages fetched
+            complete: Whether the crawl reached the last page
+        """
+        anomalies = self.find_anomalies(all_jobs, pages, complete)
+        if anomalies:
+            logger.warning(f"Debug run anomalies: {'; '.join(anomalies)} - keeping raw HTML")
+
+        self._submit(self._finish, all_jobs, anomalies)
+        pending, self._pending = self._pending, []
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to write debug artifact: {result}")
+        logger.info(f"Saved debug artifacts: {self.run_dir}/")
+
+    def close(self):
+        """Shut down the writer thread"""
+        self._executor.shutdown(wait=True)
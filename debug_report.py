@@ -0,0 +1,106 @@
+"""
+Debug report rendering for test mode
+Bundles every scraped job's debug details into one compressed file for upload
+"""
+
+import csv
+import gzip
+import html
+import io
+import json
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from job import job_to_dict
+
+# Length of the full_text preview included for each job
+FULL_TEXT_PREVIEW_LENGTH = 200
+
+# Leading columns; any other job fields follow in alphabetical order
+LEADING_FIELDS = ['page_number', 'listing_position', 'id', 'title', 'title_en']
+
+
+def build_debug_records(jobs: List[Dict]) -> List[Dict]:
+    """
+    Build one flat debug record per job
+
+    Every job field is kept except `full_text`, which is replaced by a
+    short `full_text_preview`.
+    """
+    records = []
+    for job in jobs:
+        record = {key: value for key, value in job_to_dict(job).items() if key != 'full_text'}
+        record['full_text_preview'] = job.get('full_text', '')[:FULL_TEXT_PREVIEW_LENGTH]
+        records.append(record)
+    return records
+
+
+def _columns(records: List[Dict]) -> List[str]:
+    """Return report column order: leading fields first, then the rest sorted"""
+    keys = set()
+    for record in records:
+        keys.update(record.keys())
+    leading = [field for field in LEADING_FIELDS if field in keys]
+    return leading + sorted(keys - set(leading))
+
+
+def _render_json(records: List[Dict]) -> str:
+    return json.dumps(records, ensure_ascii=False, indent=1)
+
+
+def _render_csv(records: List[Dict]) -> str:
+    buffer = io.StringIO()
+    # BOM so spreadsheet apps detect UTF-8 (Chinese text)
+    buffer.write('\ufeff')
+    writer = csv.DictWriter(buffer, fieldnames=_columns(records), extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+def _render_html(records: List[Dict]) -> str:
+    columns = _columns(records)
+    header = ''.join(f'<th>{html.escape(column)}</th>' for column in columns)
+    rows = []
+    for record in records:
+        cells = ''.join(f'<td>{html.escape(str(record.get(column, "")))}</td>' for column in columns)
+        rows.append(f'<tr>{cells}</tr>')
+
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Job debug report</title>'
+        '<style>table{border-collapse:collapse;font-size:12px}'
+        'td,th{border:1px solid #ccc;padding:4px;vertical-align:top}</style></head><body>'
+        f'<h1>Job debug report ({len(records)} jobs)</h1>'
+        f'<table><thead><tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody></table>'
+        '</body></html>'
+    )
+
+
+# Supported report formats
+REPORT_RENDERERS = {
+    'json': _render_json,
+    'csv': _render_csv,
+    'html': _render_html,
+}
+
+
+def render_debug_report(jobs: List[Dict], report_format: str = 'html') -> Tuple[str, bytes, str]:
+    """
+    Render all jobs into a single gzip-compressed report
+
+    Args:
+        jobs: Job dictionaries (translated or not)
+        report_format: 'json', 'csv' or 'html'
+
+    Returns:
+        Tuple of (filename, gzip-compressed bytes, MIME type)
+    """
+    if report_format not in REPORT_RENDERERS:
+        raise ValueError(f"Unsupported report format '{report_format}' (use one of: {', '.join(REPORT_RENDERERS)})")
+
+    records = build_debug_records(jobs)
+    content = REPORT_RENDERERS[report_format](records).encode('utf-8')
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"job_debug_{timestamp}.{report_format}.gz"
+    return filename, gzip.compress(content), 'application/gzip'
@@ -0,0 +1,321 @@
+"""
+Local stand-ins for the Telegram Bot API and the Google translate endpoint
+Implements the parts TelegramNotifier and JobTranslator use (sendMessage,
+sendDocument, editMessageText and getMe under /bot<token>/, and the
+translate_a/single response shape), so sending and translation can be tested
+and benchmarked without network access, a real bot or Google.
+
+Like Telegram, the stub enforces flood limits (per-chat and global message
+rates) and answers requests over them with 429 and `parameters.retry_after`.
+Latency, jitter, random 429s and 5xx errors are configurable. Standard
+library only.
+
+Usage:
+    python fake_apis.py [--latency-ms 80] [--jitter-ms 40] [--error-rate 0.02] [--rate-limit-rate 0.01]
+    (then point TELEGRAM_API_URL and TRANSLATE_API_URL at the printed URLs)
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+_BOT_PATH = re.compile(r'^/bot(?P<token>[^/]+)/(?P<method>\w+)$')
+_MULTIPART_CHAT_ID = re.compile(rb'name="chat_id"\r\n\r\n([^\r]*)')
+# Google splits the translation into one segment per sentence
+_SENTENCE_END = re.compile(r'(?<=[。！？!?；;])')
+
+_MESSAGE_METHODS = ('sendMessage', 'sendDocument', 'editMessageText')
+
+
+class _ServerBucket:
+    """Token bucket on the server side: how Telegram decides who gets a 429"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeApis:
+    """Stub Bot API and translate endpoint served over HTTP on localhost (in a background thread)"""
+
+    TRANSLATE_PATH = "/translate_a/single"
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: int = 1,
+                 per_chat_rate: float = 1.0, per_chat_burst: int = 3, global_rate: float = 30.0,
+                 translate_rate: float = 0.0, seed: int = 0, port: int = 0):
+        """
+        Args:
+            latency_ms: Delay before every response
+            jitter_ms: Extra random delay, uniform in [0, jitter_ms]
+            error_rate: Probability that a request fails with HTTP 502
+            rate_limit_rate: Probability that a Bot API request gets a 429 regardless of rate
+            retry_after: `retry_after` seconds sent with injected 429s
+            per_chat_rate: Messages per second allowed to one chat (0 = no limit)
+            per_chat_burst: Messages one chat may receive in a burst
+            global_rate: Messages per second allowed across all chats (0 = no limit)
+            translate_rate: Translate requests per second before 429s (0 = no limit)
+            seed: Seed for injected faults and jitter
+            port: Port to listen on (0 = any free port)
+        """
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._global_bucket = _ServerBucket(global_rate, global_rate) if global_rate else None
+        self._chat_buckets: Dict[str, _ServerBucket] = {}
+        self._translate_bucket = _ServerBucket(translate_rate, translate_rate) if translate_rate else None
+        self._next_message_id = 1
+        self.requests: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Server root (the equivalent of TelegramNotifier.API_URL)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def translate_url(self) -> str:
+        """Translate endpoint (the equivalent of JobTranslator.TRANSLATE_API)"""
+        return f"{self.url}{self.TRANSLATE_PATH}"
+
+    def _delay(self):
+        delay = self.latency + self._random.uniform(0, self.jitter) if (self.latency or self.jitter) else 0
+        if delay:
+            time.sleep(delay)
+
+    def _fault(self, method: str, chat_id: str = '') -> Optional[Tuple[int, Dict]]:
+        """Injected error or flood-limit response for a request, None to serve it (call with the lock held)"""
+        self.requests[method] += 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors[method] += 1
+            return 502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}
+
+        wait = 0.0
+        if method == 'translate':
+            if self._translate_bucket:
+                wait = self._translate_bucket.take()
+            if wait:
+                self.rate_limited[method] += 1
+                # Google answers with a bare 429 page, no retry hint
+                return 429, {}
+            return None
+
+        if self.rate_limit_rate and self._random.random() < self.rate_limit_rate:
+            wait = self.retry_after
+        return self._flood_wait(method, chat_id, wait)
+
+    def _flood_wait(self, method: str, chat_id: str, wait: float) -> Optional[Tuple[int, Dict]]:
+        """Enforce the per-chat and global message limits (call with the lock held)"""
+        if not wait and method in _MESSAGE_METHODS:
+            if self._global_bucket:
+                wait = self._global_bucket.take()
+            if not wait and self.per_chat_rate:
+                bucket = self._chat_buckets.get(chat_id)
+                if bucket is None:
+                    bucket = _ServerBucket(self.per_chat_rate, self.per_chat_burst)
+                    self._chat_buckets[chat_id] = bucket
+                wait = bucket.take()
+        if not wait:
+            return None
+        self.rate_limited[method] += 1
+        retry_after = max(1, math.ceil(wait))
+        return 429, {
+            'ok': False,
+            'error_code': 429,
+            'description': f"Too Many Requests: retry after {retry_after}",
+            'parameters': {'retry_after': retry_after},
+        }
+
+    def _bot_result(self, method: str, fields: Dict) -> Tuple[int, Dict]:
+        """Successful Bot API response for a method (call with the lock held)"""
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': 1000001, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_job_alert_bot',
+            }}
+        if method not in _MESSAGE_METHODS:
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'}
+
+        message = {
+            'chat': {'id': fields.get('chat_id', '')},
+            'date': int(time.time()),
+        }
+        if method == 'editMessageText':
+            message['message_id'] = int(fields.get('message_id') or 0)
+            message['text'] = fields.get('text', '')
+        else:
+            message['message_id'] = self._next_message_id
+            self._next_message_id += 1
+            if method == 'sendMessage':
+                message['text'] = fields.get('text', '')
+            else:
+                message['document'] = {'file_id': f"stub-{message['message_id']}"}
+        return 200, {'ok': True, 'result': message}
+
+    @staticmethod
+    def translate(text: str) -> list:
+        """translate_a/single response body (dt=t): one [translated, original, ...] entry per sentence"""
+        segments = [segment for segment in _SENTENCE_END.split(text) if segment]
+        return [[[f"[en] {segment}", segment, None, None, 10] for segment in segments], None, 'zh-CN']
+
+    def _handler_class(self):
+        apis = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, status: int, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _fields(self, parsed) -> Dict:
+                """Request parameters from the query string and a JSON, form or multipart body"""
+                fields = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                content_type = self.headers.get('Content-Type', '')
+                if body and content_type.startswith('application/json'):
+                    fields.update(json.loads(body))
+                elif body and content_type.startswith('application/x-www-form-urlencoded'):
+                    fields.update({key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()})
+                elif body and content_type.startswith('multipart/form-data'):
+                    match = _MULTIPART_CHAT_ID.search(body)
+                    if match:
+                        fields['chat_id'] = match.group(1).decode('utf-8')
+                return fields
+
+            def _handle(self):
+                parsed = urlparse(self.path)
+                try:
+                    fields = self._fields(parsed)
+                except ValueError:
+                    self._respond(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request'})
+                    return
+                apis._delay()
+
+                if parsed.path == apis.TRANSLATE_PATH:
+                    with apis._lock:
+                        fault = apis._fault('translate')
+                    if fault:
+                        self._respond(*fault)
+                    else:
+                        self._respond(200, apis.translate(fields.get('q', '')))
+                    return
+
+                match = _BOT_PATH.match(parsed.path)
+                if not match:
+                    self._respond(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return
+                method = match.group('method')
+                with apis._lock:
+                    response = apis._fault(method, str(fields.get('chat_id', ''))) or apis._bot_result(method, fields)
+                self._respond(*response)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, format, *args):
+                logger.debug(f"fake APIs: {format % args}")
+
+        return Handler
+
+    def summary(self) -> Dict:
+        """Requests, 429s and injected errors per method"""
+        return {
+            'requests': dict(self.requests),
+            'rate_limited': dict(self.rate_limited),
+            'errors': dict(self.errors),
+        }
+
+    def start(self) -> 'FakeApis':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-apis', daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Bot API and translate endpoint serving at {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakeApis':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stub Telegram Bot API and translate endpoints on localhost')
+    parser.add_argument('--port', type=int, default=8766, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random delay per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 502')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of Bot API requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after seconds of injected 429s')
+    parser.add_argument('--per-chat-rate', type=float, default=1.0, help='Messages/second per chat (0 = no limit)')
+    parser.add_argument('--per-chat-burst', type=int, default=3, help='Message burst per chat')
+    parser.add_argument('--global-rate', type=float, default=30.0, help='Messages/second overall (0 = no limit)')
+    parser.add_argument('--translate-rate', type=float, default=0.0, help='Translations/second (0 = no limit)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    apis = FakeApis(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                    per_chat_rate=args.per_chat_rate, per_chat_burst=args.per_chat_burst,
+                    global_rate=args.global_rate, translate_rate=args.translate_rate, port=args.port)
+    apis.start()
+    print(f"Bot API at {apis.url} - set TELEGRAM_API_URL to this")
+    print(f"Translate at {apis.translate_url} - set TRANSLATE_API_URL to this (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        apis.stop()
+        print(json.dumps(apis.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Local stand-in for the oturoc.org.tw recruit listing
+Serves generated pages with the same markup the scraper relies on (the
+recruitItem / jobTitle / place / topInfo fields of the recorded
+page_N_raw.html files, and the pagination block with its `a.arrow.next`
+link), so crawls can be tested and benchmarked without touching the real site.
+
+Latency, jitter, an error rate and postings inserted mid-crawl (which shift
+the listing down, like a new posting appearing while we paginate) are
+configurable. Standard library only.
+
+Usage:
+    python fake_site.py [--pages 10] [--latency-ms 150] [--jitter-ms 100] [--error-rate 0.05]
+    (then point JOB_SITE_URL at the printed URL)
+"""
+
+import argparse
+import html
+import logging
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+_TITLES = ('職能治療師', '兼職職能治療師', '專任研究助理', '約用職能治療師', '居家職能治療師', '長照職能治療師')
+_ORGANIZATIONS = ('聯合醫院', '復健科診所', '長照中心', '大學職能治療學系', '身心科診所', '護理之家')
+_PLACES = (
+    '臺北市大安區復興南路一段', '台北市士林區文昌路', '新北市板橋區南雅南路二段', '新北市永和區中正路',
+    '桃園市龜山區文化一路', '桃園市中壢區中大路', '台中市大里區德芳路一段', '高雄市鼓山區美術館路',
+    '屏東縣內埔鄉昭勝路', '花蓮縣玉里鎮新興街',
+)
+_CATEGORIES = ('生理', '精神', '小兒', '長照', '助理')
+_SALARIES = ('45000', '43,000~48,000', '時薪840-1800', '面議', '年薪600000至630000', '800', '45,000以上')
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head><meta charset="utf-8"><title>徵人求才 - 台灣職能治療學會</title></head>
+<body>
+  <div class="recruitList">
+{items}
+  </div>
+  <div class="paginationContainer"><a class="arrow prev" href="{prev_href}"><i class="fas fa-chevron-left"></i></a>
+<div class="pageSec"><ul class="pagination">{page_links}</ul></div><a class="arrow next" href="{next_href}"><i class="fas fa-chevron-right"></i></a>
+  </div>
+</body>
+</html>
+"""
+
+_ITEM_TEMPLATE = """    <div class="recruitItem"><a class="head" href="javascript:;">
+        <p class="jobTitle">{title}</p>
+        <div class="rightInfo">
+          <p class="place">{place}</p>
+          <div class="arrow"><i class="fas fa-chevron-left"></i></div>
+        </div></a>
+      <div class="contentBox">
+        <div class="content">
+          <div class="topInfo">
+            <p>徵才機構<span>{organization}</span></p>
+            <p>徵才型態<span>{employment_type}</span></p>
+            <p>求才類別<span>{category}</span></p>
+            <p>到職日期<span>{start_date}</span></p>
+            <p>截止公告<span>{deadline}</span></p>
+            <p>徵才人數<span>1</span></p>
+            <p>徵才區域<span>{region}</span></p>
+            <p>薪資待遇<span>{salary}</span></p>
+            <p>聯絡人<span>王小姐</span></p>
+            <p>聯絡電話<span>02-2345678{serial_digit}</span></p>
+            <p class="wide">工作地址<span>{place}</span></p>
+          </div>
+          <div class="rowSec">
+            <p class="secTitle">條件要求：</p>
+            <p>1、具職能治療師證照。<br>2、{requirement}</p>
+          </div>
+          <div class="rowSec">
+            <p class="secTitle">工作說明：</p>
+            <p>職缺編號 {serial}：{description}</p>
+          </div>
+        </div>
+      </div>
+    </div>"""
+
+
+class FakeJobSite:
+    """Generated recruit listing served over HTTP on localhost (in a background thread)"""
+
+    PATH = "/index.php"
+
+    def __init__(self, pages: int = 10, per_page: int = 10, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0.0, insertions: int = 0, insert_after_requests: int = 2,
+                 seed: int = 0, port: int = 0):
+        """
+        Args:
+            pages: Number of listing pages initially
+            per_page: Postings per page (the real site shows 10)
+            latency_ms: Delay before every page response
+            jitter_ms: Extra random delay, uniform in [0, jitter_ms]
+            error_rate: Probability that a page request fails with HTTP 503
+            insertions: Postings added at the top of the listing during the crawl
+            insert_after_requests: Add them after this many page requests
+            seed: Seed for the generated postings and injected faults
+            port: Port to listen on (0 = any free port)
+        """
+        self.per_page = per_page
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.insertions = insertions
+        self.insert_after_requests = insert_after_requests
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_serial = 1
+        self.postings: List[Dict] = [self._generate_posting() for _ in range(pages * per_page)]
+        self.requests = 0
+        self.errors = 0
+        self.inserted = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Listing URL (the equivalent of JobScraper.URL)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.PATH}?action=recruit"
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.postings) // self.per_page))
+
+    def _generate_posting(self) -> Dict:
+        serial = self._next_serial
+        self._next_serial += 1
+        choice = self._random.choice
+        start = date(2026, 2, 1) + timedelta(days=self._random.randrange(90))
+        place = choice(_PLACES)
+        return {
+            'serial': serial,
+            'title': f"{choice(_TITLES)} {serial}名",
+            'place': place,
+            'region': place[:3],
+            'organization': f"{place[:3]}{choice(_ORGANIZATIONS)}",
+            'employment_type': choice(('正職', '兼職')),
+            'category': choice(_CATEGORIES),
+            'start_date': start.isoformat(),
+            'deadline': (start - timedelta(days=14)).isoformat(),
+            'salary': choice(_SALARIES),
+            'requirement': choice(('細心負責、具團隊合作精神。', '具小兒職能治療經驗者佳。', '具長照服務經驗者佳。')),
+            'description': choice(('門診及住院病人職能治療。', '社區及居家職能治療服務。', '研究計畫執行相關業務。')),
+        }
+
+    def render_page(self, page_number: int) -> str:
+        """HTML for one listing page (page numbers past the end show the last page)"""
+        page_number = min(max(1, page_number), self.page_count)
+        start = (page_number - 1) * self.per_page
+        items = "\n".join(
+            _ITEM_TEMPLATE.format(
+                serial_digit=posting['serial'] % 10,
+                **{key: html.escape(str(value)) for key, value in posting.items()},
+            )
+            for posting in self.postings[start:start + self.per_page]
+        )
+
+        def href(number: int) -> str:
+            return f"?action=recruit&amp;p={number}"
+
+        page_links = "".join(
+            f'<li class="active"><a>{number}</a></li>' if number == page_number
+            else f'<li><a href="{href(number)}">{number}</a></li>'
+            for number in range(1, self.page_count + 1)
+        )
+        # Like the real site, the last page's "next" arrow leads back to the same page
+        return _PAGE_TEMPLATE.format(
+            items=items,
+            page_links=page_links,
+            prev_href=href(page_number - 1) if page_number > 1 else "javascript:;",
+            next_href=href(min(page_number + 1, self.page_count)),
+        )
+
+    def _serve_page(self, page_number: int) -> Optional[str]:
+        """Apply latency, faults and scheduled insertions; None means respond with an error"""
+        delay = self.latency + self._random.uniform(0, self.jitter) if (self.latency or self.jitter) else 0
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            if self.inserted < self.insertions and self.requests > self.insert_after_requests:
+                # New postings appear at the top and push everything down
+                self.postings.insert(0, self._generate_posting())
+                self.inserted += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return None
+            return self.render_page(page_number)
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path not in (site.PATH, '/'):
+                    self.send_error(404)
+                    return
+                query = parse_qs(parsed.query)
+                try:
+                    page_number = int(query.get('p', ['1'])[0])
+                except ValueError:
+                    page_number = 1
+                body = site._serve_page(page_number)
+                if body is None:
+                    self.send_error(503, "Service Unavailable (injected)")
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"fake site: {format % args}")
+
+        return Handler
+
+    def start(self) -> 'FakeJobSite':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-site', daemon=True)
+        self._thread.start()
+        logger.info(f"Fake job site serving {len(self.postings)} postings on {self.page_count} pages at {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakeJobSite':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a fake oturoc.org.tw recruit listing on localhost')
+    parser.add_argument('--pages', type=int, default=10, help='Listing pages')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before every page response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random delay per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of page requests answered with 503')
+    parser.add_argument('--insertions', type=int, default=0, help='Postings inserted at the top mid-crawl')
+    parser.add_argument('--insert-after', type=int, default=2, help='Insert after this many page requests')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    site = FakeJobSite(pages=args.pages, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                       error_rate=args.error_rate, insertions=args.insertions,
+                       insert_after_requests=args.insert_after, port=args.port)
+    site.start()
+    print(f"Serving at {site.url} - set JOB_SITE_URL to this to crawl it (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Offline gazetteer of Taiwanese cities and districts
+Resolves free-text places (the listing's .place / 工作地址) to a district with
+approximate centre coordinates, without any geocoding service, and answers
+radius queries through a grid index. JobScraper uses it for distance-based
+location matching (HOME_LOCATION + MAX_DISTANCE_KM).
+
+Coverage: every city/county, every district of 臺北市, 新北市, 桃園市 and
+基隆市, and the main districts and county-administered towns elsewhere.
+Coordinates are approximate district centres (about ±1 km), which is plenty for
+commute-radius filtering. More places (e.g. MRT stations or hospitals) can be
+added from a JSON file: {"臺北市": {"古亭站": [25.0264, 121.5229]}}.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from search_index import normalize
+
+logger = logging.getLogger(__name__)
+
+# City/county → reference point (the city centre or county seat)
+CITY_CENTRES: Dict[str, Tuple[float, float]] = {
+    '臺北市': (25.0375, 121.5637), '新北市': (25.0120, 121.4650), '桃園市': (24.9936, 121.3010),
+    '臺中市': (24.1477, 120.6736), '臺南市': (22.9999, 120.2270), '高雄市': (22.6273, 120.3014),
+    '基隆市': (25.1276, 121.7392), '新竹市': (24.8138, 120.9675), '嘉義市': (23.4801, 120.4491),
+    '新竹縣': (24.8387, 121.0177), '苗栗縣': (24.5602, 120.8214), '彰化縣': (24.0810, 120.5380),
+    '南投縣': (23.9100, 120.6850), '雲林縣': (23.7092, 120.5431), '嘉義縣': (23.4589, 120.3328),
+    '屏東縣': (22.6690, 120.4880), '宜蘭縣': (24.7570, 121.7530), '花蓮縣': (23.9910, 121.6110),
+    '臺東縣': (22.7560, 121.1500), '澎湖縣': (23.5650, 119.5660), '金門縣': (24.4360, 118.3190),
+    '連江縣': (26.1600, 119.9510),
+}
+
+# City/county → district (or township) → approximate centre
+DISTRICTS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    '臺北市': {
+        '中正區': (25.0324, 121.5199), '大同區': (25.0633, 121.5130), '中山區': (25.0685, 121.5266),
+        '松山區': (25.0500, 121.5578), '大安區': (25.0265, 121.5436), '萬華區': (25.0286, 121.4979),
+        '信義區': (25.0330, 121.5654), '士林區': (25.0928, 121.5245), '北投區': (25.1321, 121.4987),
+        '內湖區': (25.0690, 121.5887), '南港區': (25.0550, 121.6066), '文山區': (24.9897, 121.5703),
+    },
+    '新北市': {
+        '板橋區': (25.0116, 121.4625), '三重區': (25.0616, 121.4880), '中和區': (24.9994, 121.4990),
+        '永和區': (25.0083, 121.5163), '新莊區': (25.0359, 121.4500), '新店區': (24.9675, 121.5410),
+        '樹林區': (24.9908, 121.4207), '鶯歌區': (24.9551, 121.3543), '三峽區': (24.9340, 121.3690),
+        '淡水區': (25.1696, 121.4410), '汐止區': (25.0665, 121.6560), '瑞芳區': (25.1088, 121.8060),
+        '土城區': (24.9722, 121.4433), '蘆洲區': (25.0855, 121.4737), '五股區': (25.0827, 121.4382),
+        '泰山區': (25.0590, 121.4310), '林口區': (25.0775, 121.3918), '深坑區': (25.0023, 121.6158),
+        '石碇區': (24.9916, 121.6584), '坪林區': (24.9374, 121.7113), '三芝區': (25.2580, 121.5010),
+        '石門區': (25.2904, 121.5685), '八里區': (25.1460, 121.3990), '平溪區': (25.0257, 121.7384),
+        '雙溪區': (25.0335, 121.8655), '貢寮區': (25.0223, 121.9085), '金山區': (25.2218, 121.6366),
+        '萬里區': (25.1793, 121.6890), '烏來區': (24.8650, 121.5505),
+    },
+    '桃園市': {
+        '桃園區': (24.9937, 121.3010), '中壢區': (24.9653, 121.2247), '大溪區': (24.8806, 121.2870),
+        '楊梅區': (24.9077, 121.1453), '蘆竹區': (25.0454, 121.2917), '大園區': (25.0640, 121.1960),
+        '龜山區': (24.9925, 121.3380), '八德區': (24.9286, 121.2847), '龍潭區': (24.8639, 121.2160),
+        '平鎮區': (24.9459, 121.2182), '新屋區': (24.9722, 121.1067), '觀音區': (25.0333, 121.0830),
+        '復興區': (24.8207, 121.3520),
+    },
+    '基隆市': {
+        '仁愛區': (25.1279, 121.7402), '信義區': (25.1290, 121.7510), '中正區': (25.1420, 121.7740),
+        '中山區': (25.1500, 121.7300), '安樂區': (25.1205, 121.7230), '暖暖區': (25.0995, 121.7400),
+        '七堵區': (25.0950, 121.7130),
+    },
+    '新竹市': {
+        '東區': (24.8010, 120.9690), '北區': (24.8160, 120.9600), '香山區': (24.7760, 120.9150),
+    },
+    '新竹縣': {
+        '竹北市': (24.8390, 121.0040), '竹東鎮': (24.7370, 121.0900), '湖口鄉': (24.9030, 121.0440),
+        '新豐鄉': (24.8990, 120.9840), '關西鎮': (24.7890, 121.1770), '新埔鎮': (24.8250, 121.0730),
+    },
+    '苗栗縣': {
+        '苗栗市': (24.5600, 120.8200), '頭份市': (24.6880, 120.9130), '竹南鎮': (24.6860, 120.8730),
+    },
+    '臺中市': {
+        '中區': (24.1417, 120.6800), '東區': (24.1367, 120.6970), '南區': (24.1213, 120.6626),
+        '西區': (24.1414, 120.6712), '北區': (24.1580, 120.6820), '西屯區': (24.1810, 120.6170),
+        '南屯區': (24.1380, 120.6160), '北屯區': (24.1830, 120.6860), '大里區': (24.0990, 120.6780),
+        '太平區': (24.1260, 120.7190), '豐原區': (24.2520, 120.7180), '清水區': (24.2680, 120.5590),
+        '大甲區': (24.3480, 120.6220), '沙鹿區': (24.2330, 120.5660), '烏日區': (24.1050, 120.6240),
+    },
+    '彰化縣': {
+        '彰化市': (24.0810, 120.5380), '員林市': (23.9590, 120.5740),
+    },
+    '南投縣': {'南投市': (23.9100, 120.6850)},
+    '雲林縣': {'斗六市': (23.7110, 120.5430), '虎尾鎮': (23.7080, 120.4320)},
+    '嘉義縣': {'太保市': (23.4590, 120.3330), '朴子市': (23.4650, 120.2470)},
+    '嘉義市': {'東區': (23.4800, 120.4580), '西區': (23.4800, 120.4330)},
+    '臺南市': {
+        '東區': (22.9800, 120.2240), '中西區': (22.9920, 120.1970), '北區': (23.0070, 120.2100),
+        '南區': (22.9600, 120.1890), '安平區': (23.0000, 120.1660), '安南區': (23.0470, 120.1850),
+        '永康區': (23.0260, 120.2570), '新營區': (23.3100, 120.3160),
+    },
+    '高雄市': {
+        '鼓山區': (22.6500, 120.2730), '前鎮區': (22.5950, 120.3140), '苓雅區': (22.6220, 120.3120),
+        '三民區': (22.6470, 120.3000), '左營區': (22.6900, 120.2940), '鳳山區': (22.6270, 120.3570),
+        '新興區': (22.6310, 120.3090), '前金區': (22.6270, 120.2940), '楠梓區': (22.7280, 120.3260),
+    },
+    '屏東縣': {
+        '屏東市': (22.6690, 120.4880), '潮州鎮': (22.5500, 120.5420), '內埔鄉': (22.6120, 120.5670),
+        '恆春鎮': (22.0020, 120.7440),
+    },
+    '宜蘭縣': {'宜蘭市': (24.7570, 121.7530), '羅東鎮': (24.6770, 121.7670), '蘇澳鎮': (24.5950, 121.8510)},
+    '花蓮縣': {'花蓮市': (23.9910, 121.6110), '玉里鎮': (23.3360, 121.3160)},
+    '臺東縣': {'臺東市': (22.7560, 121.1500)},
+    '澎湖縣': {'馬公市': (23.5650, 119.5660)},
+}
+
+# A bare district name followed by one of these is a street (中正路, 信義路), not a place
+_STREET_SUFFIXES = set('路街道巷')
+
+_COORDINATES_PATTERN = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+# Match priorities: "city + district" beats a district name, which beats a
+# district name without its 區/市/鎮/鄉 suffix; a city alone is the fallback
+_CITY_DISTRICT, _DISTRICT, _CITY, _SHORT_DISTRICT = 3, 2, 1, 0
+
+
+class Place(NamedTuple):
+    """A resolved place; district is '' when only the city is known"""
+    city: str
+    district: str
+    lat: float
+    lon: float
+
+    @property
+    def name(self) -> str:
+        return self.city + self.district
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class Gazetteer:
+    """Name lookup (longest match) and grid-indexed radius queries over the bundled places"""
+
+    # Grid cell size in degrees (about 11 km)
+    CELL_DEGREES = 0.1
+
+    def __init__(self, extra_places: Optional[Path] = None):
+        """
+        Args:
+            extra_places: Optional JSON file of additional places, {city: {name: [lat, lon]}}
+        """
+        districts = {city: dict(places) for city, places in DISTRICTS.items()}
+        if extra_places:
+            with open(extra_places, 'r', encoding='utf-8') as f:
+                for city, places in json.load(f).items():
+                    city = normalize(city)
+                    if city not in CITY_CENTRES:
+                        logger.warning(f"Gazetteer: unknown city '{city}' in {extra_places}, skipped")
+                        continue
+                    districts.setdefault(city, {}).update({normalize(n): tuple(c) for n, c in places.items()})
+
+        self.cities = {city: Place(city, '', *centre) for city, centre in CITY_CENTRES.items()}
+        self.places: List[Place] = [Place(city, district, *centre)
+                                    for city, places in districts.items() for district, centre in places.items()]
+        self.cities_with_districts: Set[str] = set(districts)
+
+        # Normalized name → (priority, candidate places)
+        self._names: Dict[str, Tuple[int, List[Place]]] = {}
+        for place in self.cities.values():
+            self._add_name(place.city, _CITY, place)
+            self._add_name(place.city[:-1], _CITY, place)
+        for place in self.places:
+            self._add_name(place.city + place.district, _CITY_DISTRICT, place)
+            self._add_name(place.city[:-1] + place.district, _CITY_DISTRICT, place)
+            self._add_name(place.district, _DISTRICT, place)
+            self._add_name(place.district[:-1], _SHORT_DISTRICT, place)
+        self._max_name_length = max(len(name) for name in self._names)
+
+        self._grid: Dict[Tuple[int, int], List[Place]] = {}
+        for place in [*self.places, *self.cities.values()]:
+            self._grid.setdefault(self._cell(place.lat, place.lon), []).append(place)
+
+        self._cache: Dict[str, Optional[Place]] = {}
+
+    def _add_name(self, name: str, priority: int, place: Place):
+        if len(name) < 2:
+            return
+        existing = self._names.get(name)
+        if existing is None or existing[0] < priority:
+            self._names[name] = (priority, [place])
+        elif existing[0] == priority and place not in existing[1]:
+            existing[1].append(place)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.CELL_DEGREES)), int(math.floor(lon / self.CELL_DEGREES))
+
+    def _matches(self, text: str) -> Iterable[Tuple[int, int, List[Place]]]:
+        """Yield (priority, position, candidates) for the longest name starting at each position"""
+        position = 0
+        while position < len(text):
+            for length in range(min(self._max_name_length, len(text) - position), 1, -1):
+                entry = self._names.get(text[position:position + length])
+                if entry is None:
+                    continue
+                priority, candidates = entry
+                end = position + length
+                if priority == _SHORT_DISTRICT and end < len(text) and text[end] in _STREET_SUFFIXES:
+                    continue
+                yield priority, position, candidates
+                position = end - 1
+                break
+            position += 1
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """
+        Resolve a free-text place or address to the most specific known place
+
+        Results are cached per text, so repeated places cost one dict lookup.
+
+        Returns:
+            The district (or only the city), or None if nothing is recognised
+            or a bare district name is ambiguous (e.g. 信義區 without a city)
+        """
+        if text in self._cache:
+            return self._cache[text]
+
+        matches = sorted(self._matches(''.join(normalize(text).split())), key=lambda m: (-m[0], m[1]))
+        mentioned_cities = {place.city for priority, _, candidates in matches
+                            if priority in (_CITY_DISTRICT, _CITY) for place in candidates}
+        resolved = None
+        # Prefer any district that is unambiguous (within the mentioned cities, if any)
+        for priority, _, candidates in matches:
+            if priority == _CITY:
+                continue
+            if mentioned_cities:
+                candidates = [place for place in candidates if place.city in mentioned_cities]
+            if len(candidates) == 1:
+                resolved = candidates[0]
+                break
+        # Otherwise settle for the city (新竹 alone is ambiguous: 新竹市 or 新竹縣)
+        if resolved is None and len(mentioned_cities) == 1:
+            resolved = self.cities[mentioned_cities.pop()]
+
+        self._cache[text] = resolved
+        return resolved
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Place]:
+        """Return all places whose centre lies within radius_km of (lat, lon)"""
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        min_cell = self._cell(lat - lat_span, lon - lon_span)
+        max_cell = self._cell(lat + lat_span, lon + lon_span)
+
+        found = []
+        for row in range(min_cell[0], max_cell[0] + 1):
+            for column in range(min_cell[1], max_cell[1] + 1):
+                for place in self._grid.get((row, column), ()):
+                    if haversine_km(lat, lon, place.lat, place.lon) <= radius_km:
+                        found.append(place)
+        return found
+
+    def locate(self, text: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for 'lat,lon' or a place name"""
+        coordinates = _COORDINATES_PATTERN.match(text)
+        if coordinates:
+            return float(coordinates.group(1)), float(coordinates.group(2))
+        place = self.resolve(text)
+        return (place.lat, place.lon) if place else None
+
+
+class DistanceFilter:
+    """Matches postings whose place lies within a radius of a home location"""
+
+    def __init__(self, home: str, radius_km: float, gazetteer: Optional[Gazetteer] = None):
+        """
+        Args:
+            home: Place name (e.g. '臺北市大安區') or 'lat,lon'
+            radius_km: Maximum straight-line distance
+            gazetteer: Gazetteer to resolve places with (default: the bundled one)
+        """
+        self.gazetteer = gazetteer or Gazetteer()
+        centre = self.gazetteer.locate(home)
+        if centre is None:
+            raise ValueError(f"Unknown home location '{home}' (use a city/district name or 'lat,lon')")
+        self.home = home
+        self.radius_km = radius_km
+        # Radius query runs once; each posting is then a cached resolve plus a set lookup
+        self.nearby: Set[Place] = set(self.gazetteer.within(*centre, radius_km))
+        logger.info(f"Distance filter: {len(self.nearby)} places within {radius_km:g} km of {home}")
+
+    @classmethod
+    def from_env(cls) -> Optional['DistanceFilter']:
+        """
+        Build the filter from HOME_LOCATION, MAX_DISTANCE_KM and GAZETTEER_EXTRA_FILE
+
+        Returns:
+            The filter, or None if HOME_LOCATION isn't set
+        """
+        home = os.getenv('HOME_LOCATION')
+        if not home:
+            return None
+        extra_places = os.getenv('GAZETTEER_EXTRA_FILE')
+        return cls(home, float(os.getenv('MAX_DISTANCE_KM', '10')),
+                   gazetteer=Gazetteer(Path(extra_places) if extra_places else None))
+
+    def matches(self, text: str) -> Optional[bool]:
+        """
+        Whether a posting's place is within the radius
+
+        Returns:
+            True/False, or None if the place can't be resolved precisely enough
+            (unknown, or only a city that has district data)
+        """
+        place = self.gazetteer.resolve(text)
+        if place is None or (not place.district and place.city in self.gazetteer.cities_with_districts):
+            return None
+        return place in self.nearby
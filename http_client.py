@@ -0,0 +1,99 @@
+"""
+Shared HTTP client for outbound API calls (Telegram, Google Translate)
+Keeps connections alive between requests so each call skips the TCP/TLS handshake
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when no explicit configuration is given
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+
+def _http2_available() -> bool:
+    """Return True if the optional 'h2' package needed for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _record_response(response: httpx.Response):
+    """Response hook counting requests and bytes per host (installed only with metrics enabled)"""
+    await response.aread()
+    host = response.request.url.host
+    metrics.inc('http_requests_total', host=host, status=response.status_code)
+    metrics.inc('http_response_bytes_total', len(response.content), host=host)
+    try:
+        metrics.inc('http_request_bytes_total', len(response.request.content), host=host)
+    except httpx.RequestNotRead:
+        # Streamed uploads (e.g. sendDocument files) aren't buffered on the request
+        pass
+
+
+def create_http_client(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+    http2: bool = False,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> httpx.AsyncClient:
+    """
+    Create a long-lived pooled client shared by the translator and notifier
+
+    The returned client is an async context manager: open it once at startup
+    with ``async with`` and it is closed (with all pooled connections) on exit.
+
+    Args:
+        max_connections: Maximum number of concurrent connections
+        max_keepalive: Maximum number of idle connections kept alive
+        http2: Enable HTTP/2 (requires the optional 'h2' package)
+        timeout: Read/write/pool timeout in seconds
+
+    Returns:
+        Configured httpx.AsyncClient
+    """
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but 'h2' is not installed (pip install httpx[http2]); using HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+    )
+    timeouts = httpx.Timeout(timeout, connect=min(timeout, DEFAULT_CONNECT_TIMEOUT))
+
+    logger.debug(
+        f"Creating shared HTTP client (max_connections={max_connections}, "
+        f"max_keepalive={max_keepalive}, http2={http2}, timeout={timeout}s)"
+    )
+    event_hooks = {'response': [_record_response]} if metrics.enabled else None
+    return httpx.AsyncClient(limits=limits, timeout=timeouts, http2=http2, event_hooks=event_hooks)
+
+
+@asynccontextmanager
+async def client_or_temporary(client: Optional[httpx.AsyncClient]) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yield the shared client if one was provided, otherwise a temporary one
+
+    Lets TelegramNotifier and JobTranslator keep working when used standalone
+    (e.g. from scripts) without a shared client.
+    """
+    if client is not None:
+        yield client
+        return
+
+    async with create_http_client() as temporary_client:
+        yield temporary_client
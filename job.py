@@ -0,0 +1,150 @@
+"""
+Compact job posting record
+A slotted `Job` replaces the free-form dict per posting. It still supports the
+read-only mapping access the formatters use (job['id'], job.get('title_en')),
+and to_dict() gives the plain dict used for JSON output.
+"""
+
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from salary import Salary, parse_salary
+
+# Fields whose values repeat across postings and are interned (stored once)
+_INTERNED_FIELDS = ('location', 'organization', 'start_date', 'employment_type', 'salary', 'url')
+
+
+class Job:
+    """One scraped job posting
+
+    `full_text` (the lowercased item text used by filters) is computed from
+    `text` the first time a filter reads it and then kept. English translations are not
+    copied into the job: `translations` points at the translator's shared
+    source-text → English table, and `<field>_en` keys are looked up in it.
+    """
+
+    __slots__ = (
+        'title', 'text', 'location', 'organization', 'start_date', 'employment_type', 'salary',
+        'url', 'id', 'posting_key', 'page_number', 'listing_position', 'translations', 'pay',
+        '_full_text',
+    )
+
+    # Keys in to_dict() order (matches the dicts produced before Job existed)
+    FIELDS = (
+        'title', 'full_text', 'location', 'organization', 'start_date', 'employment_type', 'salary',
+        'url', 'id', 'posting_key', 'page_number', 'listing_position', 'pay',
+    )
+
+    # Fields that may have an `<field>_en` translation
+    TRANSLATED_FIELDS = ('title', 'location', 'organization', 'employment_type', 'salary')
+
+    def __init__(self, title: str, text: str, id: str, posting_key: str = '', location: str = '',
+                 organization: str = '', start_date: str = '', employment_type: str = '', salary: str = '',
+                 url: str = '', page_number: Optional[int] = None, listing_position: Optional[int] = None,
+                 translations: Optional[Dict[str, str]] = None, pay: Optional[Salary] = None):
+        """
+        Args:
+            title: Posting title
+            text: Full item text (original case); full_text is text.lower()
+            id: Hash of all fields (see JobScraper._generate_job_id)
+            posting_key: Identity of the posting across revisions
+            translations: Shared table mapping source text to English
+            pay: Parsed salary (default: parsed from `salary`)
+        """
+        self.title = title
+        self.text = text
+        self._full_text = None
+        self.id = id
+        self.posting_key = posting_key
+        self.location = sys.intern(location)
+        self.organization = sys.intern(organization)
+        self.start_date = sys.intern(start_date)
+        self.employment_type = sys.intern(employment_type)
+        self.salary = sys.intern(salary)
+        self.url = sys.intern(url)
+        self.page_number = page_number
+        self.listing_position = listing_position
+        self.translations = translations
+        self.pay = pay if pay is not None else parse_salary(salary)
+
+    @property
+    def full_text(self) -> str:
+        """Lowercased item text, computed when a filter first needs it"""
+        if self._full_text is None:
+            self._full_text = self.text.lower()
+        return self._full_text
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        """Build a Job from a job dict (e.g. loaded from extracted_jobs.json)"""
+        pay = data.get('pay')
+        return cls(
+            title=data.get('title', ''),
+            text=data.get('text', data.get('full_text', '')),
+            id=data.get('id', ''),
+            posting_key=data.get('posting_key', ''),
+            **{field: data.get(field, '') for field in _INTERNED_FIELDS},
+            page_number=data.get('page_number'),
+            listing_position=data.get('listing_position'),
+            pay=Salary(**pay) if pay else None,
+        )
+
+    def translation(self, field: str) -> Optional[str]:
+        """Return the English translation of a field, if it has been translated"""
+        if self.translations is None:
+            return None
+        return self.translations.get(getattr(self, field))
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if key.endswith('_en') and key[:-3] in self.TRANSLATED_FIELDS:
+            translated = self.translation(key[:-3])
+            if translated is not None:
+                return translated
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__ or key.startswith('_'):
+            raise KeyError(key)
+        setattr(self, key, value)
+        if key == 'text':
+            self._full_text = None
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            yield key
+        for field in self.TRANSLATED_FIELDS:
+            if self.translation(field) is not None:
+                yield f'{field}_en'
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self.keys():
+            yield key, self[key]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain, JSON-ready dict with the keys the scraper used to produce, `pay` (as a dict) and any *_en"""
+        data = dict(self.items())
+        data['pay'] = self.pay._asdict()
+        return data
+
+    def __repr__(self) -> str:
+        return f"Job(id={self.id!r}, title={self.title!r}, location={self.location!r})"
+
+
+def job_to_dict(job) -> Dict[str, Any]:
+    """Return a plain dict for a Job or an existing job dict"""
+    return job.to_dict() if isinstance(job, Job) else dict(job)
@@ -0,0 +1,349 @@
+"""
+Columnar job history for vectorized filtering
+Every posting ever seen is kept as NumPy columns (categorical location codes,
+datetime64 dates, normalized salary, keyword bitmasks) in data/job_history.npz,
+so filter criteria can be re-evaluated over the whole history with a few
+array operations, e.g. to see which past postings new rules would match.
+
+NumPy is an optional dependency (pip install numpy); without it no history
+is recorded and --history is unavailable.
+"""
+
+import io
+import logging
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from atomic_io import atomic_write_bytes
+from salary import Salary, salary_of
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_DATE_PATTERN = re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+_DEADLINE_PATTERN = re.compile(r'截止公告\s*(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+
+
+def numpy_available() -> bool:
+    """Return True if the optional 'numpy' package is installed"""
+    return np is not None
+
+
+def _iso_date(match) -> Optional[str]:
+    """Turn a (year, month, day) regex match into 'YYYY-MM-DD', or None if invalid"""
+    if not match:
+        return None
+    try:
+        return date(*(int(group) for group in match.groups()[-3:])).isoformat()
+    except ValueError:
+        # Includes the 0000-00-00 placeholder the site uses for empty dates
+        return None
+
+
+class JobTable:
+    """Column arrays for many postings plus the lookup tables their codes refer to"""
+
+    HISTORY_FILE = Path("data/job_history.npz")
+
+    # Titles are stored as fixed-width strings, truncated to this length
+    TITLE_LENGTH = 60
+
+    # Keywords recorded as one bit each (at most 64); criteria can only test these
+    KEYWORDS = (
+        '小兒', '小兒自費', 'pediatric', '兒童', '早療', '長照', '精神', '生理', '居家',
+        '兼職', '部分工時', '研究助理',
+    )
+
+    COLUMNS = (
+        'ids', 'posting_keys', 'titles', 'location_codes', 'start_dates', 'deadlines',
+        'salary_min', 'salary_max', 'salary_periods', 'salary_negotiable', 'keyword_bits', 'first_seen',
+    )
+
+    # Multiplier turning each salary period (index into Salary.PERIODS) into monthly pay;
+    # NaN where there is no monthly equivalent (unknown, per session)
+    MONTHLY_FACTORS = {'month': 1.0, 'hour': float(Salary.HOURS_PER_MONTH), 'year': 1 / 12}
+
+    def __init__(self, columns: Dict, locations: List[str], keywords: Sequence[str]):
+        """
+        Args:
+            columns: One array per name in COLUMNS, all the same length
+            locations: Location strings, indexed by location_codes
+            keywords: Keywords, bit i of keyword_bits is keywords[i]
+        """
+        if np is None:
+            raise ImportError("JobTable requires numpy (pip install numpy)")
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.locations = list(locations)
+        self.keywords = tuple(keywords)
+        self._location_index = {location: code for code, location in enumerate(self.locations)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_jobs(cls, jobs: Iterable, keywords: Sequence[str] = KEYWORDS,
+                  seen_at: Optional[datetime] = None) -> 'JobTable':
+        """
+        Build a table from Job records (or job dicts)
+
+        Args:
+            jobs: Parsed jobs
+            keywords: Keywords to record as bits
+            seen_at: First-seen time recorded for these jobs (default: now)
+        """
+        if np is None:
+            raise ImportError("JobTable requires numpy (pip install numpy)")
+        if len(keywords) > 64:
+            raise ValueError("JobTable supports at most 64 keywords")
+
+        locations: List[str] = []
+        location_index: Dict[str, int] = {}
+        ids, posting_keys, titles, codes = [], [], [], []
+        start_dates, deadlines, keyword_bits = [], [], []
+        salary_min, salary_max, salary_periods, salary_negotiable = [], [], [], []
+        lowered_keywords = [keyword.lower() for keyword in keywords]
+
+        for job in jobs:
+            text = job['full_text']
+            location = job['location']
+            if location not in location_index:
+                location_index[location] = len(locations)
+                locations.append(location)
+
+            pay = salary_of(job)
+            bits = 0
+            for bit, keyword in enumerate(lowered_keywords):
+                if keyword in text:
+                    bits |= 1 << bit
+
+            ids.append(job['id'])
+            posting_keys.append(job.get('posting_key', ''))
+            titles.append(job['title'][:cls.TITLE_LENGTH])
+            codes.append(location_index[location])
+            start_dates.append(_iso_date(_DATE_PATTERN.search(job['start_date'] or '')))
+            deadlines.append(_iso_date(_DEADLINE_PATTERN.search(text)))
+            salary_min.append(pay.minimum if pay.minimum is not None else -1)
+            salary_max.append(pay.maximum if pay.maximum is not None else -1)
+            salary_periods.append(Salary.PERIODS.index(pay.period))
+            salary_negotiable.append(pay.negotiable)
+            keyword_bits.append(bits)
+
+        seen_at = np.datetime64((seen_at or datetime.now()).replace(microsecond=0), 's')
+        columns = {
+            'ids': np.array(ids, dtype='U16'),
+            'posting_keys': np.array(posting_keys, dtype='U16'),
+            'titles': np.array(titles, dtype=f'U{cls.TITLE_LENGTH}'),
+            'location_codes': np.array(codes, dtype=np.int32),
+            # None becomes NaT
+            'start_dates': np.array(start_dates, dtype='datetime64[D]'),
+            'deadlines': np.array(deadlines, dtype='datetime64[D]'),
+            # -1 = unknown (salary_max: also open-ended, e.g. 45,000以上)
+            'salary_min': np.array(salary_min, dtype=np.int64),
+            'salary_max': np.array(salary_max, dtype=np.int64),
+            'salary_periods': np.array(salary_periods, dtype=np.int8),
+            'salary_negotiable': np.array(salary_negotiable, dtype=bool),
+            'keyword_bits': np.array(keyword_bits, dtype=np.uint64),
+            'first_seen': np.full(len(ids), seen_at, dtype='datetime64[s]'),
+        }
+        return cls(columns, locations, keywords)
+
+    @classmethod
+    def load(cls, path: Path = HISTORY_FILE) -> 'JobTable':
+        """Load a table saved with save() (an empty table if the file doesn't exist)"""
+        if not Path(path).exists():
+            return cls.from_jobs([])
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in cls.COLUMNS if name in data}
+            if 'salaries' in data:
+                # Histories written before salaries were normalized: one monthly amount
+                salaries = data['salaries']
+                columns['salary_min'] = salaries
+                columns['salary_max'] = salaries.copy()
+                columns['salary_periods'] = np.where(salaries >= 0, Salary.PERIODS.index('month'), 0).astype(np.int8)
+                columns['salary_negotiable'] = np.zeros(len(salaries), dtype=bool)
+            return cls(columns, data['locations'].tolist(), data['keywords'].tolist())
+
+    def save(self, path: Path = HISTORY_FILE):
+        """Save as a compressed .npz file (written atomically)"""
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            locations=np.array(self.locations, dtype=str),
+            keywords=np.array(self.keywords, dtype=str),
+            **{name: getattr(self, name) for name in self.COLUMNS},
+        )
+        atomic_write_bytes(path, buffer.getvalue())
+
+    def merge(self, other: 'JobTable') -> int:
+        """
+        Append rows of `other` whose IDs aren't in this table yet
+
+        Returns:
+            Number of rows added
+        """
+        if other.keywords != self.keywords:
+            raise ValueError("Cannot merge job tables with different keyword sets")
+
+        new = ~np.isin(other.ids, self.ids)
+        added = int(new.sum())
+        if not added:
+            return 0
+
+        # Translate other's location codes into this table's codes
+        for location in other.locations:
+            if location not in self._location_index:
+                self._location_index[location] = len(self.locations)
+                self.locations.append(location)
+        remap = np.array([self._location_index[location] for location in other.locations], dtype=np.int32)
+
+        for name in self.COLUMNS:
+            values = getattr(other, name)[new]
+            if name == 'location_codes':
+                values = remap[values]
+            setattr(self, name, np.concatenate([getattr(self, name), values]))
+        return added
+
+    # Vectorized criteria - each returns a boolean mask over all rows
+
+    def location_mask(self, targets: Iterable[str], distance_filter=None) -> 'np.ndarray':
+        """
+        Rows whose location contains any of `targets` (case-insensitive substring)
+
+        With a gazetteer.DistanceFilter, locations it can resolve match by
+        distance instead, like JobScraper._location_matches.
+        """
+        targets = [target.lower() for target in targets]
+
+        def _matches(location: str) -> bool:
+            if distance_filter is not None:
+                within = distance_filter.matches(location)
+                if within is not None:
+                    return within
+            return any(t in location.lower() for t in targets)
+
+        # Evaluate once per distinct location, then broadcast through the codes
+        matching = np.array([_matches(location) for location in self.locations], dtype=bool)
+        if not len(matching):
+            return np.zeros(len(self), dtype=bool)
+        return matching[self.location_codes]
+
+    def keyword_mask(self, keywords: Iterable[str]) -> 'np.ndarray':
+        """Rows containing any of `keywords`"""
+        bits = 0
+        for keyword in keywords:
+            if keyword not in self.keywords:
+                raise KeyError(f"Keyword '{keyword}' is not tracked in the job table (see JobTable.KEYWORDS)")
+            bits |= 1 << self.keywords.index(keyword)
+        return (self.keyword_bits & np.uint64(bits)) != 0
+
+    def date_mask(self, column: str, start: Optional[date] = None, end: Optional[date] = None) -> 'np.ndarray':
+        """Rows whose date column ('start_dates' or 'deadlines') is set and within [start, end]"""
+        values = getattr(self, column)
+        mask = ~np.isnat(values)
+        if start is not None:
+            mask &= values >= np.datetime64(start, 'D')
+        if end is not None:
+            mask &= values <= np.datetime64(end, 'D')
+        return mask
+
+    def monthly_pay(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Salary range of every row as monthly NTD (float arrays)
+
+        Returns:
+            (low, high); NaN where unknown or paid per session, high is +inf when open-ended
+        """
+        factors = np.array([self.MONTHLY_FACTORS.get(period, np.nan) for period in Salary.PERIODS])
+        factor = factors[self.salary_periods]
+        low = np.where(self.salary_min >= 0, self.salary_min * factor, np.nan)
+        high = np.where(self.salary_max >= 0, self.salary_max * factor, np.inf)
+        high[np.isnan(low)] = np.nan
+        return low, high
+
+    def salary_mask(self, minimum: Optional[int] = None, maximum: Optional[int] = None) -> 'np.ndarray':
+        """Rows with a known monthly(-equivalent) salary range overlapping [minimum, maximum]"""
+        low, high = self.monthly_pay()
+        mask = ~np.isnan(low)
+        if minimum is not None:
+            mask &= high >= minimum
+        if maximum is not None:
+            mask &= low <= maximum
+        return mask
+
+    def criteria_mask(self, locations: Iterable[str], exclude_keywords: Iterable[str],
+                      start_min: Optional[date], start_max: Optional[date],
+                      min_monthly_salary: Optional[int] = None, distance_filter=None) -> 'np.ndarray':
+        """
+        The same criteria as JobScraper.filter_jobs (without the seen-job check)
+
+        Pass the scraper's distance_filter (see gazetteer.DistanceFilter) when
+        HOME_LOCATION is set, or locations are only matched against `locations`.
+        """
+        mask = (
+            self.location_mask(locations, distance_filter)
+            & ~self.keyword_mask(exclude_keywords)
+            & self.date_mask('start_dates', start_min, start_max)
+        )
+        if min_monthly_salary is not None:
+            # Like filter_jobs, postings without a comparable salary are kept
+            low, _ = self.monthly_pay()
+            mask &= self.salary_mask(minimum=min_monthly_salary) | np.isnan(low)
+        return mask
+
+    def _salary(self, i: int) -> Salary:
+        return Salary(
+            Salary.PERIODS[self.salary_periods[i]],
+            int(self.salary_min[i]) if self.salary_min[i] >= 0 else None,
+            int(self.salary_max[i]) if self.salary_max[i] >= 0 else None,
+            bool(self.salary_negotiable[i]),
+        )
+
+    def rows(self, mask: 'np.ndarray', limit: Optional[int] = None, sort_by_pay: bool = False) -> List[Dict]:
+        """Return the selected rows as plain dicts (newest first, or best paid first)"""
+        indices = np.flatnonzero(mask)[::-1]
+        if sort_by_pay:
+            low, high = self.monthly_pay()
+            # Best-case pay, highest first; open-ended ranges rank by their minimum, unknown last
+            best = np.where(np.isinf(high), low, high)[indices]
+            indices = indices[np.argsort(np.nan_to_num(-best, nan=np.inf), kind='stable')]
+        indices = indices[:limit]
+
+        def _date(value) -> str:
+            return '' if np.isnat(value) else str(value)
+
+        return [
+            {
+                'id': str(self.ids[i]),
+                'title': str(self.titles[i]),
+                'location': self.locations[self.location_codes[i]],
+                'start_date': _date(self.start_dates[i]),
+                'deadline': _date(self.deadlines[i]),
+                'salary': self._salary(i).describe(),
+                'first_seen': str(self.first_seen[i]),
+            }
+            for i in indices
+        ]
+
+
+def update_job_history(jobs: List, path: Path = JobTable.HISTORY_FILE) -> Optional[int]:
+    """
+    Add newly seen postings to the on-disk history (blocking; run it off the event loop)
+
+    Returns:
+        Number of postings added, or None if numpy isn't installed
+    """
+    if np is None:
+        return None
+    history = JobTable.load(path)
+    added = history.merge(JobTable.from_jobs(jobs, keywords=history.keywords))
+    if added:
+        history.save(path)
+        logger.info(f"Job history: added {added} postings ({len(history)} total)")
+    return added
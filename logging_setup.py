@@ -0,0 +1,63 @@
+"""
+Logging configuration
+Log records are handed to a queue and written by a background listener
+thread, so logging never blocks the event loop on disk I/O. The log file is
+rotated by size (default) or by time.
+"""
+
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from pathlib import Path
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+DEFAULT_LOG_FILE = Path("job_monitor.log")
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+
+def setup_logging(log_file: Path = DEFAULT_LOG_FILE, max_bytes: int = DEFAULT_MAX_BYTES,
+                  backup_count: int = DEFAULT_BACKUP_COUNT, rotate_when: Optional[str] = None,
+                  level: int = logging.INFO) -> QueueListener:
+    """
+    Route all logging through a queue to a rotating file and stdout
+
+    Replaces any handlers already on the root logger.
+
+    Args:
+        log_file: Log file path
+        max_bytes: Rotate when the file reaches this size (ignored with rotate_when)
+        backup_count: Rotated files to keep
+        rotate_when: Rotate by time instead, e.g. 'midnight' or 'H'
+                     (see logging.handlers.TimedRotatingFileHandler)
+        level: Root log level
+
+    Returns:
+        The started listener; call stop() on exit to flush remaining records
+    """
+    if rotate_when:
+        file_handler = TimedRotatingFileHandler(log_file, when=rotate_when, backupCount=backup_count,
+                                                encoding='utf-8')
+    else:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding='utf-8')
+    stream_handler = logging.StreamHandler(sys.stdout)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    return listener
@@ -8,25 +8,39 @@ import os
 import sys
 from pathlib import Path
 import argparse
+import json
+import time
+from datetime import date
+
+# Heavy modules (Playwright, BeautifulSoup, httpx, APScheduler) are imported
+# inside the code paths that use them, so e.g. --help and --schedule start fast
+from metrics import metrics
+from logging_setup import setup_logging
 
-from scraper import JobScraper
-from telegram_notifier import TelegramNotifier
-from scheduler import JobScheduler
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('job_monitor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
-def load_config():
-    """Load configuration from environment variables"""
+def configure_logging():
+    """Send logs through a background writer to a rotating job_monitor.log and stdout"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    return setup_logging(
+        log_file=Path(os.getenv('LOG_FILE', 'job_monitor.log')),
+        max_bytes=int(float(os.getenv('LOG_MAX_MB', '5')) * 1024 * 1024),
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+        rotate_when=os.getenv('LOG_ROTATE_WHEN') or None,
+    )
+
+
+def load_config(require_telegram: bool = True):
+    """
+    Load configuration from environment variables
+
+    Args:
+        require_telegram: Fail if the Telegram bot token or chat ID is missing
+                          (modes that send nothing don't need them)
+    """
     # Load from .env file if it exists
     from dotenv import load_dotenv
     load_dotenv()
@@ -34,8 +48,34 @@ def load_config():
     bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
     chat_id = os.getenv('TELEGRAM_CHAT_ID')
     check_interval = int(os.getenv('CHECK_INTERVAL_MINUTES', '30'))
+    check_jitter = int(os.getenv('CHECK_JITTER_SECONDS', '60'))
+
+    # Adaptive polling (daemon mode): space checks by observed posting arrival rate
+    schedule_config = {
+        'adaptive': os.getenv('ADAPTIVE_SCHEDULE', 'false').lower() in ('1', 'true', 'yes'),
+        'min_interval': int(os.getenv('CHECK_INTERVAL_MIN_MINUTES', '10')),
+        'max_interval': int(os.getenv('CHECK_INTERVAL_MAX_MINUTES', '120')),
+        'half_life_days': float(os.getenv('ARRIVAL_HALF_LIFE_DAYS', '28')),
+    }
 
-    if not bot_token or not chat_id:
+    # Reuse a successful Telegram getMe check for this long (0 = check every run)
+    probe_ttl = float(os.getenv('TELEGRAM_PROBE_TTL_SECONDS', '21600'))
+
+    # Per-run timing/resource metrics (JSON summary + Prometheus text file)
+    metrics_config = {
+        'enabled': os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+        'directory': Path(os.getenv('METRICS_DIR', 'metrics')),
+    }
+
+    # Shared HTTP client pool settings (Telegram + translation)
+    http_config = {
+        'max_connections': int(os.getenv('HTTP_MAX_CONNECTIONS', '20')),
+        'max_keepalive': int(os.getenv('HTTP_MAX_KEEPALIVE', '10')),
+        'http2': os.getenv('HTTP2_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+        'timeout': float(os.getenv('HTTP_TIMEOUT_SECONDS', '10')),
+    }
+
+    if require_telegram and (not bot_token or not chat_id):
         raise ValueError(
             "Missing required environment variables:\n"
             "  - TELEGRAM_BOT_TOKEN\n"
@@ -43,20 +83,132 @@ def load_config():
             "Set these in a .env file or as environment variables"
         )
 
+    # Telegram delivery settings (rate limit defaults match Telegram's documented limits)
+    telegram_config = {
+        'workers': int(os.getenv('TELEGRAM_WORKERS', '4')),
+        'per_chat_rate': float(os.getenv('TELEGRAM_PER_CHAT_RATE', '1.0')),
+        'per_chat_burst': int(os.getenv('TELEGRAM_PER_CHAT_BURST', '3')),
+        'global_rate': float(os.getenv('TELEGRAM_GLOBAL_RATE', '30')),
+        'max_retries': int(os.getenv('TELEGRAM_MAX_RETRIES', '5')),
+        # Pack several jobs into each message (digest mode)
+        'pack_messages': os.getenv('TELEGRAM_PACK_MESSAGES', 'false').lower() in ('1', 'true', 'yes'),
+        'combine_languages': os.getenv('TELEGRAM_COMBINE_LANGUAGES', 'false').lower() in ('1', 'true', 'yes'),
+    }
+
     return {
         'bot_token': bot_token,
         'chat_id': chat_id,
-        'check_interval': check_interval
+        'check_interval': check_interval,
+        'check_jitter': check_jitter,
+        'probe_ttl': probe_ttl,
+        'schedule': schedule_config,
+        'metrics': metrics_config,
+        'http': http_config,
+        'telegram': telegram_config
     }
 
 
-async def test_mode(bot_token: str, chat_id: str, debug: bool = True):
-    """Test mode: scrape and send ALL jobs with debug details for inspection"""
+def build_arrival_model(config):
+    """Create the arrival-rate model from the schedule configuration"""
+    from arrival_model import ArrivalRateModel
+    schedule = config['schedule']
+    return ArrivalRateModel(
+        base_interval_minutes=config['check_interval'],
+        min_interval_minutes=schedule['min_interval'],
+        max_interval_minutes=schedule['max_interval'],
+        half_life_days=schedule['half_life_days'],
+    )
+
+
+async def prepare_scraper(debug: bool):
+    """Create the scraper and launch its browser
+
+    The seen-job store is loaded on a worker thread, so this can run
+    concurrently with the Telegram connection check.
+    """
+    from scraper import JobScraper
+    loop = asyncio.get_running_loop()
+    scraper = await loop.run_in_executor(None, JobScraper, debug)
+    await scraper.start_browser()
+    return scraper
+
+
+def show_history_matches(limit: int = 50, min_pay=None, sort_by_pay: bool = False):
+    """Print past postings that match the current filter criteria (vectorized over the history)
+
+    Args:
+        limit: Maximum postings to print
+        min_pay: Minimum monthly pay (default: JobScraper.TARGET_MIN_MONTHLY_SALARY)
+        sort_by_pay: List the best paid postings first instead of the newest
+    """
+    from gazetteer import DistanceFilter
+    from job_table import JobTable, numpy_available
+    from scraper import JobScraper
+
+    if not numpy_available():
+        logger.error("--history requires numpy (pip install numpy)")
+        sys.exit(1)
+
+    table = JobTable.load()
+    # Same location rule as the scraper: distance from HOME_LOCATION when it is set
+    distance_filter = DistanceFilter.from_env()
+    started = time.perf_counter()
+    mask = table.criteria_mask(
+        JobScraper.TARGET_LOCATIONS,
+        JobScraper.EXCLUDE_KEYWORDS,
+        JobScraper.TARGET_START_DATE_MIN,
+        JobScraper.TARGET_START_DATE_MAX,
+        min_pay if min_pay is not None else JobScraper.TARGET_MIN_MONTHLY_SALARY,
+        distance_filter=distance_filter,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"\n{int(mask.sum())} of {len(table)} past postings match the current criteria "
+          f"(evaluated in {elapsed_ms:.1f} ms)\n")
+    for row in table.rows(mask, limit=limit, sort_by_pay=sort_by_pay):
+        print(f"  {row['start_date'] or '----------'}  {row['title']}  |  {row['location']}  |  "
+              f"{row['salary'] or 'salary n/a'}  (first seen {row['first_seen']})")
+    print()
+
+
+def search_postings(query: str, location=None, since=None, until=None, limit: int = 20):
+    """Print ranked full-text search results over all indexed postings, with facet counts"""
+    from search_index import SearchIndex
+
+    index = SearchIndex()
+    try:
+        started = time.perf_counter()
+        found = index.search(query, location=location, since=since, until=until, limit=limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        index.close()
+
+    print(f"\n{found['total']} postings match {query!r} ({elapsed_ms:.1f} ms)\n")
+    for row in found['results']:
+        print(f"  {row['start_date'] or '----------'}  {row['title']}  |  {row['organization']}  |  {row['location']}")
+        print(f"      {row['snippet']}")
+        print(f"      {row['url']}")
+    for facet, counts in found['facets'].items():
+        if counts:
+            print(f"\n  By {facet.replace('_', ' ')}: " + ", ".join(f"{value} ({count})" for value, count in counts.items()))
+    print()
+
+
+async def test_mode(bot_token: str, chat_id: str, debug: bool = True, client=None,
+                    notifier_options=None, report_format: str = 'html', scraper=None):
+    """Test mode: scrape and send ALL jobs with debug details for inspection
+
+    All debug records are uploaded as a single compressed report document
+    (report_format: 'json', 'csv' or 'html').
+    """
     try:
         logger.info("Running in TEST mode - scraping all jobs with detailed debug info...")
 
+        from scraper import JobScraper
+        from telegram_notifier import TelegramNotifier
+
         # Scrape jobs (all pages) with accurate page/position tracking
-        scraper = JobScraper(debug=debug)
+        scraper = scraper or JobScraper(debug=debug)
         jobs = await scraper.fetch_and_parse_all_pages()
 
         if not jobs:
@@ -67,115 +219,82 @@ async def test_mode(bot_token: str, chat_id: str, debug: bool = True):
 
         logger.info("Translating jobs to English...")
         from translator import JobTranslator
-        translator = JobTranslator()
-        translated_jobs = []
-        for job in jobs:
-            translated_job = await translator.translate_job(job)
-            translated_jobs.append(translated_job)
+        translator = JobTranslator(client=client)
+        translated_jobs = await translator.translate_jobs(jobs)
+        translator.log_stats()
 
-        logger.info(f"Sending {len(translated_jobs)} jobs to Telegram with DEBUG details...")
+        logger.info(f"Sending {len(translated_jobs)} jobs to Telegram as a DEBUG report...")
 
-        # Send ALL jobs with debug info (no filtering) to Telegram
-        notifier = TelegramNotifier(bot_token, chat_id)
-        success_count = await notifier.send_debug_batch_alerts(translated_jobs)
+        # Send ALL jobs with debug info (no filtering) to Telegram as one document
+        notifier = TelegramNotifier(bot_token, chat_id, client=client, **(notifier_options or {}))
+        if not await notifier.send_debug_report(translated_jobs, report_format=report_format):
+            logger.error("Failed to send debug report")
+            sys.exit(1)
 
-        logger.info(f"✓ Test mode completed! Sent {success_count}/{len(translated_jobs)} debug messages")
+        logger.info(f"✓ Test mode completed! Sent debug report for {len(translated_jobs)} jobs")
 
     except Exception as e:
         logger.error(f"Test mode error: {e}", exc_info=True)
         sys.exit(1)
 
 
-async def single_check(bot_token: str, chat_id: str, debug: bool = True):
+async def single_check(bot_token: str, chat_id: str, debug: bool = True, client=None,
+                       notifier_options=None, scraper=None):
     """Run a single job check (used by GitHub Actions)
 
     Behavior:
     - Sends full details only for jobs matching filter criteria
     - Sends summary of newly posted jobs that don't match criteria
-    - Marks all new jobs (matched + unmatched) as seen
+    - Messages go through a persistent outbox; jobs are marked as seen only
+      once Telegram acknowledges them, and leftovers from a failed run are
+      delivered first on the next run (without re-scraping)
+    - Alerts for postings that were revised are edited in place; alerts for
+      postings that disappeared are marked as closed
+    - Pages are streamed through filter → translate → notify stages, so the
+      first alerts go out while later pages are still loading
 
     Args:
         debug: Enable debug mode to save HTML and JSON files
+        client: Shared pooled HTTP client for translation and Telegram calls
+        notifier_options: Telegram settings (packing, rate limits, workers, retries)
+        scraper: Already prepared JobScraper (see prepare_scraper)
     """
+    outbox = None
     try:
         logger.info("Running single job check...")
 
-        scraper = JobScraper(debug=debug)
-        # Fetch and parse all pages with accurate page/position tracking
-        jobs = await scraper.fetch_and_parse_all_pages()
+        from scraper import JobScraper
+        from telegram_notifier import TelegramNotifier
+        from outbox import NotificationOutbox
+        from pipeline import run_job_check
 
-        if not jobs:
-            logger.error("Failed to fetch and parse pages")
-            return
+        scraper = scraper or JobScraper(debug=debug)
+        # A check that fails part-way is resumed by the next one
+        scraper.checkpoint_file = JobScraper.CHECKPOINT_FILE
+        notifier = TelegramNotifier(bot_token, chat_id, client=client, **(notifier_options or {}))
+        outbox = NotificationOutbox()
 
-        logger.info(f"Found {len(jobs)} total jobs")
-
-        logger.info("Filtering jobs...")
-        filtered_jobs = scraper.filter_jobs(jobs)
-        logger.info(f"Filtered to {len(filtered_jobs)} matching jobs")
-
-        # Get newly posted jobs that don't match criteria
-        logger.info("Checking for new unmatched jobs...")
-        unmatched_jobs = scraper.get_new_unmatched_jobs(jobs)
-        logger.info(f"Found {len(unmatched_jobs)} new unmatched jobs")
-
-        # If no matching jobs and no unmatched jobs, nothing to do
-        if not filtered_jobs and not unmatched_jobs:
-            logger.info("No new jobs found (matched or unmatched)")
-            return
+        # A single translator shared by all stages
+        from translator import JobTranslator
+        translator = JobTranslator(client=client)
 
-        # Initialize notifier
-        notifier = TelegramNotifier(bot_token, chat_id)
-
-        # Send full details for matching jobs
-        if filtered_jobs:
-            logger.info("Translating matching jobs to English...")
-            from translator import JobTranslator
-            translator = JobTranslator()
-            translated_jobs = []
-            for job in filtered_jobs:
-                translated_job = await translator.translate_job(job)
-                translated_jobs.append(translated_job)
-
-            logger.info(f"Sending {len(translated_jobs)} matching jobs to Telegram...")
-            success_count = await notifier.send_batch_alerts(translated_jobs)
-            logger.info(f"Sent {success_count}/{len(translated_jobs)} full detail messages")
-        else:
-            logger.info("No matching jobs to send full details")
-
-        # Send summary for unmatched jobs
-        if unmatched_jobs:
-            logger.info("Translating unmatched jobs to English...")
-            from translator import JobTranslator
-            translator = JobTranslator()
-            translated_unmatched = []
-            for job in unmatched_jobs:
-                translated_job = await translator.translate_job(job)
-                translated_unmatched.append(translated_job)
-
-            logger.info(f"Sending summary of {len(translated_unmatched)} unmatched jobs...")
-            await notifier.send_unmatched_summary(translated_unmatched)
-
-        # Mark all new jobs (matched + unmatched) as seen
-        all_new_jobs = filtered_jobs + unmatched_jobs
-        scraper.save_seen_jobs(all_new_jobs)
-        logger.info(f"Saved {len(all_new_jobs)} total new jobs as seen")
-
-        matched_count = len(filtered_jobs)
-        unmatched_count = len(unmatched_jobs)
-        logger.info(f"✓ Check completed! Matched: {matched_count} | Unmatched: {unmatched_count}")
+        await run_job_check(scraper, notifier, outbox, translator)
 
     except Exception as e:
         logger.error(f"Check error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        if outbox is not None:
+            outbox.close()
 
 
-async def show_listings(bot_token: str, chat_id: str, debug: bool = True):
+async def show_listings(bot_token: str, chat_id: str, debug: bool = True, client=None, scraper=None):
     """Show all new listings in terminal with bilingual format"""
     try:
         logger.info("Fetching all matching job listings...")
 
-        scraper = JobScraper(debug=debug)
+        from scraper import JobScraper
+        scraper = scraper or JobScraper(debug=debug)
         jobs = await scraper.fetch_and_parse_all_pages()
 
         if not jobs:
@@ -195,11 +314,9 @@ async def show_listings(bot_token: str, chat_id: str, debug: bool = True):
         # Add translations
         logger.info("Translating jobs to English...")
         from translator import JobTranslator
-        translator = JobTranslator()
-        translated_jobs = []
-        for job in filtered_jobs:
-            translated_job = await translator.translate_job(job)
-            translated_jobs.append(translated_job)
+        translator = JobTranslator(client=client)
+        translated_jobs = await translator.translate_jobs(filtered_jobs)
+        translator.log_stats()
 
         # Display jobs in terminal with bilingual format
         print("\n" + "="*80)
@@ -275,37 +392,164 @@ async def main():
         action='store_true',
         help='Show all new listings in terminal with bilingual format (Chinese + English)'
     )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run continuously, checking every CHECK_INTERVAL_MINUTES (stop with SIGTERM/Ctrl+C)'
+    )
+    parser.add_argument(
+        '--schedule',
+        action='store_true',
+        help='Print the adaptive check schedule and expected alert latency, then exit'
+    )
+    parser.add_argument(
+        '--history',
+        action='store_true',
+        help='Show which postings in the job history match the current filter criteria (requires numpy)'
+    )
+    parser.add_argument(
+        '--min-pay',
+        type=int,
+        metavar='NTD',
+        help='With --history, only postings that can pay at least this much per month'
+    )
+    parser.add_argument(
+        '--sort-by-pay',
+        action='store_true',
+        help='With --history, list the best paid postings first'
+    )
+    parser.add_argument(
+        '--search',
+        metavar='QUERY',
+        help='Full-text search all postings seen so far (Chinese or English terms, all must match)'
+    )
+    parser.add_argument(
+        '--location',
+        help='With --search, only postings whose location contains this text (e.g. 台北)'
+    )
+    parser.add_argument(
+        '--since',
+        type=date.fromisoformat,
+        metavar='YYYY-MM-DD',
+        help='With --search, only postings starting on or after this date'
+    )
+    parser.add_argument(
+        '--until',
+        type=date.fromisoformat,
+        metavar='YYYY-MM-DD',
+        help='With --search, only postings starting on or before this date'
+    )
+    parser.add_argument(
+        '--report-format',
+        choices=['html', 'json', 'csv'],
+        default='html',
+        help='Format of the debug report uploaded in test mode (default: html)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile the run: writes a flamegraph-ready collapsed-stack file and a hotspot report to debug_output/'
+    )
+    parser.add_argument(
+        '--profile-tasks',
+        action='store_true',
+        help='With --profile, also report wall time of asyncio tasks per coroutine'
+    )
     parser.add_argument(
         '--debug',
         action='store_true',
-        help='Enable debug mode: saves raw HTML, extracted jobs JSON, and analysis to debug_output/'
+        help='Enable debug mode: saves compressed raw HTML, extracted jobs and analysis to debug_output/runs/'
     )
     args = parser.parse_args()
+    log_listener = configure_logging()
+
+    profiler = None
+    if args.profile:
+        from profiler import SamplingProfiler
+        profiler = SamplingProfiler(track_tasks=args.profile_tasks)
+        profiler.start()
 
     try:
-        # Load configuration
-        config = load_config()
+        await run(args)
+    finally:
+        if profiler:
+            profiler.stop()
+            profiler.write_reports()
+        # Flush queued log records
+        log_listener.stop()
+
+
+async def run(args):
+    """Run the mode selected on the command line"""
+    try:
+        # Load configuration; --schedule, --history and --search work offline without Telegram
+        config = load_config(require_telegram=not (args.schedule or args.history or args.search))
         logger.info("Configuration loaded successfully")
+        metrics.configure(**config['metrics'])
 
-        # Test Telegram connection
-        notifier = TelegramNotifier(config['bot_token'], config['chat_id'])
-        if not notifier.test_connection():
-            logger.error("Failed to connect to Telegram. Check your bot token and chat ID.")
-            sys.exit(1)
+        if args.schedule:
+            print(json.dumps(build_arrival_model(config).describe(), indent=2))
+            return
 
-        # Run in show mode if --show flag is provided
-        if args.show:
-            await show_listings(config['bot_token'], config['chat_id'], debug=args.debug)
+        if args.history:
+            show_history_matches(min_pay=args.min_pay, sort_by_pay=args.sort_by_pay)
             return
 
-        # Run in test mode if --test flag is provided
-        if args.test:
-            await test_mode(config['bot_token'], config['chat_id'], debug=args.debug)
+        if args.search:
+            search_postings(args.search, location=args.location, since=args.since, until=args.until)
             return
 
-        # Normal operation: run single check (suitable for GitHub Actions)
-        # Debug is always enabled for GitHub Actions
-        await single_check(config['bot_token'], config['chat_id'], debug=True)
+        from http_client import create_http_client
+        from telegram_notifier import TelegramNotifier
+
+        # Debug is always enabled for single checks (GitHub Actions)
+        debug = args.debug or not (args.show or args.test or args.daemon)
+
+        # One pooled HTTP client for the whole run, closed on exit
+        async with create_http_client(**config['http']) as client:
+            # Check the Telegram connection while the browser launches and seen jobs load
+            notifier = TelegramNotifier(config['bot_token'], config['chat_id'], client=client)
+            connected, scraper = await asyncio.gather(
+                notifier.probe_connection(ttl=config['probe_ttl']),
+                prepare_scraper(debug),
+            )
+            try:
+                if not connected:
+                    logger.error("Failed to connect to Telegram. Check your bot token and chat ID.")
+                    sys.exit(1)
+
+                # Run in show mode if --show flag is provided
+                if args.show:
+                    await show_listings(config['bot_token'], config['chat_id'], debug=debug, client=client,
+                                        scraper=scraper)
+                    return
+
+                # Run in test mode if --test flag is provided
+                if args.test:
+                    await test_mode(config['bot_token'], config['chat_id'], debug=debug, client=client,
+                                    notifier_options=config['telegram'], report_format=args.report_format,
+                                    scraper=scraper)
+                    return
+
+                # Daemon mode: keep browser, caches and connections alive between checks
+                if args.daemon:
+                    from scheduler import JobScheduler
+                    scheduler = JobScheduler(
+                        config['bot_token'], config['chat_id'], config['check_interval'],
+                        client=client, notifier_options=config['telegram'],
+                        jitter_seconds=config['check_jitter'], debug=debug,
+                        arrival_model=build_arrival_model(config) if config['schedule']['adaptive'] else None,
+                        scraper=scraper
+                    )
+                    await scheduler.run_forever()
+                    return
+
+                # Normal operation: run single check (suitable for GitHub Actions)
+                await single_check(config['bot_token'], config['chat_id'], debug=debug, client=client,
+                                   notifier_options=config['telegram'], scraper=scraper)
+            finally:
+                await scraper.stop_browser()
+                scraper.close()
 
     except ValueError as e:
         logger.error(f"Configuration error: {e}")
@@ -0,0 +1,203 @@
+"""
+Lightweight run instrumentation: timing spans, counters and gauges
+Disabled by default; while disabled every call returns immediately, so the
+hooks can stay in hot paths. When enabled, each run writes a JSON summary and
+a Prometheus text-format file (for node_exporter's textfile collector).
+"""
+
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from atomic_io import atomic_write_json, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# Prefix of all exported Prometheus metric names
+PROMETHEUS_PREFIX = "job_monitor_"
+
+
+class _NullSpan:
+    """No-op span returned while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times a block and records it under the span's name and labels"""
+
+    __slots__ = ('metrics', 'key', 'started')
+
+    def __init__(self, metrics: 'Metrics', key: Tuple):
+        self.metrics = metrics
+        self.key = key
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Collects spans (count / total / max seconds), counters and gauges for one run"""
+
+    DEFAULT_DIRECTORY = Path("metrics")
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = self.DEFAULT_DIRECTORY
+        self.reset()
+
+    def configure(self, enabled: bool, directory: Optional[Path] = None):
+        """
+        Turn instrumentation on or off
+
+        Args:
+            enabled: Record metrics and write them at the end of each run
+            directory: Where run summaries and the Prometheus file are written
+        """
+        self.enabled = enabled
+        if directory is not None:
+            self.directory = Path(directory)
+
+    def reset(self):
+        """Start a new run"""
+        self.started = datetime.now()
+        self.spans: Dict[Tuple, Dict[str, float]] = {}
+        self.counters: Dict[Tuple, float] = {}
+        self.gauges: Dict[Tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def span(self, name: str, **labels):
+        """Context manager timing the enclosed block (works around awaits too)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._key(name, labels))
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a duration measured by the caller"""
+        if self.enabled:
+            self._observe(self._key(name, labels), seconds)
+
+    def _observe(self, key: Tuple, seconds: float):
+        span = self.spans.get(key)
+        if span is None:
+            self.spans[key] = {'count': 1, 'total': seconds, 'max': seconds}
+        else:
+            span['count'] += 1
+            span['total'] += seconds
+            span['max'] = max(span['max'], seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        if self.enabled:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        if self.enabled:
+            self.gauges[self._key(name, labels)] = value
+
+    @staticmethod
+    def peak_rss_bytes() -> Optional[int]:
+        """Peak resident set size of this process, or None where unavailable (Windows)"""
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    @staticmethod
+    def _labeled_name(key: Tuple) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    def summary(self) -> Dict:
+        """Return everything recorded so far as a JSON-serializable dict"""
+        peak_rss = self.peak_rss_bytes()
+        if peak_rss is not None:
+            self.set_gauge('process_peak_rss_bytes', peak_rss)
+        return {
+            'started': self.started.isoformat(),
+            'finished': datetime.now().isoformat(),
+            'spans': {
+                self._labeled_name(key): {
+                    'count': int(span['count']),
+                    'total_seconds': round(span['total'], 6),
+                    'max_seconds': round(span['max'], 6),
+                }
+                for key, span in sorted(self.spans.items())
+            },
+            'counters': {self._labeled_name(key): value for key, value in sorted(self.counters.items())},
+            'gauges': {self._labeled_name(key): value for key, value in sorted(self.gauges.items())},
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the run in Prometheus text exposition format (values describe the last run)"""
+        # Samples of one metric family must be contiguous in the exposition format
+        families: Dict[str, list] = {}
+        for (name, labels), span in sorted(self.spans.items()):
+            families.setdefault(f"{name}_count", []).append((labels, int(span['count'])))
+            families.setdefault(f"{name}_sum", []).append((labels, round(span['total'], 6)))
+            families.setdefault(f"{name}_max", []).append((labels, round(span['max'], 6)))
+        for (name, labels), value in sorted({**self.counters, **self.gauges}.items()):
+            families.setdefault(name, []).append((labels, value))
+        families['last_run_timestamp_seconds'] = [((), int(time.time()))]
+
+        lines = []
+        for name, samples in families.items():
+            full_name = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in samples:
+                lines.append(f"{self._labeled_name((full_name, labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_run_summary(self) -> Optional[Path]:
+        """
+        Write the per-run JSON summary and the Prometheus file
+
+        Returns:
+            Path of the JSON summary, or None when disabled
+        """
+        if not self.enabled:
+            return None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+        summary_file = self.directory / f"run_{self.started:%Y%m%d_%H%M%S}.json"
+        try:
+            atomic_write_json(summary_file, summary, indent=2, ensure_ascii=False)
+            # Atomic, so a scraping collector never reads a half-written file
+            atomic_write_text(self.directory / "job_monitor.prom", self.to_prometheus())
+        except Exception as e:
+            logger.error(f"Failed to write metrics: {e}")
+            return None
+
+        logger.info(f"Saved run metrics: {summary_file}")
+        return summary_file
+
+
+# Process-wide instance used by all modules
+metrics = Metrics()
@@ -0,0 +1,288 @@
+"""
+Durable notification outbox
+Rendered Telegram messages are stored in SQLite before sending and only
+marked delivered once Telegram acknowledges them, so a failed or killed run
+can resume delivery without re-scraping.
+
+Commits fsync the database, so async callers run writes on the shared writer
+thread (atomic_io.run_in_writer) instead of the event loop.
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from atomic_io import run_in_writer
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """Persistent queue of rendered messages with delivery status and attempt counts"""
+
+    # Default database location (next to seen_jobs.json)
+    OUTBOX_FILE = Path("data/outbox.db")
+
+    # Give up on a message after this many failed delivery attempts
+    MAX_ATTEMPTS = 10
+
+    STATUS_PENDING = 'pending'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, path: Path = OUTBOX_FILE):
+        """
+        Open (or create) the outbox database
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Writes from async code run on the writer thread (see drain)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                grp TEXT NOT NULL,
+                job_ids TEXT NOT NULL,
+                language TEXT,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                message_id INTEGER,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status)")
+        # Databases created before posting_key existed
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        if 'posting_key' not in columns:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN posting_key TEXT")
+
+        # Latest delivered alert per job and language, used to edit it in place
+        # (job_id follows the posting when a revision is edited into the alert)
+        sent_alerts_key = {row['name'] for row in self.conn.execute("PRAGMA table_info(sent_alerts)") if row['pk']}
+        if sent_alerts_key == {'posting_key', 'language'}:
+            # Databases from when alerts were keyed by posting_key, which two postings can share
+            self.conn.execute("ALTER TABLE sent_alerts RENAME TO sent_alerts_by_posting")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sent_alerts (
+                job_id TEXT NOT NULL,
+                language TEXT NOT NULL,
+                posting_key TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                closed INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (job_id, language)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sent_alerts_posting ON sent_alerts(posting_key)")
+        if sent_alerts_key == {'posting_key', 'language'}:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO sent_alerts (job_id, language, posting_key, message_id, text, closed, updated_at)
+                SELECT job_id, language, posting_key, message_id, text, closed, updated_at FROM sent_alerts_by_posting
+            """)
+            self.conn.execute("DROP TABLE sent_alerts_by_posting")
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def enqueue(self, messages: List[Dict]) -> int:
+        """
+        Add rendered messages to the outbox
+
+        Messages are keyed by their 'key'; enqueuing a message that is already
+        in the outbox (pending, delivered or failed) is a no-op, so retries and
+        re-scrapes never create duplicates.
+
+        Args:
+            messages: Messages from TelegramNotifier.render_*_messages()
+
+        Returns:
+            Number of newly added messages
+        """
+        now = datetime.now().isoformat()
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO outbox (key, grp, job_ids, language, text, posting_key, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (m['key'], m['group'], json.dumps(m['job_ids']), m.get('language'), m['text'],
+                     m.get('posting_key'), now, now)
+                    for m in messages
+                ]
+            )
+        added = self.conn.total_changes - before
+        logger.info(f"Outbox: queued {added} new messages ({len(messages) - added} already present)")
+        return added
+
+    def pending(self, keys: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Return pending messages in insertion order (optionally only those with the given keys)"""
+        rows = self.conn.execute(
+            "SELECT * FROM outbox WHERE status = ? ORDER BY id", (self.STATUS_PENDING,)
+        ).fetchall()
+        messages = [self._row_to_message(row) for row in rows]
+        if keys is not None:
+            keys = set(keys)
+            messages = [message for message in messages if message['key'] in keys]
+        return messages
+
+    def _row_to_message(self, row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'key': row['key'],
+            'group': row['grp'],
+            'job_ids': json.loads(row['job_ids']),
+            'language': row['language'],
+            'text': row['text'],
+            'attempts': row['attempts'],
+            'message_id': row['message_id'],
+            'posting_key': row['posting_key'],
+        }
+
+    def mark_delivered(self, message: Dict, message_id: int):
+        """Record that Telegram acknowledged a message"""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, message_id = ?, attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                (self.STATUS_DELIVERED, message_id, now, message['key'])
+            )
+            # Single-job alerts can later be edited in place
+            if message.get('posting_key') and message_id:
+                self.conn.execute(
+                    """
+                    INSERT OR REPLACE INTO sent_alerts (job_id, language, posting_key, message_id, text, closed, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 0, ?)
+                    """,
+                    (message['job_ids'][0], message['language'], message['posting_key'], message_id,
+                     message['text'], now)
+                )
+
+    def mark_failed(self, message: Dict, error: str = ''):
+        """Record a failed attempt; the message is given up on after MAX_ATTEMPTS"""
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE outbox
+                SET attempts = attempts + 1,
+                    last_error = ?,
+                    status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END,
+                    updated_at = ?
+                WHERE key = ?
+                """,
+                (error, self.MAX_ATTEMPTS, self.STATUS_FAILED, datetime.now().isoformat(), message['key'])
+            )
+
+    def sent_alerts(self, include_closed: bool = False) -> Dict[str, Dict[str, Dict]]:
+        """
+        Return delivered single-job alerts, keyed by the alerted job's ID then language
+
+        Each entry has posting_key, message_id, text and closed. Several alerts
+        can share a posting_key when the site lists postings that look alike.
+        """
+        query = "SELECT * FROM sent_alerts"
+        if not include_closed:
+            query += " WHERE closed = 0"
+
+        alerts: Dict[str, Dict[str, Dict]] = {}
+        for row in self.conn.execute(query):
+            alerts.setdefault(row['job_id'], {})[row['language']] = {
+                'posting_key': row['posting_key'],
+                'message_id': row['message_id'],
+                'text': row['text'],
+                'closed': bool(row['closed']),
+            }
+        return alerts
+
+    def update_sent_alert(self, job_id: str, language: str, text: str, closed: bool = False,
+                          revised_job_id: Optional[str] = None):
+        """
+        Record that a sent alert was edited (new job version or closed marker)
+
+        Args:
+            job_id: Job the alert currently shows
+            language: Alert language
+            text: New message text
+            closed: Whether the alert now marks the posting as closed
+            revised_job_id: ID of the revision the alert now shows, if any
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE sent_alerts SET job_id = ?, text = ?, closed = ?, updated_at = ?
+                WHERE job_id = ? AND language = ?
+                """,
+                (revised_job_id or job_id, text, int(closed), datetime.now().isoformat(), job_id, language)
+            )
+
+    def _job_ids_with_status(self, status: str) -> Set[str]:
+        rows = self.conn.execute("SELECT job_ids FROM outbox WHERE status = ?", (status,)).fetchall()
+        job_ids = set()
+        for row in rows:
+            job_ids.update(json.loads(row['job_ids']))
+        return job_ids
+
+    def undelivered_job_ids(self) -> Set[str]:
+        """Return IDs of jobs that still have pending messages (retried by drain)"""
+        return self._job_ids_with_status(self.STATUS_PENDING)
+
+    def failed_job_ids(self) -> Set[str]:
+        """Return IDs of jobs with a message that was given up on after MAX_ATTEMPTS (never retried)"""
+        return self._job_ids_with_status(self.STATUS_FAILED)
+
+    async def drain(self, notifier, keys: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Deliver pending messages
+
+        Args:
+            notifier: TelegramNotifier used to send the messages
+            keys: Only deliver these messages (default: everything pending)
+
+        Returns:
+            IDs of jobs whose messages have now all been delivered (jobs with a
+            message given up on are not included; see failed_job_ids)
+        """
+        messages = self.pending(keys)
+        if not messages:
+            return set()
+
+        logger.info(f"Outbox: delivering {len(messages)} pending messages...")
+        message_ids = await notifier.deliver(messages)
+
+        for message, message_id in zip(messages, message_ids):
+            if message_id is None:
+                await run_in_writer(self.mark_failed, message, 'delivery failed')
+                if message['attempts'] + 1 >= self.MAX_ATTEMPTS:
+                    logger.error(f"Outbox: giving up on message {message['key']} after {self.MAX_ATTEMPTS} attempts")
+            else:
+                await run_in_writer(self.mark_delivered, message, message_id)
+
+        touched = set()
+        for message in messages:
+            touched.update(message['job_ids'])
+        delivered = touched - self.undelivered_job_ids() - self.failed_job_ids()
+
+        failed = sum(1 for message_id in message_ids if message_id is None)
+        logger.info(f"Outbox: delivered {len(messages) - failed}/{len(messages)} messages, {failed} still pending")
+        return delivered
+
+    def stats(self) -> Dict[str, int]:
+        """Return message counts per status"""
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
@@ -0,0 +1,374 @@
+"""
+Streaming job check pipeline: parse → filter → translate → notify
+Stages run concurrently and are connected by bounded queues, so alerts for
+the first page go out while later pages are still loading
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from metrics import metrics
+from atomic_io import run_in_writer
+from job_table import numpy_available, update_job_history
+from search_index import update_search_index
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class JobPipeline:
+    """Runs one job check as concurrent stages connected by bounded asyncio queues"""
+
+    # Items (pages / job batches) buffered between stages; a full queue makes
+    # the upstream stage wait (backpressure) instead of piling up work
+    DEFAULT_QUEUE_SIZE = 2
+
+    # A complete crawl listing fewer postings than this share of the open
+    # alerts looks like a broken page (maintenance notice, changed markup)
+    # rather than mass removal, so no alert is marked closed
+    MIN_LISTED_FOR_CLOSING = 0.5
+
+    def __init__(self, scraper, notifier, outbox, translator, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        Initialize pipeline
+
+        Args:
+            scraper: JobScraper providing iter_page_jobs() and the filters
+            notifier: TelegramNotifier used to render, send and edit alerts
+            outbox: NotificationOutbox that messages are delivered through
+            translator: JobTranslator shared by all stages
+            queue_size: Maximum items buffered between two stages
+        """
+        self.scraper = scraper
+        self.notifier = notifier
+        self.outbox = outbox
+        self.translator = translator
+        self.queue_size = max(1, queue_size)
+        self.jobs: List[Dict] = []
+        self.unmatched_jobs: List[Dict] = []
+        # With packed digests, alerts are collected for the whole run and packed once
+        self.packed_alerts: List[Dict] = []
+        # New jobs sharing a posting_key with an alerted job; decided once the crawl is done
+        self.revision_candidates: List[Dict] = []
+        # Revised job ID → ID of the alerted job whose alert shows it
+        self.revisions: Dict[str, str] = {}
+        self.stats = {
+            'pages': 0,
+            'jobs': 0,
+            'matched': 0,
+            'unmatched': 0,
+            'updated': 0,
+            'closed': 0,
+            'delivered': 0,
+            'duplicates': 0,
+            'partial': False,
+        }
+
+    async def run(self) -> Dict:
+        """
+        Run the whole check
+
+        Returns:
+            Run statistics (pages, jobs, matched, unmatched, updated, closed, delivered, duplicates,
+            and partial: whether the crawl stopped before the last page)
+        """
+        # Snapshot of state from previous runs
+        self._sent_alerts = self.outbox.sent_alerts()
+        self._alerted_by_posting: Dict[str, Set[str]] = {}
+        for job_id, alerts in self._sent_alerts.items():
+            for alert in alerts.values():
+                self._alerted_by_posting.setdefault(alert['posting_key'], set()).add(job_id)
+        self._queued_ids = self.outbox.undelivered_job_ids()
+
+        filter_queue = asyncio.Queue(maxsize=self.queue_size)
+        translate_queue = asyncio.Queue(maxsize=self.queue_size)
+        notify_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        tasks = [
+            asyncio.create_task(self._parse_stage(filter_queue)),
+            asyncio.create_task(self._filter_stage(filter_queue, translate_queue)),
+            asyncio.create_task(self._translate_stage(translate_queue, notify_queue)),
+            asyncio.create_task(self._notify_stage(notify_queue)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed: stop the others instead of leaving them blocked on a queue
+            for task in tasks:
+                task.cancel()
+            raise
+
+        await self._send_unmatched_summary()
+        await self._close_removed_postings()
+        return dict(self.stats)
+
+    async def _parse_stage(self, output: asyncio.Queue):
+        """Stage 1: crawl pages and emit each page's jobs"""
+        async for page_jobs in self.scraper.iter_page_jobs():
+            self.stats['pages'] += 1
+            self.stats['jobs'] += len(page_jobs)
+            await output.put(page_jobs)
+        # Repeats caused by the listing shifting mid-crawl, already dropped by the scraper
+        self.stats['duplicates'] = self.scraper.last_crawl_duplicates
+        # Jobs of a crawl that failed part-way are still filtered and alerted
+        self.stats['partial'] = not self.scraper.last_crawl_complete
+        await output.put(_DONE)
+
+    async def _filter_stage(self, source: asyncio.Queue, output: asyncio.Queue):
+        """Stage 2: split each page into new matches and new non-matches, then revised postings
+
+        Whether a job revises an alerted posting depends on whether that
+        posting is gone from the listing, so those jobs wait for the end of
+        the crawl.
+        """
+        while (page_jobs := await source.get()) is not _DONE:
+            self.jobs.extend(page_jobs)
+
+            candidates = self._revision_candidates(page_jobs)
+            self.revision_candidates.extend(candidates)
+            await self._emit_new_jobs(page_jobs, output, skip_ids={job['id'] for job in candidates})
+
+        if self.revision_candidates:
+            revised, new = self._resolve_revisions(self.revision_candidates)
+            if revised:
+                await output.put(('update', revised))
+            await self._emit_new_jobs(new, output)
+        await output.put(_DONE)
+
+    async def _emit_new_jobs(self, jobs: List[Dict], output: asyncio.Queue, skip_ids: Set[str] = frozenset()):
+        """Pass new matches on to be alerted and keep new non-matches for the summary"""
+        # Jobs still in the outbox are retried from there
+        skip_ids = self._queued_ids | skip_ids
+        matched = [job for job in self.scraper.filter_jobs(jobs) if job['id'] not in skip_ids]
+        unmatched = [job for job in self.scraper.get_new_unmatched_jobs(jobs) if job['id'] not in skip_ids]
+        self.unmatched_jobs.extend(unmatched)
+        self.stats['matched'] += len(matched)
+        self.stats['unmatched'] += len(unmatched)
+        if matched:
+            await output.put(('alert', matched))
+
+    async def _translate_stage(self, source: asyncio.Queue, output: asyncio.Queue):
+        """Stage 3: translate job batches to English"""
+        while (item := await source.get()) is not _DONE:
+            kind, jobs = item
+            with metrics.span('pipeline_translate_seconds'):
+                translated = await self.translator.translate_jobs(jobs)
+            await output.put((kind, translated))
+        await output.put(_DONE)
+
+    async def _notify_stage(self, source: asyncio.Queue):
+        """Stage 4: queue and deliver alerts, or edit alerts of revised postings
+
+        Packed digests are sent once the crawl is done, so they fill up to
+        Telegram's message limit instead of holding one page's matches each.
+        """
+        while (item := await source.get()) is not _DONE:
+            kind, jobs = item
+            with metrics.span('pipeline_notify_seconds', kind=kind):
+                if kind == 'update':
+                    await self._edit_changed_postings(jobs)
+                elif self.notifier.pack_messages:
+                    self.packed_alerts.extend(jobs)
+                else:
+                    await self._deliver(self.notifier.render_alert_messages(jobs))
+
+        if self.packed_alerts:
+            with metrics.span('pipeline_notify_seconds', kind='alert'):
+                await self._deliver(self.notifier.render_alert_messages(self.packed_alerts))
+
+    async def _deliver(self, messages: List[Dict]):
+        """Queue messages in the outbox, send them, and mark acknowledged jobs as seen"""
+        await run_in_writer(self.outbox.enqueue, messages)
+        delivered = await self.outbox.drain(self.notifier, keys=[message['key'] for message in messages])
+        await self.scraper.save_seen_ids_async(delivered)
+        self.stats['delivered'] += len(delivered)
+
+    async def _send_unmatched_summary(self):
+        """Send one summary of all new non-matching jobs once the crawl is done"""
+        if not self.unmatched_jobs:
+            return
+        logger.info(f"Sending summary of {len(self.unmatched_jobs)} unmatched jobs...")
+        translated = await self.translator.translate_jobs(self.unmatched_jobs)
+        await self._deliver(self.notifier.render_unmatched_summary_messages(translated))
+
+    def _revision_candidates(self, jobs: List[Dict]) -> List[Dict]:
+        """Return new jobs whose posting_key matches a job we already alerted"""
+        return [
+            job for job in jobs
+            if job['posting_key'] in self._alerted_by_posting
+            and job['id'] not in self.scraper.seen_jobs
+            and job['id'] not in self._sent_alerts
+        ]
+
+    def _resolve_revisions(self, candidates: List[Dict]):
+        """
+        Split revision candidates into revised postings and new postings
+
+        A job revises an alerted posting only when it is the one new job with
+        that posting_key and exactly one alerted job with that key has
+        disappeared from the listing. Otherwise (e.g. an organization listing
+        two similar positions) the jobs are new postings and get their own alerts.
+
+        Returns:
+            (revised jobs, new jobs); both empty after a partial crawl, which
+            can't tell a removed posting from an unfetched page
+        """
+        if not self.scraper.last_crawl_complete:
+            logger.info(f"Crawl incomplete - {len(candidates)} possibly revised postings are left for the next run")
+            return [], []
+
+        current_ids = {job['id'] for job in self.jobs}
+        by_posting: Dict[str, List[Dict]] = {}
+        for job in candidates:
+            by_posting.setdefault(job['posting_key'], []).append(job)
+
+        revised, new = [], []
+        for posting_key, jobs in by_posting.items():
+            gone = [job_id for job_id in self._alerted_by_posting[posting_key] if job_id not in current_ids]
+            if len(jobs) == 1 and len(gone) == 1:
+                self.revisions[jobs[0]['id']] = gone[0]
+                revised.append(jobs[0])
+            else:
+                new.extend(jobs)
+        return revised, new
+
+    async def _edit_changed_postings(self, jobs: List[Dict]):
+        """Rewrite the original alerts of revised postings via editMessageText"""
+        edited_ids = set()
+        for job in jobs:
+            alerted_id = self.revisions[job['id']]
+            texts = {}
+            for language, alert in self._sent_alerts[alerted_id].items():
+                text = self.notifier.render_updated_message(job, language)
+                if await self.notifier.edit_message(alert['message_id'], text):
+                    texts[language] = text
+            # Record the new version only once every language is edited
+            if len(texts) == len(self._sent_alerts[alerted_id]):
+                for language, text in texts.items():
+                    await run_in_writer(self.outbox.update_sent_alert, alerted_id, language, text,
+                                        revised_job_id=job['id'])
+                edited_ids.add(job['id'])
+
+        # Failed edits are retried next run (the new version stays unseen)
+        await self.scraper.save_seen_ids_async(edited_ids)
+        self.stats['updated'] += len(edited_ids)
+        logger.info(f"Edited alerts for {len(edited_ids)}/{len(jobs)} changed postings")
+
+    async def _close_removed_postings(self):
+        """Mark alerts of postings no longer on the site as closed"""
+        if not self.scraper.last_crawl_complete:
+            # A partial crawl can't tell a removed posting from an unfetched page
+            logger.info("Crawl incomplete - not checking for removed postings")
+            return
+        if not self._sent_alerts:
+            return
+        if not self.jobs or len(self.jobs) < self.MIN_LISTED_FOR_CLOSING * len(self._sent_alerts):
+            logger.warning(f"Crawl found only {len(self.jobs)} postings for {len(self._sent_alerts)} open alerts - "
+                           f"not marking any as closed")
+            return
+
+        # Alerts of revised postings now show (or will show) the revision
+        current: Set[str] = {job['id'] for job in self.jobs} | set(self.revisions.values())
+        removed = [job_id for job_id in self._sent_alerts if job_id not in current]
+        if not removed:
+            return
+
+        logger.info(f"Marking {len(removed)} removed postings as closed...")
+        for job_id in removed:
+            for language, alert in self._sent_alerts[job_id].items():
+                text = self.notifier.render_closed_message(alert['text'], language)
+                if await self.notifier.edit_message(alert['message_id'], text):
+                    await run_in_writer(self.outbox.update_sent_alert, job_id, language, text, closed=True)
+            self.stats['closed'] += 1
+
+
+async def run_job_check(scraper, notifier, outbox, translator) -> Optional[Dict]:
+    """
+    Run one complete job check
+
+    Delivers messages left pending by a previous run, then streams the crawl
+    through a JobPipeline. Used by both single_check and the daemon.
+
+    When metrics are enabled, a per-run summary is written at the end.
+
+    Returns:
+        Pipeline statistics, or None if no jobs could be fetched
+    """
+    metrics.reset()
+    try:
+        with metrics.span('run_seconds'):
+            stats = await _run_job_check(scraper, notifier, outbox, translator)
+        for name, value in (stats or {}).items():
+            metrics.set_gauge(f'run_{name}', int(value) if isinstance(value, bool) else value)
+        return stats
+    finally:
+        if metrics.enabled:
+            await run_in_writer(metrics.write_run_summary)
+
+
+async def _run_job_check(scraper, notifier, outbox, translator) -> Optional[Dict]:
+    # Deliver messages left pending by a previous run before doing any new work
+    with metrics.span('outbox_recovery_seconds'):
+        recovered = await outbox.drain(notifier)
+    if recovered:
+        await scraper.save_seen_ids_async(recovered)
+        logger.info(f"Recovered {len(recovered)} jobs from the outbox and marked them as seen")
+
+    # Messages given up on are final: mark their jobs as seen instead of skipping them forever
+    abandoned = outbox.failed_job_ids() - scraper.seen_jobs
+    if abandoned:
+        await scraper.save_seen_ids_async(abandoned)
+        logger.warning(f"Gave up delivering alerts for {len(abandoned)} jobs after "
+                       f"{outbox.MAX_ATTEMPTS} attempts; marked them as seen")
+
+    # Stream pages through filter → translate → notify as they are fetched
+    pipeline = JobPipeline(scraper, notifier, outbox, translator)
+    stats = await pipeline.run()
+
+    if not stats['jobs']:
+        logger.error("Failed to fetch and parse pages")
+        return None
+
+    # Keep every posting in the columnar history (optional, needs numpy)
+    if numpy_available():
+        try:
+            await run_in_writer(update_job_history, pipeline.jobs)
+        except Exception as e:
+            logger.error(f"Failed to update job history: {e}")
+
+    # Index every posting for --search
+    try:
+        await run_in_writer(update_search_index, pipeline.jobs)
+    except Exception as e:
+        logger.error(f"Failed to update search index: {e}")
+
+    logger.info(f"Found {stats['jobs']} total jobs on {stats['pages']} pages")
+    if stats['partial']:
+        logger.warning(
+            f"Partial crawl: only the jobs of the {stats['pages']} pages fetched were processed; "
+            f"the next run resumes at the failing page"
+        )
+    if stats['duplicates']:
+        logger.info(f"Dropped {stats['duplicates']} duplicate postings caused by the listing shifting mid-crawl")
+    translator.log_stats()
+
+    new_count = stats['matched'] + stats['unmatched']
+    if not new_count and not stats['updated']:
+        logger.info("No new jobs found (matched or unmatched)")
+
+    logger.info(f"Saved {stats['delivered']} delivered new jobs as seen")
+    if stats['delivered'] < new_count:
+        logger.warning(
+            f"{new_count - stats['delivered']} jobs not yet delivered; "
+            f"they stay in the outbox and are retried on the next run"
+        )
+
+    logger.info(
+        f"✓ Check completed{' (partial crawl)' if stats['partial'] else ''}! "
+        f"Matched: {stats['matched']} | Unmatched: {stats['unmatched']} | "
+        f"Updated: {stats['updated']} | Closed: {stats['closed']}"
+    )
+    return stats
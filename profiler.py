@@ -0,0 +1,174 @@
+"""
+Built-in sampling profiler for slow runs (main.py --profile)
+A background thread samples the stacks of all threads at a fixed interval and
+writes a collapsed-stack file (for flamegraph.pl / speedscope) plus a sorted
+hotspot report. Optionally times every asyncio task, so awaited work such as
+translations and Telegram sends is attributed to the coroutine that waited.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Samples all thread stacks periodically and aggregates them into collapsed stacks"""
+
+    # Seconds between samples
+    DEFAULT_INTERVAL = 0.005
+
+    # Functions listed in each section of the hotspot report
+    REPORT_TOP = 40
+
+    def __init__(self, output_dir: Path = Path("debug_output"), interval: float = DEFAULT_INTERVAL,
+                 track_tasks: bool = False):
+        """
+        Args:
+            output_dir: Where the collapsed-stack file and hotspot report are written
+            interval: Seconds between stack samples
+            track_tasks: Also record wall time of every asyncio task, per coroutine
+        """
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.track_tasks = track_tasks
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.task_times: Dict[str, Dict[str, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._wall = 0.0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        """Record the current stack of every thread except the sampler itself"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == threading.get_ident():
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _task_factory(self, loop, coro, **kwargs):
+        """Create tasks as usual, recording their wall time when they finish"""
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        name = getattr(coro, '__qualname__', type(coro).__name__)
+        started = time.perf_counter()
+
+        def _done(_task):
+            elapsed = time.perf_counter() - started
+            entry = self.task_times.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+
+        task.add_done_callback(_done)
+        return task
+
+    def start(self):
+        """Start sampling (and task timing, if enabled and called from the event loop)"""
+        if self.track_tasks:
+            try:
+                asyncio.get_running_loop().set_task_factory(self._task_factory)
+            except RuntimeError:
+                logger.warning("Task timing needs a running event loop - skipping it")
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Profiling enabled (sampling every {self.interval * 1000:.0f} ms)")
+
+    def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._wall = time.perf_counter() - self._started
+        if self.track_tasks:
+            try:
+                asyncio.get_running_loop().set_task_factory(None)
+            except RuntimeError:
+                pass
+
+    def _hotspots(self) -> List[str]:
+        """Render self and inclusive sample counts per function, plus task wall times"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            # The first entry is the thread name, not a function
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        total = sum(self.stacks.values()) or 1
+        lines = [
+            f"Profile: {self.samples} samples over {self._wall:.2f}s "
+            f"(every {self.interval * 1000:.0f} ms, all threads)",
+            "Idle event loop time shows up under the selector's select()/poll().",
+            "",
+            f"Top {self.REPORT_TOP} functions by own samples:",
+            f"{'samples':>9} {'%':>6}  function",
+        ]
+        for label, count in own.most_common(self.REPORT_TOP):
+            lines.append(f"{count:>9} {100 * count / total:>5.1f}%  {label}")
+
+        lines += ["", f"Top {self.REPORT_TOP} functions by inclusive samples:", f"{'samples':>9} {'%':>6}  function"]
+        for label, count in inclusive.most_common(self.REPORT_TOP):
+            lines.append(f"{count:>9} {100 * count / total:>5.1f}%  {label}")
+
+        if self.task_times:
+            lines += ["", "asyncio task wall time by coroutine:",
+                      f"{'tasks':>7} {'total s':>9} {'max s':>8}  coroutine"]
+            for name, entry in sorted(self.task_times.items(), key=lambda item: -item[1]['total']):
+                lines.append(f"{entry['count']:>7} {entry['total']:>9.3f} {entry['max']:>8.3f}  {name}")
+        return lines
+
+    def write_reports(self) -> Optional[Path]:
+        """
+        Write profile_<timestamp>.collapsed and profile_<timestamp>_hotspots.txt
+
+        Returns:
+            Path of the hotspot report, or None if nothing was sampled
+        """
+        if not self.samples:
+            logger.warning("Profiler collected no samples")
+            return None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        collapsed_file = self.output_dir / f"profile_{timestamp}.collapsed"
+        report_file = self.output_dir / f"profile_{timestamp}_hotspots.txt"
+
+        with open(collapsed_file, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self._hotspots()) + "\n")
+
+        logger.info(f"Saved profile: {collapsed_file} (flamegraph input) and {report_file}")
+        return report_file
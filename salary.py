@@ -0,0 +1,144 @@
+"""
+Salary normalization
+Parses a posting's 薪資待遇 field ("45,000~55,000", "時薪840-1800",
+"年薪600000至630000", "面議") into a typed Salary: pay period, minimum and
+maximum in NTD, and whether pay is negotiable. Jobs parse it once when they are
+created, so filters and sorting compare numbers instead of re-reading text.
+"""
+
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+# The 薪資待遇 value runs until the next field label of the listing
+_FIELD_PATTERN = re.compile(
+    r'薪資待遇(?![與】])\s*[:：]?\s*(.*?)\s*(?=聯絡人|聯絡電話|電子郵件|聯絡地址|工作地址|條件要求|工作說明|$)'
+)
+_AMOUNT_PATTERN = re.compile(r'(\d+(?:,\d{3})*(?:\.\d+)?)\s*(萬)?')
+_OPEN_ENDED_PATTERN = re.compile(r'以上|起')
+_NEGOTIABLE_PATTERN = re.compile(r'面議|議價|再議|面談')
+
+_HOURLY_PATTERN = re.compile(r'時薪|/\s*時|/\s*小時|每小時|元/h', re.IGNORECASE)
+_YEARLY_PATTERN = re.compile(r'年薪')
+_MONTHLY_PATTERN = re.compile(r'月薪|/\s*月|每月')
+
+# Amounts without a unit are classified by size
+_MAX_SESSION_OR_HOURLY = 5000
+_MIN_YEARLY = 300000
+# Amounts below this are not salaries (e.g. "1.5個月", "第1年")
+_MIN_AMOUNT = 100
+# In monthly pay, amounts below this share of the largest are allowances or bonuses
+_MIN_SHARE_OF_LARGEST = 1 / 3
+
+
+class Salary(NamedTuple):
+    """Normalized pay of one posting
+
+    `period` is '' when no amount was found. `maximum` is None for a single
+    amount with no upper bound ("45,000以上") and equals `minimum` for a fixed
+    amount.
+    """
+    period: str
+    minimum: Optional[int]
+    maximum: Optional[int]
+    negotiable: bool
+
+    PERIODS = ('', 'month', 'hour', 'session', 'year')
+
+    # Used to compare hourly and yearly pay with monthly pay (22 days × 8 hours)
+    HOURS_PER_MONTH = 176
+
+    @property
+    def known(self) -> bool:
+        return self.minimum is not None
+
+    def _monthly(self, amount: Optional[int]) -> Optional[int]:
+        if amount is None:
+            return None
+        if self.period == 'month':
+            return amount
+        if self.period == 'hour':
+            return amount * self.HOURS_PER_MONTH
+        if self.period == 'year':
+            return amount // 12
+        # Per-session pay has no meaningful monthly equivalent
+        return None
+
+    @property
+    def monthly_min(self) -> Optional[int]:
+        """Minimum as monthly pay (None if unknown or paid per session)"""
+        return self._monthly(self.minimum)
+
+    @property
+    def monthly_max(self) -> Optional[int]:
+        """Maximum as monthly pay (None if open-ended, unknown or paid per session)"""
+        return self._monthly(self.maximum)
+
+    def describe(self) -> str:
+        """Short English summary, e.g. 'NT$45,000-55,000/month'"""
+        if not self.known:
+            return 'Negotiable' if self.negotiable else ''
+        amount = f"NT${self.minimum:,}"
+        if self.maximum is None:
+            amount += '+'
+        elif self.maximum != self.minimum:
+            amount += f"-{self.maximum:,}"
+        summary = f"{amount}/{self.period}"
+        return f"{summary} (negotiable)" if self.negotiable else summary
+
+
+UNKNOWN_SALARY = Salary('', None, None, False)
+
+
+def extract_salary_text(item_text: str) -> str:
+    """Return the 薪資待遇 value from a listing's text ('' if the field is missing or empty)"""
+    match = _FIELD_PATTERN.search(item_text)
+    return match.group(1)[:120] if match else ''
+
+
+def _period(text: str, largest: int) -> str:
+    """Pay period from explicit units, checked against the size of the amounts"""
+    if largest < _MAX_SESSION_OR_HOURLY:
+        if _HOURLY_PATTERN.search(text):
+            return 'hour'
+        # A small amount without a unit is almost always per visit/session
+        return 'session'
+    if _YEARLY_PATTERN.search(text) or (largest >= _MIN_YEARLY and not _MONTHLY_PATTERN.search(text)):
+        return 'year'
+    # "半職約28000~40000元(視上班節數)" mentions 節 but is monthly; units only count for small amounts
+    return 'month'
+
+
+def parse_salary(text: str) -> Salary:
+    """
+    Parse a 薪資待遇 value
+
+    Args:
+        text: The field value (see extract_salary_text)
+
+    Returns:
+        Salary; UNKNOWN_SALARY (or a negotiable one) if there is no amount
+    """
+    if not text:
+        return UNKNOWN_SALARY
+    text = unicodedata.normalize('NFKC', text)
+    negotiable = bool(_NEGOTIABLE_PATTERN.search(text))
+    amounts = [int(float(value.replace(',', '')) * (10000 if ten_thousands else 1))
+               for value, ten_thousands in _AMOUNT_PATTERN.findall(text)]
+    amounts = [amount for amount in amounts if amount >= _MIN_AMOUNT]
+    if not amounts:
+        return Salary('', None, None, negotiable)
+    largest = max(amounts)
+    if largest >= _MAX_SESSION_OR_HOURLY:
+        amounts = [amount for amount in amounts if amount >= largest * _MIN_SHARE_OF_LARGEST]
+
+    minimum, maximum = min(amounts), largest
+    if len(amounts) == 1 and _OPEN_ENDED_PATTERN.search(text):
+        maximum = None
+    return Salary(_period(text, largest), minimum, maximum, negotiable)
+
+
+def salary_of(job) -> Salary:
+    """The parsed salary of a Job (precomputed) or a job dict (parsed now)"""
+    pay = getattr(job, 'pay', None)
+    return pay if pay is not None else parse_salary(job.get('salary') or '')
@@ -3,22 +3,41 @@ Job scheduler - periodically checks for new job postings
 """
 
 import asyncio
+import html
 import logging
-from datetime import datetime
-from typing import Optional
+import signal
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 from scraper import JobScraper
 from telegram_notifier import TelegramNotifier
+from translator import JobTranslator
+from outbox import NotificationOutbox
+from pipeline import run_job_check
+from arrival_model import ArrivalRateModel
 
 logger = logging.getLogger(__name__)
 
 
 class JobScheduler:
-    """Schedules periodic job scraping and alerts"""
+    """Schedules periodic job scraping and alerts
 
-    def __init__(self, bot_token: str, chat_id: str, check_interval_minutes: int = 30):
+    The scraper (with its seen-job set and browser), translator cache, outbox
+    and HTTP client live for the whole process, so each tick skips the
+    cold-start cost of a fresh run.
+    """
+
+    # Random delay added to each tick so checks don't hit the site at fixed times
+    DEFAULT_JITTER_SECONDS = 60
+
+    def __init__(self, bot_token: str, chat_id: str, check_interval_minutes: int = 30,
+                 client=None, notifier_options: Optional[Dict] = None,
+                 jitter_seconds: int = DEFAULT_JITTER_SECONDS, debug: bool = False,
+                 arrival_model: Optional[ArrivalRateModel] = None, scraper: Optional[JobScraper] = None):
         """
         Initialize the job scheduler
 
@@ -26,57 +45,151 @@ class JobScheduler:
             bot_token: Telegram bot token
             chat_id: Telegram chat ID
             check_interval_minutes: How often to check for jobs (in minutes)
+            client: Shared pooled HTTP client for translation and Telegram calls
+            notifier_options: Telegram settings (packing, rate limits, workers, retries)
+            jitter_seconds: Maximum random delay added to each scheduled check
+            debug: Save debug artifacts on every check
+            arrival_model: If given, space checks by the observed posting arrival
+                           rate instead of the fixed interval
+            scraper: Already prepared JobScraper to reuse (one is created if not given)
         """
-        self.scraper = JobScraper()
-        self.notifier = TelegramNotifier(bot_token, chat_id)
+        self.scraper = scraper or JobScraper(debug=debug)
+        # A scraper passed in is closed by whoever created it
+        self._owns_scraper = scraper is None
+        # A check that fails part-way is resumed by the next one
+        self.scraper.checkpoint_file = JobScraper.CHECKPOINT_FILE
+        self.notifier = TelegramNotifier(bot_token, chat_id, client=client, **(notifier_options or {}))
+        self.translator = JobTranslator(client=client)
+        self.outbox = NotificationOutbox()
         self.check_interval_minutes = check_interval_minutes
+        self.jitter_seconds = jitter_seconds
+        self.arrival_model = arrival_model
+        self._last_check: Optional[datetime] = arrival_model.updated if arrival_model else None
         self.scheduler = AsyncIOScheduler()
+        # Guards against overlapping checks (e.g. the startup run and the first tick)
+        self._check_lock = asyncio.Lock()
+        self._stop_event = asyncio.Event()
 
     async def check_and_alert(self):
         """Check for new jobs and send alerts"""
-        try:
-            logger.info(f"Running job check at {datetime.now()}")
-
-            # Scrape jobs
-            new_jobs = await self.scraper.scrape()
+        if self._check_lock.locked():
+            logger.warning("Previous job check still running - skipping this tick")
+            return
 
-            if new_jobs:
-                logger.info(f"Found {len(new_jobs)} new matching jobs!")
-                await self.notifier.send_batch_alerts(new_jobs)
-            else:
-                logger.info("No new matching jobs found")
-
-        except Exception as e:
-            logger.error(f"Error during job check: {e}")
-            # Optionally send error alert to Telegram
+        async with self._check_lock:
             try:
-                await self.notifier.send_message(
-                    f"⚠️ Error during job check: {str(e)}"
+                logger.info(f"Running job check at {datetime.now()}")
+                stats = await run_job_check(self.scraper, self.notifier, self.outbox, self.translator)
+                await self._record_arrivals(stats)
+
+            except Exception as e:
+                logger.error(f"Error during job check: {e}", exc_info=True)
+                # Report the failure in the chat as well
+                await self.notifier.send_text(
+                    f"⚠️ Error during job check: {html.escape(str(e))}"
                 )
-            except:
-                pass
+            finally:
+                if self.arrival_model and not self._stop_event.is_set():
+                    self._schedule_next_check()
+
+    async def _record_arrivals(self, stats: Optional[Dict]):
+        """Feed the postings first seen in this check into the arrival model"""
+        now = datetime.now()
+        if self.arrival_model and stats is not None:
+            # Postings only count as arrivals for a check that fetched the whole site
+            if self.scraper.last_crawl_complete:
+                self.arrival_model.record_check(self._last_check, now, stats['matched'] + stats['unmatched'])
+                self._last_check = now
+                await self.arrival_model.save_async()
+
+    def _schedule_next_check(self):
+        """Schedule the next check at the time chosen by the arrival model"""
+        interval = self.arrival_model.next_interval()
+        run_date = datetime.now() + timedelta(minutes=interval, seconds=random.uniform(0, self.jitter_seconds))
+        self.scheduler.add_job(
+            self.check_and_alert,
+            trigger=DateTrigger(run_date=run_date),
+            id='job_check',
+            name='Check for new job postings',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=interval * 60
+        )
+        logger.info(f"Next check in {interval} minutes (at {run_date:%Y-%m-%d %H:%M})")
+
+    def get_schedule_stats(self) -> Dict:
+        """Return the chosen schedule and expected-latency statistics"""
+        if not self.arrival_model:
+            return {
+                'adaptive': False,
+                'interval_minutes': self.check_interval_minutes,
+                'expected_median_latency_minutes': self.check_interval_minutes / 2,
+            }
+        return {'adaptive': True, **self.arrival_model.describe()}
 
     def start(self):
         """Start the scheduler"""
+        if self.arrival_model:
+            # Each check schedules the next one (see _schedule_next_check)
+            stats = self.get_schedule_stats()
+            logger.info(
+                f"Starting job scheduler (adaptive: {self.arrival_model.min_interval}-"
+                f"{self.arrival_model.max_interval} minutes, ~{stats['checks_per_week_adaptive']} checks/week, "
+                f"expected median latency {stats['expected_median_latency_adaptive_minutes']:.0f} min "
+                f"vs {stats['expected_median_latency_fixed_minutes']:.0f} min fixed)"
+            )
+            self._startup_task = asyncio.create_task(self.check_and_alert())
+            self.scheduler.start()
+            return
+
         logger.info(
-            f"Starting job scheduler (check every {self.check_interval_minutes} minutes)"
+            f"Starting job scheduler (check every {self.check_interval_minutes} minutes, "
+            f"jitter up to {self.jitter_seconds}s)"
         )
 
-        # Add job to scheduler
+        # Add job to scheduler; one instance at a time, missed ticks coalesced into one
         self.scheduler.add_job(
             self.check_and_alert,
-            trigger=IntervalTrigger(minutes=self.check_interval_minutes),
+            trigger=IntervalTrigger(minutes=self.check_interval_minutes, jitter=self.jitter_seconds),
             id='job_check',
             name='Check for new job postings',
-            replace_existing=True
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=self.check_interval_minutes * 60
         )
 
-        # Run immediately on startup
-        asyncio.create_task(self.check_and_alert())
+        # Run immediately on startup (keep a reference so the task isn't garbage collected)
+        self._startup_task = asyncio.create_task(self.check_and_alert())
 
         self.scheduler.start()
 
     async def stop(self):
-        """Stop the scheduler"""
+        """Stop the scheduler, waiting for a running check to finish"""
         logger.info("Stopping job scheduler")
-        self.scheduler.shutdown()
+        self.scheduler.shutdown(wait=False)
+
+        # Let an in-flight check finish before tearing down its resources
+        async with self._check_lock:
+            if self._owns_scraper:
+                await self.scraper.stop_browser()
+                self.scraper.close()
+            self.outbox.close()
+
+    async def run_forever(self):
+        """Run as a daemon until SIGTERM/SIGINT, then shut down gracefully"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._stop_event.set)
+            except NotImplementedError:
+                # Signal handlers are unavailable on Windows; Ctrl+C still raises KeyboardInterrupt
+                pass
+
+        await self.scraper.start_browser()
+        self.start()
+        try:
+            await self._stop_event.wait()
+            logger.info("Shutdown signal received")
+        finally:
+            await self.stop()
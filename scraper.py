@@ -4,15 +4,26 @@ Filters and sends Telegram alerts for matching positions
 """
 
 import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 from datetime import datetime, date
+from itertools import groupby
 import json
 import os
 from pathlib import Path
 import re
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, List, Dict, Optional
+from urllib.parse import urljoin
 import logging
+import time
+
+from metrics import metrics
+from debug_artifacts import DebugArtifactWriter
+from atomic_io import atomic_write_json, write_json_async
+from job import Job
+from salary import extract_salary_text, salary_of
 
 # Configure logging
 logging.basicConfig(
@@ -32,123 +43,427 @@ class JobScraper:
     EXCLUDE_KEYWORDS = {"小兒", "小兒自費", "pediatric"}
     TARGET_START_DATE_MIN = date(2026, 2, 15)  # Feb 15, 2026
     TARGET_START_DATE_MAX = date(2026, 4, 15)  # Apr 15, 2026
+    # Minimum monthly pay in NTD (hourly/yearly pay is converted); None disables the check.
+    # Postings without a comparable salary (none given, 面議, per session) always pass
+    TARGET_MIN_MONTHLY_SALARY: Optional[int] = None
+
+    # topInfo fields that, with the job title, identify a posting across revisions
+    # (salary, dates, head count and contact details may change in a revision)
+    POSTING_KEY_FIELDS = ('徵才機構', '求才類別', '徵才型態', '工作地址')
 
     # File to track seen job IDs
     SEEN_JOBS_FILE = Path("data/seen_jobs.json")
+    # Progress of an unfinished crawl (pages done, next page URL, jobs parsed), to resume from;
+    # used by scheduled and single-check runs (see checkpoint_file)
+    CHECKPOINT_FILE = Path("data/crawl_checkpoint.json")
+
+    # Upper bound on the delay between retries of one page (seconds)
+    PAGE_RETRY_BACKOFF_MAX = 30.0
+
+    # Where CPU-bound parsing, hashing and debug serialization run:
+    # 'thread' (default), 'process' (uses several cores) or 'inline' (on the event loop)
+    PARSE_EXECUTORS = ('thread', 'process', 'inline')
+
+    def __init__(self, debug=True, parse_executor: Optional[str] = None, parse_workers: Optional[int] = None,
+                 url: Optional[str] = None, checkpoint_file: Optional[Path] = None):
+        """
+        Args:
+            debug: Save raw HTML, extracted jobs JSON and analysis to debug_output/
+            parse_executor: 'thread', 'process' or 'inline' (default: PARSE_EXECUTOR env var or 'thread')
+            parse_workers: Pool size (default: PARSE_WORKERS env var or the executor's default)
+            url: Listing to crawl (default: JOB_SITE_URL env var or URL), e.g. a local fake_site.py
+            checkpoint_file: Save crawl progress here and resume unfinished crawls from it
+                             (e.g. CHECKPOINT_FILE); None disables checkpoints
+        """
+        # Jobs keep URL as their link (it is part of their ID), whichever listing is crawled
+        self.url = url or os.getenv('JOB_SITE_URL') or self.URL
+        self.parse_executor = parse_executor or os.getenv('PARSE_EXECUTOR', 'thread')
+        if self.parse_executor not in self.PARSE_EXECUTORS:
+            raise ValueError(f"Unknown parse executor '{self.parse_executor}' (use one of: {', '.join(self.PARSE_EXECUTORS)})")
+        workers = parse_workers or os.getenv('PARSE_WORKERS')
+        self.parse_workers = int(workers) if workers else None
+        self._executor = None
+        # Persistent browser (see start_browser); None means launch one per crawl
+        self._playwright = None
+        self._browser = None
 
-    def __init__(self, debug=True):
         self.SEEN_JOBS_FILE.parent.mkdir(parents=True, exist_ok=True)
         self.seen_jobs = self._load_seen_jobs()
         self.debug = debug
-        self.debug_dir = Path("debug_output") if debug else None
+        self.debug_writer = None
         if self.debug:
-            self.debug_dir.mkdir(exist_ok=True)
-            logger.info(f"Debug mode enabled. Output will be saved to {self.debug_dir}/")
-        self.page_htmls = {}  # Store HTML for debugging
+            # Compressed per-run artifacts written off the event loop, with retention
+            self.debug_writer = DebugArtifactWriter(
+                keep_runs=int(os.getenv('DEBUG_KEEP_RUNS', str(DebugArtifactWriter.DEFAULT_KEEP_RUNS))),
+                max_bytes=int(float(os.getenv('DEBUG_MAX_MB', '50')) * 1024 * 1024),
+                compression=os.getenv('DEBUG_COMPRESSION', 'gzip'),
+                keep_html=os.getenv('DEBUG_KEEP_HTML', 'anomalies'),
+            )
+            logger.info(f"Debug mode enabled. Output will be saved to {self.debug_writer.root}/runs/")
+        self.last_crawl_complete = False  # Whether the last crawl reached the final page
+        # Within-run duplicates of the last crawl: page number → postings already seen on earlier pages
+        self.page_shifts: Dict[int, int] = {}
+        self.last_crawl_duplicates = 0
+        # Page the last crawl resumed at from a checkpoint (None if it started at page 1)
+        self.last_crawl_resumed_from: Optional[int] = None
+
+        # Each page is retried with exponential backoff before the crawl gives up
+        self.page_retries = int(os.getenv('SCRAPER_PAGE_RETRIES', '3'))
+        self.page_retry_backoff = float(os.getenv('SCRAPER_RETRY_BACKOFF_SECONDS', '2'))
+        self.checkpoint_file = Path(checkpoint_file) if checkpoint_file else None
+        # Older checkpoints describe a listing that has changed too much to resume
+        self.checkpoint_max_age = float(os.getenv('CRAWL_CHECKPOINT_MAX_AGE_MINUTES', '180')) * 60
+
+        # Distance-based location matching (optional): postings within MAX_DISTANCE_KM of HOME_LOCATION
+        self.distance_filter = None
+        if os.getenv('HOME_LOCATION'):
+            from gazetteer import DistanceFilter
+            self.distance_filter = DistanceFilter.from_env()
+
+    def _get_executor(self):
+        """Return the pool used for CPU-bound work, creating it on first use"""
+        if self._executor is None:
+            if self.parse_executor == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix='parse')
+        return self._executor
+
+    async def _run_cpu(self, func, *args):
+        """Run CPU-bound `func(*args)` off the event loop (or inline if configured)"""
+        if self.parse_executor == 'inline':
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def _parse_page(self, html: str, page_number: int) -> List[Job]:
+        """Parse a listing page on the parse executor
+
+        Process workers hand back plain dicts and the Jobs are built here: interned
+        strings don't survive pickling, so they have to be interned in this process.
+        """
+        if self.parse_executor == 'process':
+            records = await self._run_cpu(parse_page_records, html, page_number)
+            return [Job.from_dict(record) for record in records]
+        return await self._run_cpu(parse_page_html, html, page_number)
+
+    def close(self):
+        """Shut down the parse worker pool and the debug writer"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.debug_writer is not None:
+            self.debug_writer.close()
+
+    @staticmethod
+    def _headless() -> bool:
+        """Run headless in CI environments (GitHub Actions, etc.), with a visible browser otherwise"""
+        is_ci = os.getenv('CI') or os.getenv('GITHUB_ACTIONS')
+        return True if is_ci else False
+
+    async def start_browser(self):
+        """Launch a browser that stays open across crawls (used by the daemon)"""
+        if self._browser is not None and self._browser.is_connected():
+            return
+        await self.stop_browser()
+        with metrics.span('scraper_browser_launch_seconds'):
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self._headless())
+        logger.info("Started persistent browser")
+
+    async def stop_browser(self):
+        """Close the persistent browser, if one is running"""
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @asynccontextmanager
+    async def _browser_page(self):
+        """Open a page in the persistent browser, or in a browser launched just for this crawl"""
+        if self._browser is not None:
+            if not self._browser.is_connected():
+                logger.warning("Persistent browser disconnected - restarting it")
+                await self.start_browser()
+            page = await self._browser.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+            return
+
+        async with async_playwright() as p:
+            with metrics.span('scraper_browser_launch_seconds'):
+                browser = await p.chromium.launch(headless=self._headless())
+            try:
+                yield await browser.new_page()
+            finally:
+                await browser.close()
 
-    async def fetch_and_parse_all_pages(self) -> List[Dict]:
+    async def fetch_and_parse_all_pages(self) -> List[Job]:
         """
         Fetch all job postings pages using Playwright and parse them per-page.
         Returns a list of all jobs with accurate page_number and listing_position.
-        """
-        import os
-        # Detect if running in CI environment (GitHub Actions, etc.)
-        is_ci = os.getenv('CI') or os.getenv('GITHUB_ACTIONS')
-        headless_mode = True if is_ci else False
 
+        If the crawl fails part-way, the jobs of the pages fetched so far are
+        returned and `last_crawl_complete` is False (a partial result).
+        """
         all_jobs = []
+        async for jobs_from_page in self.iter_page_jobs():
+            all_jobs.extend(jobs_from_page)
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=headless_mode)
-            page = await browser.new_page()
+        if not self.last_crawl_complete and all_jobs:
+            logger.warning(f"Crawl incomplete - returning the {len(all_jobs)} jobs parsed so far (partial)")
+        return all_jobs
 
+    async def iter_page_jobs(self) -> AsyncIterator[List[Job]]:
+        """
+        Fetch job postings pages one by one, yielding each page's parsed jobs
+        as soon as the page is loaded (tagged with page_number and listing_position).
+
+        Lets downstream stages (filter, translate, notify) start on page 1
+        while later pages are still loading. After iteration,
+        `last_crawl_complete` tells whether every page was fetched.
+
+        Each posting is yielded once per crawl. If postings are added while
+        the crawl clicks through the pages, the listing shifts down and the
+        end of one page reappears at the top of the next; those repeats are
+        dropped (see page_shifts / last_crawl_duplicates) and page 1 is
+        checked again at the end for the postings that caused the shift.
+
+        Each page is retried with exponential backoff. With checkpoint_file
+        set, progress is saved after every page, so a crawl that still fails
+        (or is killed) is resumed by the next one at the failing page: the
+        jobs of the pages already done are yielded from the checkpoint first.
+        """
+        all_jobs = []
+        pages = 0
+        self.last_crawl_complete = False
+        self.page_shifts = {}
+        self.last_crawl_duplicates = 0
+        self.last_crawl_resumed_from = None
+        yielded_ids = set()
+        if self.debug:
+            self.debug_writer.start_run()
+
+        page_num = 1
+        page_url = self.url
+        checkpoint = self._load_checkpoint()
+        if checkpoint:
+            page_num, page_url, pages = checkpoint['next_page'], checkpoint['next_url'], checkpoint['pages_done']
+            self.last_crawl_resumed_from = page_num
+            restored = [Job.from_dict(data) for data in checkpoint['jobs']]
+            logger.info(f"Resuming crawl at page {page_num} from checkpoint "
+                        f"({pages} pages and {len(restored)} jobs already parsed)")
+            metrics.inc('scraper_resumed_total')
+            for _, page_jobs in groupby(restored, key=lambda job: job.page_number):
+                page_jobs = list(page_jobs)
+                yielded_ids.update(job.id for job in page_jobs)
+                all_jobs.extend(page_jobs)
+                yield page_jobs
+        started_at = checkpoint['started_at'] if checkpoint else time.time()
+
+        async with self._browser_page() as page:
             try:
-                await page.goto(self.URL, wait_until='networkidle')
-                await page.wait_for_timeout(2000)
-
-                page_num = 1
+                current_html = await self._load_listing_page(page, page_num, page_url, wait_ms=2000)
                 previous_html = None
 
                 while True:
                     logger.info(f"Fetching page {page_num}...")
-                    current_html = await page.content()
 
                     # Check if content changed from previous page
                     if previous_html == current_html:
                         logger.info(f"Content unchanged - reached end of pagination")
                         break
 
-                    # Save HTML for debugging if in debug mode
+                    pages = page_num
+
+                    # Queue the HTML for the debug writer (compressed in its own thread)
                     if self.debug:
-                        self.page_htmls[page_num] = current_html
-                        html_file = self.debug_dir / f"page_{page_num}.html"
-                        with open(html_file, 'w', encoding='utf-8') as f:
-                            f.write(current_html)
-                        logger.info(f"Saved HTML debug file: {html_file}")
-
-                    # Parse and tag jobs from this page immediately
-                    jobs_from_page = self._parse_page_jobs(current_html, page_num)
+                        self.debug_writer.add_page(page_num, current_html)
+
+                    # Parse and tag jobs from this page in the worker pool, so the
+                    # event loop keeps serving translation/Telegram I/O meanwhile
+                    with metrics.span('scraper_page_parse_seconds', page=page_num):
+                        jobs_from_page = await self._parse_page(current_html, page_num)
+                    jobs_from_page = self._drop_run_duplicates(jobs_from_page, yielded_ids, page_num)
                     all_jobs.extend(jobs_from_page)
+                    metrics.inc('scraper_pages_total')
+                    metrics.inc('scraper_jobs_total', len(jobs_from_page))
+                    metrics.set_gauge('scraper_page_jobs', len(jobs_from_page), page=page_num)
+                    metrics.set_gauge('scraper_page_html_bytes', len(current_html), page=page_num)
                     logger.info(f"Found {len(jobs_from_page)} jobs on page {page_num}")
 
+                    # Hand this page downstream before navigating further
+                    yield jobs_from_page
+
                     previous_html = current_html
 
-                    # Try to find and click the next button
+                    # Try to find the next button
                     next_button = await page.query_selector("a.arrow.next")
 
                     if not next_button:
                         logger.info(f"No next button found - reached last page")
                         break
 
-                    # Click next button
-                    logger.info(f"Clicking next button to go to page {page_num + 1}...")
-                    await next_button.click()
+                    # Follow its link, so a failed page can be retried (and resumed) by URL
+                    href = await next_button.get_attribute('href')
+                    next_url = urljoin(page.url, href) if href and not href.startswith('javascript') else None
+                    if next_url == page.url:
+                        logger.info(f"Next button leads back to this page - reached last page")
+                        break
+                    if self.checkpoint_file is not None:
+                        await self._save_checkpoint({
+                            'listing': self.url,
+                            'started_at': started_at,
+                            'updated_at': time.time(),
+                            'pages_done': page_num,
+                            'next_page': page_num + 1,
+                            'next_url': next_url,
+                            'jobs': [{**job.to_dict(), 'text': job.text} for job in all_jobs],
+                        })
+
+                    logger.info(f"Going to page {page_num + 1}...")
+                    current_html = await self._load_listing_page(page, page_num + 1, next_url, wait_ms=2500,
+                                                                 next_button=next_button)
+                    page_num += 1
 
-                    # Wait for page to load
-                    await page.wait_for_timeout(2500)
+                # Postings inserted mid-crawl pushed the listing down; they are on page 1 now
+                inserted = max(self.page_shifts.values(), default=0)
+                if inserted:
+                    logger.warning(f"Listing shifted by {inserted} during the crawl - re-checking page 1 for new postings")
+                    recheck_html = await self._load_listing_page(page, 1, self.url, wait_ms=2000)
+                    recheck_jobs = await self._parse_page(recheck_html, 1)
+                    fresh_jobs = [job for job in recheck_jobs if job.id not in yielded_ids]
+                    yielded_ids.update(job.id for job in fresh_jobs)
+                    if fresh_jobs:
+                        logger.info(f"Found {len(fresh_jobs)} postings added during the crawl")
+                        all_jobs.extend(fresh_jobs)
+                        yield fresh_jobs
+
+                self.last_crawl_complete = True
+                self._clear_checkpoint()
+                logger.info(f"Completed fetching all pages. Total jobs parsed: {len(all_jobs)}")
 
-                    page_num += 1
+            except Exception as e:
+                logger.error(f"Failed to fetch pages: {e}")
+                metrics.inc('scraper_crawl_errors_total')
+                if pages:
+                    logger.warning(f"Crawl stopped after page {pages} with {len(all_jobs)} jobs (partial)"
+                                   f"{'; the next run resumes from the checkpoint' if self.checkpoint_file else ''}")
 
-                await browser.close()
+        # Save extracted jobs and analysis; failed crawls keep their raw HTML
+        if self.debug:
+            await self.debug_writer.finish_run(all_jobs, pages, self.last_crawl_complete)
 
-                logger.info(f"Completed fetching all pages. Total jobs parsed: {len(all_jobs)}")
+    async def _load_listing_page(self, page, page_num: int, url: Optional[str], wait_ms: int,
+                                 next_button=None) -> str:
+        """
+        Navigate to a listing page and return its HTML, retrying with exponential backoff
 
-                # Save extracted jobs to JSON for debugging if in debug mode
-                if self.debug:
-                    jobs_file = self.debug_dir / "extracted_jobs.json"
-                    with open(jobs_file, 'w', encoding='utf-8') as f:
-                        json.dump(all_jobs, f, ensure_ascii=False, indent=2)
-                    logger.info(f"Saved extracted jobs debug file: {jobs_file}")
-
-                    # Save a summary with location analysis
-                    summary_file = self.debug_dir / "location_analysis.json"
-                    location_analysis = {
-                        "total_jobs": len(all_jobs),
-                        "jobs_with_location": sum(1 for j in all_jobs if j.get('location')),
-                        "jobs_without_location": sum(1 for j in all_jobs if not j.get('location')),
-                        "jobs_missing_location": [
-                            {
-                                "id": j.get('id'),
-                                "page": j.get('page_number'),
-                                "position": j.get('listing_position'),
-                                "title": j.get('title'),
-                                "full_text_preview": j.get('full_text', '')[:200]
-                            }
-                            for j in all_jobs if not j.get('location')
-                        ]
-                    }
-                    with open(summary_file, 'w', encoding='utf-8') as f:
-                        json.dump(location_analysis, f, ensure_ascii=False, indent=2)
-                    logger.info(f"Saved location analysis: {summary_file}")
-
-                return all_jobs
+        Args:
+            page: Playwright page
+            page_num: Page number (for logs and metrics)
+            url: Page URL; if None, `next_button` is clicked once instead (nothing to retry with)
+            wait_ms: Fixed wait after navigation for the listing to render
+            next_button: Pagination link to click when there is no URL
+
+        Returns:
+            The page's HTML
 
+        Raises:
+            Exception: the last navigation error once all retries have failed
+        """
+        retries = self.page_retries if url else 0
+        for attempt in range(retries + 1):
+            # Fetch time of a page runs from navigation (goto / next click) to its HTML
+            fetch_started = time.perf_counter()
+            try:
+                if url:
+                    response = await page.goto(url, wait_until='networkidle')
+                    if response is not None and response.status >= 400:
+                        raise RuntimeError(f"HTTP {response.status} for {url}")
+                else:
+                    await next_button.click()
+                with metrics.span('scraper_fixed_wait_seconds'):
+                    await page.wait_for_timeout(wait_ms)
+                html = await page.content()
+                metrics.observe('scraper_page_fetch_seconds', time.perf_counter() - fetch_started, page=page_num)
+                return html
             except Exception as e:
-                logger.error(f"Failed to fetch pages: {e}")
-                await browser.close()
-                return []
+                if attempt >= retries:
+                    raise
+                delay = min(self.PAGE_RETRY_BACKOFF_MAX, self.page_retry_backoff * (2 ** attempt))
+                logger.warning(f"Page {page_num} failed ({e}) - retry {attempt + 1}/{retries} in {delay:.1f}s")
+                metrics.inc('scraper_page_retries_total')
+                await asyncio.sleep(delay)
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        """Return the checkpoint of an unfinished crawl of this listing, if it is recent enough to resume"""
+        if self.checkpoint_file is None:
+            return None
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crawl checkpoint: {e}")
+            return None
+
+        if checkpoint.get('listing') != self.url or not checkpoint.get('next_url'):
+            return None
+        age = time.time() - checkpoint.get('updated_at', 0)
+        if age > self.checkpoint_max_age:
+            logger.info(f"Crawl checkpoint is {age / 60:.0f} minutes old - starting from page 1")
+            return None
+        return checkpoint
+
+    async def _save_checkpoint(self, checkpoint: Dict):
+        """Write crawl progress on the writer thread (a failed write only costs the ability to resume)"""
+        try:
+            await write_json_async(self.checkpoint_file, checkpoint)
+        except Exception as e:
+            logger.warning(f"Failed to save crawl checkpoint: {e}")
+
+    def _clear_checkpoint(self):
+        """Forget crawl progress once every page has been fetched"""
+        if self.checkpoint_file is None:
+            return
+        try:
+            self.checkpoint_file.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to remove crawl checkpoint: {e}")
 
-    def _parse_page_jobs(self, html: str, page_number: int) -> List[Dict]:
+    def _drop_run_duplicates(self, jobs: List[Job], yielded_ids: set, page_number: int) -> List[Job]:
+        """Drop postings already yielded earlier in this crawl, keeping the first occurrence
+
+        The number dropped on a page is how far the listing has shifted down
+        since the crawl started; it is recorded in page_shifts.
+        """
+        unique = []
+        for job in jobs:
+            if job.id in yielded_ids:
+                continue
+            yielded_ids.add(job.id)
+            unique.append(job)
+
+        duplicates = len(jobs) - len(unique)
+        if duplicates:
+            self.page_shifts[page_number] = duplicates
+            self.last_crawl_duplicates += duplicates
+            metrics.inc('scraper_duplicates_total', duplicates)
+            logger.info(f"Page {page_number}: dropped {duplicates} postings already seen on earlier pages "
+                        f"(listing shifted by {duplicates})")
+        return unique
+
+    @classmethod
+    def _parse_page_jobs(cls, html: str, page_number: int) -> List[Job]:
         """
         Parse jobs from a single page's HTML and tag them with page_number and listing_position.
         This ensures accurate attribution of each job to its page.
@@ -165,11 +480,11 @@ class JobScraper:
         # Extract and tag each job with page and position information
         for position_idx, item in enumerate(job_items, 1):
             try:
-                job = self._extract_job_info(item)
-                if job and job.get('title'):  # Only add if we got a title
+                job = cls._extract_job_info(item)
+                if job and job.title:  # Only add if we got a title
                     # Tag with accurate page and position (1-indexed)
-                    job['page_number'] = page_number
-                    job['listing_position'] = position_idx
+                    job.page_number = page_number
+                    job.listing_position = position_idx
                     jobs_on_page.append(job)
             except Exception as e:
                 logger.debug(f"Failed to extract job info from page {page_number}, position {position_idx}: {e}")
@@ -207,7 +522,8 @@ class JobScraper:
         logger.info(f"Found {len(jobs)} total job postings")
         return jobs
 
-    def _extract_job_info(self, item) -> Optional[Dict]:
+    @classmethod
+    def _extract_job_info(cls, item) -> Optional[Job]:
         """Extract information from a job posting element"""
         job = {}
 
@@ -229,7 +545,8 @@ class JobScraper:
         job['title'] = title_elem.get_text(strip=True) if title_elem else item.get_text(strip=True)[:50]
 
         # Extract all text for comprehensive filtering
-        job['full_text'] = item.get_text(separator=' ', strip=True).lower()
+        text = item.get_text(separator=' ', strip=True)
+        job['full_text'] = text.lower()
 
         # Extract location directly from HTML place element
         place_elem = item.find('p', class_='place')
@@ -237,9 +554,9 @@ class JobScraper:
 
         # Extract organization - usually before job title or in parent elements
         org_lines = []
-        for text in job['full_text'].split():
-            if len(text) > 2 and not any(keyword in text for keyword in ['職', '助理', '治療', '護理']):
-                org_lines.append(text)
+        for word in job['full_text'].split():
+            if len(word) > 2 and not any(keyword in word for keyword in ['職', '助理', '治療', '護理']):
+                org_lines.append(word)
         job['organization'] = org_lines[0] if org_lines else ""
 
         # Extract start date - look for date patterns
@@ -249,18 +566,38 @@ class JobScraper:
         # Extract employment type
         job['employment_type'] = "正職" if "正職" in job['full_text'] else ""
 
-        # Extract salary if present
+        # First number pair in the text; kept only because job IDs hash it (the
+        # Job stores the 薪資待遇 field instead, see below)
         salary_match = re.search(r'[\d,]+.*?[\d,]+', job['full_text'])
         job['salary'] = salary_match.group(0) if salary_match else ""
 
-        job['url'] = self.URL
+        job['url'] = cls.URL
 
         # Generate unique hash ID from all job fields
-        job['id'] = self._generate_job_id(job)
-
-        return job
-
-    def _generate_job_id(self, job_dict: Dict) -> str:
+        job['id'] = cls._generate_job_id(job)
+
+        # Stable identity of the posting itself, unchanged when details such as
+        # salary or dates are revised (added after 'id' so IDs stay compatible)
+        job['posting_key'] = cls._generate_posting_key(item, job)
+
+        # The dict above only exists to keep IDs stable; store the compact record.
+        # Salary is the listing's 薪資待遇 value (Job parses it once into job.pay)
+        salary_text = extract_salary_text(text)
+        return Job(
+            title=job['title'],
+            text=text,
+            id=job['id'],
+            posting_key=job['posting_key'],
+            location=job['location'],
+            organization=job['organization'],
+            start_date=job['start_date'],
+            employment_type=job['employment_type'],
+            salary=salary_text,
+            url=job['url'],
+        )
+
+    @classmethod
+    def _generate_job_id(cls, job_dict: Dict) -> str:
         """Generate a unique hash ID from the entire job posting for maximum uniqueness"""
         import hashlib
         # Create a deterministic string from all job fields
@@ -269,6 +606,45 @@ class JobScraper:
         job_hash = hashlib.sha256(job_string.encode('utf-8')).hexdigest()[:16]
         return job_hash
 
+    @classmethod
+    def _generate_posting_key(cls, item, job_dict: Dict) -> str:
+        """
+        Generate an ID for the posting that survives edits to its details
+
+        The site has no per-posting URL or serial number, so the key combines
+        the listing's job title with the topInfo fields a revision leaves alone
+        (POSTING_KEY_FIELDS). Items without that markup fall back to the parsed
+        title, organization and location. Keys can still collide, e.g. for an
+        organization listing the same position twice; JobPipeline only treats a
+        job as a revision when that is unambiguous.
+        """
+        import hashlib
+        title_elem = item.find('p', class_='jobTitle')
+        top_info = item.find('div', class_='topInfo')
+        if title_elem and top_info:
+            fields = {}
+            for row in top_info.find_all('p'):
+                label = ''.join(row.find_all(string=True, recursive=False)).strip()
+                value = row.find('span')
+                fields[label] = value.get_text(strip=True) if value else ''
+            parts = [title_elem.get_text(strip=True)] + [fields.get(field, '') for field in cls.POSTING_KEY_FIELDS]
+        else:
+            parts = [job_dict.get(field, '') for field in ('title', 'organization', 'location')]
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def _location_matches(self, job: Dict) -> bool:
+        """Whether the job's place is within range (distance filter) or names a target location
+
+        Places the distance filter can't resolve to a district fall back to
+        substring matching against TARGET_LOCATIONS.
+        """
+        if self.distance_filter is not None:
+            within = self.distance_filter.matches(job['location'])
+            if within is not None:
+                return within
+        location = job['location'].lower()
+        return any(loc.lower() in location for loc in self.TARGET_LOCATIONS)
+
     def filter_jobs(self, jobs: List[Dict]) -> List[Dict]:
         """Filter jobs based on criteria"""
         filtered = []
@@ -280,10 +656,7 @@ class JobScraper:
                 continue
 
             # Check location
-            location = job['location'].lower()
-            location_match = any(loc.lower() in location for loc in self.TARGET_LOCATIONS)
-
-            if not location_match:
+            if not self._location_matches(job):
                 logger.debug(f"Filtered out (location): {job['title']} - {job['location']}")
                 continue
 
@@ -300,6 +673,11 @@ class JobScraper:
                 logger.debug(f"Filtered out (start date): {job['title']} - {job['start_date']}")
                 continue
 
+            # Check salary
+            if not self._check_salary(job):
+                logger.debug(f"Filtered out (salary): {job['title']} - {job['salary']}")
+                continue
+
             filtered.append(job)
 
         logger.info(f"Filtered to {len(filtered)} matching job postings")
@@ -315,8 +693,7 @@ class JobScraper:
                 continue
 
             # Check location
-            location = job['location'].lower()
-            location_match = any(loc.lower() in location for loc in self.TARGET_LOCATIONS)
+            location_match = self._location_matches(job)
 
             # Check pediatric exclusion
             full_text = job['full_text']
@@ -327,12 +704,22 @@ class JobScraper:
 
             # Include if it's new AND doesn't match the criteria
             # (i.e., fails at least one filter)
-            if not (location_match and not has_excluded and date_ok):
+            if not (location_match and not has_excluded and date_ok and self._check_salary(job)):
                 new_unmatched.append(job)
 
         logger.info(f"Found {len(new_unmatched)} new unmatched job postings")
         return new_unmatched
 
+    def _check_salary(self, job: Dict) -> bool:
+        """Check the posting's best-case monthly pay against TARGET_MIN_MONTHLY_SALARY"""
+        if self.TARGET_MIN_MONTHLY_SALARY is None:
+            return True
+        pay = salary_of(job)
+        # No comparable amount, or open-ended pay ("45,000以上") that can reach any minimum
+        if pay.monthly_min is None or pay.maximum is None:
+            return True
+        return pay.monthly_max >= self.TARGET_MIN_MONTHLY_SALARY
+
     def _check_start_date(self, date_text: str) -> bool:
         """Check if job start date is within target range (Feb 15 - Apr 15, 2026)
 
@@ -379,10 +766,25 @@ class JobScraper:
 
     def save_seen_jobs(self, jobs: List[Dict]):
         """Save job IDs to prevent duplicate alerts"""
-        self.seen_jobs.update(job['id'] for job in jobs)
+        self.save_seen_ids(job['id'] for job in jobs)
+
+    def save_seen_ids(self, job_ids):
+        """Save job IDs (e.g. those whose alerts were delivered) to prevent duplicate alerts"""
+        self.seen_jobs.update(job_ids)
         try:
-            with open(self.SEEN_JOBS_FILE, 'w') as f:
-                json.dump(list(self.seen_jobs), f)
+            atomic_write_json(self.SEEN_JOBS_FILE, list(self.seen_jobs))
+        except Exception as e:
+            logger.error(f"Failed to save seen jobs: {e}")
+
+    async def save_seen_ids_async(self, job_ids):
+        """Like save_seen_ids, but writes the file on the writer thread instead of the event loop"""
+        job_ids = set(job_ids)
+        if not job_ids:
+            return
+        self.seen_jobs.update(job_ids)
+        try:
+            # Snapshot now; the set may change while the write is queued
+            await write_json_async(self.SEEN_JOBS_FILE, list(self.seen_jobs))
         except Exception as e:
             logger.error(f"Failed to save seen jobs: {e}")
 
@@ -398,11 +800,10 @@ class JobScraper:
         """
         logger.info("Starting job scraping...")
 
-        html = await self.fetch_all_pages()
-        if not html:
+        jobs = await self.fetch_and_parse_all_pages()
+        if not jobs:
             return []
 
-        jobs = self.parse_jobs(html)
         filtered_jobs = self.filter_jobs(jobs)
         self.save_seen_jobs(jobs)  # Mark all as seen to avoid duplicates
 
@@ -417,3 +818,14 @@ class JobScraper:
             return translated_jobs
 
         return filtered_jobs
+
+
+def parse_page_html(html: str, page_number: int) -> List[Job]:
+    """Parse one page's HTML into Job records (module-level so process pools can pickle it)"""
+    return JobScraper._parse_page_jobs(html, page_number)
+
+
+def parse_page_records(html: str, page_number: int) -> List[Dict[str, Any]]:
+    """Parse one page's HTML into plain job dicts (what process pool workers send back)"""
+    return [{**job.to_dict(), 'text': job.text} for job in parse_page_html(html, page_number)]
+
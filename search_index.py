@@ -0,0 +1,306 @@
+"""
+Full-text search over every posting ever seen
+Postings are kept in an SQLite database (data/search.db) with an FTS5 index.
+FTS5's built-in tokenizers treat a run of Chinese characters as a single
+token, so text is split into overlapping character bigrams before indexing
+(職能治療 → 職能 能治 治療) and queries are turned into bigram phrases. This
+finds any word of two or more characters without a Chinese segmenter.
+
+The index is updated incrementally after each crawl; only postings with new
+IDs are tokenized and inserted.
+"""
+
+import logging
+import re
+import sqlite3
+import unicodedata
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_CJK = r'\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_PATTERN = re.compile(rf'[{_CJK}]+|[0-9a-z]+')
+_CJK_RUN = re.compile(rf'[{_CJK}]+')
+_DATE_PATTERN = re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+_CITY_PATTERN = re.compile(r'^(..[市縣])')
+
+
+def normalize(text: str) -> str:
+    """Fold full-width characters and case, and spell 台 as 臺 (the site uses both)"""
+    return unicodedata.normalize('NFKC', text).lower().replace('台', '臺')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index tokens
+
+    Chinese runs become overlapping bigrams (a single character stays a
+    unigram); Latin words and numbers are kept whole.
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(normalize(text)):
+        if len(run) > 1 and _CJK_RUN.fullmatch(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn a user query into an FTS5 MATCH expression
+
+    Each whitespace-separated term must match (AND). A term becomes a phrase of
+    its bigrams, so they have to appear consecutively, i.e. as the original
+    word. A single Chinese character is matched as a bigram prefix.
+
+    Returns:
+        MATCH expression, or None if the query has no searchable characters
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        # Tokens only contain letters, digits and CJK characters, so quoting is safe
+        phrase = '"' + ' '.join(tokens) + '"'
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RUN.fullmatch(tokens[0]):
+            phrase += '*'
+        phrases.append(phrase)
+    return ' AND '.join(phrases) or None
+
+
+def _iso_date(text: str) -> str:
+    """'YYYY-MM-DD' for the first valid date in text, or '' (so it sorts and compares as text)"""
+    match = _DATE_PATTERN.search(text or '')
+    if not match:
+        return ''
+    try:
+        return date(*(int(group) for group in match.groups())).isoformat()
+    except ValueError:
+        # Includes the 0000-00-00 placeholder the site uses for empty dates
+        return ''
+
+
+class SearchIndex:
+    """SQLite store of all postings with a bigram FTS5 index"""
+
+    INDEX_FILE = Path("data/search.db")
+
+    # bm25 column weights: title, organization, location, body
+    RANK_WEIGHTS = (5.0, 2.0, 2.0, 1.0)
+
+    # Characters of context shown on each side of the first hit
+    SNIPPET_CONTEXT = 40
+
+    def __init__(self, path: Path = INDEX_FILE):
+        """
+        Open (or create) the search database
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                posting_key TEXT NOT NULL,
+                title TEXT NOT NULL,
+                organization TEXT NOT NULL,
+                location TEXT NOT NULL,
+                city TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                url TEXT NOT NULL,
+                text TEXT NOT NULL,
+                current INTEGER NOT NULL DEFAULT 1,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_key ON postings(posting_key)")
+        # Contentless: the bigram text is only needed for matching, the originals live in postings
+        self.conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS postings_fts USING fts5(
+                title, organization, location, body, content='', tokenize='unicode61'
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+
+    def add_jobs(self, jobs: Iterable) -> int:
+        """
+        Index postings not seen before and refresh last_seen of known ones
+
+        When a revised posting (new ID, same posting_key) is added, older
+        versions that are no longer listed stop being 'current' and drop out
+        of default search results. Postings listed alongside it keep theirs,
+        since two live postings can share a posting_key.
+
+        Args:
+            jobs: Job records (or job dicts) from a crawl
+
+        Returns:
+            Number of newly indexed postings
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        added = 0
+        with self.conn:
+            # Refresh every listed posting first, so the check below sees them as live
+            new_jobs = []
+            for job in jobs:
+                cursor = self.conn.execute(
+                    "UPDATE postings SET last_seen = ? WHERE id = ?", (now, job['id'])
+                )
+                if not cursor.rowcount:
+                    new_jobs.append(job)
+
+            for job in new_jobs:
+                posting_key = job.get('posting_key') or job['id']
+                # Job records keep the item text as an attribute; job dicts have only full_text
+                text = getattr(job, 'text', None) or job['full_text']
+                location = job['location']
+                city = _CITY_PATTERN.match(normalize(location))
+                self.conn.execute(
+                    "UPDATE postings SET current = 0 WHERE posting_key = ? AND last_seen < ?", (posting_key, now)
+                )
+                cursor = self.conn.execute(
+                    """
+                    INSERT INTO postings (id, posting_key, title, organization, location, city, start_date,
+                                          url, text, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job['id'], posting_key, job['title'], job['organization'], location,
+                     city.group(1) if city else '', _iso_date(job['start_date']), job['url'], text, now, now)
+                )
+                self.conn.execute(
+                    "INSERT INTO postings_fts (rowid, title, organization, location, body) VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, *(' '.join(tokenize(value)) for value in
+                                         (job['title'], job['organization'], location, text)))
+                )
+                added += 1
+        return added
+
+    def search(self, query: str, location: Optional[str] = None, since: Optional[date] = None,
+               until: Optional[date] = None, limit: int = 20, include_old: bool = False) -> Dict:
+        """
+        Ranked full-text search with date and location facets
+
+        Args:
+            query: Search terms (all must match)
+            location: Only postings whose location contains this text
+            since: Only postings starting on or after this date
+            until: Only postings starting on or before this date
+            limit: Maximum number of results
+            include_old: Also return superseded versions of revised postings
+
+        Returns:
+            {'total', 'results', 'facets': {'city', 'start_month'}}; facet counts
+            cover all matches, not just the returned page of results
+        """
+        empty = {'total': 0, 'results': [], 'facets': {'city': {}, 'start_month': {}}}
+        match = build_match_query(query)
+        if match is None:
+            return empty
+
+        conditions = ["postings_fts MATCH ?"]
+        params: List = [match]
+        if not include_old:
+            conditions.append("p.current = 1")
+        if location:
+            conditions.append("instr(replace(lower(p.location), '台', '臺'), ?) > 0")
+            params.append(normalize(location))
+        if since:
+            conditions.append("p.start_date >= ?")
+            params.append(since.isoformat())
+        if until:
+            conditions.append("p.start_date != '' AND p.start_date <= ?")
+            params.append(until.isoformat())
+
+        weights = ', '.join(str(weight) for weight in self.RANK_WEIGHTS)
+        hits = f"""
+            WITH hits AS (
+                SELECT p.*, bm25(postings_fts, {weights}) AS score
+                FROM postings_fts JOIN postings p ON p.rowid = postings_fts.rowid
+                WHERE {' AND '.join(conditions)}
+            )
+        """
+        try:
+            rows = self.conn.execute(
+                hits + "SELECT * FROM hits ORDER BY score, last_seen DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+            city_counts = self.conn.execute(
+                hits + "SELECT city, COUNT(*) FROM hits GROUP BY city ORDER BY COUNT(*) DESC", params
+            ).fetchall()
+            month_counts = self.conn.execute(
+                hits + "SELECT substr(start_date, 1, 7), COUNT(*) FROM hits GROUP BY 1 ORDER BY 1", params
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.error(f"Search failed for {query!r}: {e}")
+            return empty
+
+        terms = [normalize(term) for term in query.split()]
+        return {
+            'total': sum(count for _, count in city_counts),
+            'results': [
+                {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'organization': row['organization'],
+                    'location': row['location'],
+                    'start_date': row['start_date'],
+                    'url': row['url'],
+                    'first_seen': row['first_seen'],
+                    'last_seen': row['last_seen'],
+                    'current': bool(row['current']),
+                    'score': round(-row['score'], 3),
+                    'snippet': self._snippet(row['text'], terms),
+                }
+                for row in rows
+            ],
+            'facets': {
+                'city': {city or '(unknown)': count for city, count in city_counts},
+                'start_month': {month or '(no date)': count for month, count in month_counts},
+            },
+        }
+
+    def _snippet(self, text: str, terms: List[str]) -> str:
+        """Text around the first occurrence of any query term"""
+        # NFKC can change the length of the text, so search a normalized copy only when it didn't
+        normalized = normalize(text)
+        haystack = normalized if len(normalized) == len(text) else text.lower()
+        positions = [haystack.find(term) for term in terms]
+        positions = [position for position in positions if position >= 0]
+        start = max(0, min(positions) - self.SNIPPET_CONTEXT) if positions else 0
+        end = start + 2 * self.SNIPPET_CONTEXT
+        snippet = ' '.join(text[start:end].split())
+        return ('…' if start else '') + snippet + ('…' if end < len(text) else '')
+
+
+def update_search_index(jobs: List, path: Path = SearchIndex.INDEX_FILE) -> int:
+    """
+    Add a crawl's postings to the search index (blocking; run it off the event loop)
+
+    Returns:
+        Number of postings added
+    """
+    index = SearchIndex(path)
+    try:
+        added = index.add_jobs(jobs)
+        if added:
+            logger.info(f"Search index: added {added} postings ({len(index)} total)")
+        return added
+    finally:
+        index.close()
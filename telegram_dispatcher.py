@@ -0,0 +1,267 @@
+"""
+Rate-limited concurrent dispatcher for Telegram Bot API calls
+Keeps sends under Telegram's flood limits and retries 429s after `retry_after`
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: allows `rate` acquisitions per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available, then take it"""
+        # The lock makes waiters queue up in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Block all acquisitions for `seconds` (used when Telegram asks us to back off)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.updated = time.monotonic()
+
+
+class TelegramDispatcher:
+    """Sends Bot API requests through per-chat and global rate limiters with retries"""
+
+    # Telegram allows ~30 messages/second overall and ~1 message/second per chat
+    # (short bursts are tolerated)
+    DEFAULT_GLOBAL_RATE = 30.0
+    DEFAULT_PER_CHAT_RATE = 1.0
+    DEFAULT_PER_CHAT_BURST = 3
+    DEFAULT_WORKERS = 4
+    DEFAULT_MAX_RETRIES = 5
+
+    # Backoff for network errors and 5xx responses (seconds)
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 30.0
+
+    # Network errors raised before the request was sent; retrying them can't
+    # deliver a message twice (a read error may come after Telegram got it)
+    RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+    def __init__(
+        self,
+        base_url: str,
+        workers: int = DEFAULT_WORKERS,
+        per_chat_rate: float = DEFAULT_PER_CHAT_RATE,
+        per_chat_burst: int = DEFAULT_PER_CHAT_BURST,
+        global_rate: float = DEFAULT_GLOBAL_RATE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """
+        Initialize dispatcher
+
+        Args:
+            base_url: Bot API base URL (https://api.telegram.org/bot<token>)
+            workers: Maximum number of concurrent send workers
+            per_chat_rate: Sustained messages per second to a single chat
+            per_chat_burst: Messages that may be sent to a chat in a burst
+            global_rate: Sustained messages per second across all chats
+            max_retries: Retries per request before it is counted as failed
+        """
+        self.base_url = base_url
+        self.workers = max(1, workers)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.stats = {
+            'sent': 0,
+            'retried': 0,
+            'failed': 0,
+            'rate_limited': 0,
+        }
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        """Return the rate limiter for a chat, creating it on first use"""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        """Extract `parameters.retry_after` from a 429 response (defaults to 1 second)"""
+        try:
+            return float(response.json().get('parameters', {}).get('retry_after', 1))
+        except Exception:
+            return 1.0
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff delay for the given attempt number"""
+        return min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt))
+
+    async def call(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        chat_id: str,
+        json: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+    ) -> httpx.Response:
+        """
+        Call a Bot API method, waiting for rate-limit tokens and retrying on
+        429 (after `retry_after`), 5xx and connection errors
+
+        Args:
+            client: HTTP client to send the request with
+            method: Bot API method name (e.g. 'sendMessage')
+            chat_id: Target chat, used for per-chat rate limiting
+            json / data / files: Request body, passed through to httpx
+
+        Returns:
+            Successful HTTP response
+
+        Raises:
+            httpx.HTTPError: if the request still fails after all retries
+        """
+        chat_bucket = self._chat_bucket(chat_id)
+        url = f"{self.base_url}/{method}"
+
+        for attempt in range(self.max_retries + 1):
+            await self.global_bucket.acquire()
+            await chat_bucket.acquire()
+
+            try:
+                with metrics.span('telegram_request_seconds', method=method):
+                    response = await client.post(url, json=json, data=data, files=files)
+            except httpx.TransportError as e:
+                if not isinstance(e, self.RETRYABLE_ERRORS) or attempt >= self.max_retries:
+                    self.stats['failed'] += 1
+                    metrics.inc('telegram_failed_total', method=method)
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Telegram {method} network error ({e}), retrying in {delay:.1f}s")
+                self.stats['retried'] += 1
+                metrics.inc('telegram_retries_total', method=method)
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                retry_after = self._retry_after(response)
+                logger.warning(f"Telegram rate limit hit on {method}, retrying after {retry_after:.0f}s")
+                self.stats['rate_limited'] += 1
+                self.stats['retried'] += 1
+                metrics.inc('telegram_rate_limited_total', method=method)
+                metrics.inc('telegram_retries_total', method=method)
+                metrics.inc('telegram_retry_after_seconds_total', retry_after)
+                # Back off the whole chat, not just this request
+                chat_bucket.pause(retry_after)
+                continue
+
+            if response.status_code >= 500 and attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                logger.warning(f"Telegram {method} returned {response.status_code}, retrying in {delay:.1f}s")
+                self.stats['retried'] += 1
+                metrics.inc('telegram_retries_total', method=method)
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError:
+                if response.status_code == 429:
+                    self.stats['rate_limited'] += 1
+                    metrics.inc('telegram_rate_limited_total', method=method)
+                self.stats['failed'] += 1
+                metrics.inc('telegram_failed_total', method=method)
+                raise
+
+            self.stats['sent'] += 1
+            metrics.inc('telegram_sent_total', method=method)
+            return response
+
+    @staticmethod
+    def _message_id(response: httpx.Response) -> Optional[int]:
+        """Extract result.message_id from a successful Bot API response"""
+        try:
+            return response.json()['result']['message_id']
+        except Exception:
+            return None
+
+    async def dispatch(
+        self, client: httpx.AsyncClient, chat_id: str, groups: Sequence[Sequence[Dict]]
+    ) -> List[List[Optional[int]]]:
+        """
+        Send groups of sendMessage payloads through a bounded worker pool
+
+        Messages within a group are sent in order (e.g. the Chinese then the
+        English alert for one job); different groups are sent concurrently.
+
+        Args:
+            client: HTTP client to send requests with
+            chat_id: Target chat
+            groups: Sequence of groups, each a sequence of sendMessage payloads
+
+        Returns:
+            Per-group lists of Telegram message_ids (one per payload, None for
+            payloads that were not delivered), in the same order as `groups`.
+            A group stops at its first failed message so order is preserved.
+        """
+        results = [[None] * len(group) for group in groups]
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, group in enumerate(groups):
+            queue.put_nowait((index, group))
+
+        async def worker():
+            while True:
+                try:
+                    index, group = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    for position, payload in enumerate(group):
+                        response = await self.call(client, 'sendMessage', chat_id, json=payload)
+                        message_id = self._message_id(response)
+                        if message_id is None:
+                            # Without a message_id the alert could never be edited or closed
+                            raise ValueError(f"sendMessage response has no message_id: {response.text[:200]}")
+                        results[index][position] = message_id
+                except Exception as e:
+                    logger.error(f"Failed to send Telegram message group {index + 1}/{len(groups)}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(groups)))))
+        return results
+
+    def get_stats(self) -> Dict:
+        """Return sent / retried / failed counters"""
+        return dict(self.stats)
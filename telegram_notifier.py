@@ -2,144 +2,406 @@
 Telegram notification module for job alerts
 """
 
+import hashlib
+import json
 import logging
-from typing import List, Dict, Optional
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 import httpx
 
+from http_client import client_or_temporary
+from telegram_dispatcher import TelegramDispatcher
+from debug_report import render_debug_report
+from metrics import metrics
+from atomic_io import write_json_async
+
 logger = logging.getLogger(__name__)
 
+# Tags, entities and runs of plain text in Telegram HTML
+_HTML_TOKEN = re.compile(r'<[^>]*>|&#?\w+;|[^<&]+|[<&]')
+
 
 class TelegramNotifier:
     """Sends job alerts via Telegram bot"""
 
-    def __init__(self, bot_token: str, chat_id: str):
+    # Bot API server (TELEGRAM_API_URL overrides it, e.g. for a local stub or Bot API server)
+    API_URL = "https://api.telegram.org"
+
+    # Telegram rejects messages longer than 4096 characters
+    MAX_MESSAGE_LENGTH = 4096
+    # Separator between job blocks in a packed (digest) message
+    PACK_SEPARATOR = "\n\n"
+
+    # Successful getMe probes are cached here and trusted for PROBE_TTL seconds
+    PROBE_CACHE_FILE = Path("data/telegram_probe.json")
+    PROBE_TTL = 6 * 60 * 60
+
+    def __init__(self, bot_token: str, chat_id: str, client: Optional[httpx.AsyncClient] = None,
+                 pack_messages: bool = False, combine_languages: bool = False,
+                 api_url: Optional[str] = None, **dispatcher_options):
         """
         Initialize Telegram notifier
 
         Args:
             bot_token: Telegram bot token from BotFather
             chat_id: Telegram chat ID or channel ID to send messages to
+            client: Shared pooled HTTP client (see http_client.create_http_client).
+                    A temporary client is used per call if not provided.
+            pack_messages: Pack as many job blocks as fit into each message
+                           instead of sending one message per job
+            combine_languages: When packing, put each job's Chinese and English
+                               blocks together instead of separate digests
+            api_url: Bot API server URL (default: TELEGRAM_API_URL or API_URL)
+            **dispatcher_options: Rate limit / worker settings for TelegramDispatcher
         """
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
-
-    async def send_job_alert(self, job: Dict) -> bool:
+        self.api_url = (api_url or os.getenv('TELEGRAM_API_URL') or self.API_URL).rstrip('/')
+        self.base_url = f"{self.api_url}/bot{bot_token}"
+        self.client = client
+        self.pack_messages = pack_messages
+        self.combine_languages = combine_languages
+        self.dispatcher = TelegramDispatcher(self.base_url, **dispatcher_options)
+
+    def _message_payload(self, text: str) -> Dict:
+        """Build a sendMessage payload for the configured chat"""
+        return {
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True
+        }
+
+    async def _send_message(self, client: httpx.AsyncClient, text: str) -> httpx.Response:
+        """Send a single HTML message to the configured chat (rate-limited, retried on 429)"""
+        return await self.dispatcher.call(client, 'sendMessage', self.chat_id, json=self._message_payload(text))
+
+    def _split_message(self, text: str) -> List[str]:
         """
-        Send a job posting alert via Telegram (two messages: one Chinese, one English)
+        Split an over-long message into chunks under MAX_MESSAGE_LENGTH
 
-        Args:
-            job: Job posting dictionary with title, location, etc.
-
-        Returns:
-            True if both messages sent successfully
+        Splits at line breaks, so HTML tags (which never span lines in our
+        formats) are never cut in half; see _split_line for single lines
+        over the limit.
         """
-        message_cn = self._format_job_message(job, language='zh')
-        message_en = self._format_job_message(job, language='en')
+        limit = self.MAX_MESSAGE_LENGTH
+        if len(text) <= limit:
+            return [text]
+
+        chunks = []
+        current = ""
+        for line in text.split("\n"):
+            # A single line over the limit can only be cut mid-line
+            if len(line) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                *pieces, line = self._split_line(line, limit)
+                chunks.extend(pieces)
+
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) > limit:
+                chunks.append(current)
+                current = line
+            else:
+                current = candidate
 
-        try:
-            async with httpx.AsyncClient() as client:
-                # Send Chinese message
-                response_cn = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": message_cn,
-                        "parse_mode": "HTML",
-                        "disable_web_page_preview": True
-                    },
-                    timeout=10
-                )
-                response_cn.raise_for_status()
-
-                # Send English message
-                response_en = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": message_en,
-                        "parse_mode": "HTML",
-                        "disable_web_page_preview": True
-                    },
-                    timeout=10
-                )
-                response_en.raise_for_status()
+        if current:
+            chunks.append(current)
+        return chunks
 
-                logger.info(f"Telegram messages sent (CN + EN) for: {job['title']}")
-                return True
-        except Exception as e:
-            logger.error(f"Failed to send Telegram message: {e}")
-            return False
+    @staticmethod
+    def _split_line(line: str, limit: int) -> List[str]:
+        """
+        Cut one over-long line of HTML into chunks of at most `limit` characters
 
-    async def send_batch_alerts(self, jobs: List[Dict]) -> int:
+        Cuts fall between tags and entities, never inside one, and tags open
+        at a cut are closed at the end of the chunk and reopened at the start
+        of the next, so Telegram can parse every chunk.
         """
-        Send alerts for multiple jobs
+        chunks = []
+        current = ""
+        open_tags: List[Tuple[str, str]] = []  # (name, opening tag)
+
+        def closing(tags) -> str:
+            return "".join(f"</{name}>" for name, _ in reversed(tags))
+
+        def flush():
+            nonlocal current
+            chunks.append(current + closing(open_tags))
+            current = "".join(tag for _, tag in open_tags)
+
+        for token in _HTML_TOKEN.findall(line):
+            if token.startswith('<') and token.endswith('>') and len(token) > 2:
+                name = (token.strip('</>').split() or [''])[0].lower()
+                if token.startswith('</'):
+                    after = list(open_tags)
+                    for position in range(len(after) - 1, -1, -1):
+                        if after[position][0] == name:
+                            del after[position]
+                            break
+                else:
+                    after = open_tags + [(name, token)]
+                if current and len(current) + len(token) + len(closing(after)) > limit:
+                    flush()
+                current += token
+                open_tags = after
+                continue
+
+            if token.startswith('&') and len(token) > 1:
+                # An entity is indivisible
+                if len(current) + len(token) + len(closing(open_tags)) > limit:
+                    flush()
+                current += token
+                continue
+
+            while token:
+                room = limit - len(current) - len(closing(open_tags))
+                if room <= 0:
+                    flush()
+                    continue
+                current += token[:room]
+                token = token[room:]
+
+        if current:
+            chunks.append(current + closing(open_tags))
+        return chunks
+
+    def _pack_blocks(self, blocks: List[str]) -> List[Tuple[str, List[int]]]:
+        """
+        Greedily pack formatted blocks into as few messages as possible
+
+        Messages break only between blocks; a block that is too long on its
+        own is split at line breaks.
 
         Args:
-            jobs: List of job postings
+            blocks: Formatted message blocks (e.g. one per job)
 
         Returns:
-            Number of successfully sent messages
+            List of (message text, indices of the blocks it contains)
         """
-        success_count = 0
+        packed = []
+        current = ""
+        owners: List[int] = []
+
+        for index, block in enumerate(blocks):
+            for piece in self._split_message(block.strip()):
+                candidate = f"{current}{self.PACK_SEPARATOR}{piece}" if current else piece
+                if len(candidate) <= self.MAX_MESSAGE_LENGTH:
+                    current = candidate
+                    if not owners or owners[-1] != index:
+                        owners.append(index)
+                else:
+                    packed.append((current, owners))
+                    current, owners = piece, [index]
+
+        if current:
+            packed.append((current, owners))
+        return packed
+
+    @staticmethod
+    def _content_key(prefix: str, text: str) -> str:
+        """Deterministic key for a rendered message, derived from its content"""
+        return f"{prefix}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+    def _render_packed(self, blocks: List[str], jobs: List[Dict], language: str) -> List[Dict]:
+        """Pack per-job blocks into digest messages (see render_alert_messages)"""
+        messages = []
+        for text, owners in self._pack_blocks(blocks):
+            key = self._content_key(f"digest:{language}", text)
+            messages.append({
+                'key': key,
+                'group': key,
+                'job_ids': [jobs[index]['id'] for index in owners],
+                'language': language,
+                'text': text,
+            })
+        return messages
+
+    def render_alert_messages(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Render full-detail alerts for jobs into ready-to-send messages
+
+        Each message is a dict with:
+            key: Stable identifier (same job/content always gives the same key)
+            group: Messages sharing a group are sent in order (CN then EN)
+            job_ids: IDs of the jobs the message covers
+            language: 'zh', 'en' or 'zh+en'
+            text: HTML message text
 
+        Packing settings (pack_messages / combine_languages) decide whether
+        each job gets its own messages or jobs share digest messages.
+        """
+        if self.pack_messages:
+            if self.combine_languages:
+                blocks = [
+                    self._format_job_message(job, language='zh') + self.PACK_SEPARATOR +
+                    self._format_job_message(job, language='en')
+                    for job in jobs
+                ]
+                return self._render_packed(blocks, jobs, 'zh+en')
+
+            messages = self._render_packed([self._format_job_message(job, language='zh') for job in jobs], jobs, 'zh')
+            messages += self._render_packed([self._format_job_message(job, language='en') for job in jobs], jobs, 'en')
+            return messages
+
+        messages = []
         for job in jobs:
-            if await self.send_job_alert(job):
-                success_count += 1
+            for language in ('zh', 'en'):
+                messages.append({
+                    'key': f"alert:{job['id']}:{language}",
+                    'group': f"alert:{job['id']}",
+                    'job_ids': [job['id']],
+                    'language': language,
+                    'text': self._format_job_message(job, language=language),
+                    # Lets the alert be edited in place if the posting changes
+                    'posting_key': job.get('posting_key'),
+                })
+        return messages
+
+    def render_unmatched_summary_messages(self, jobs: List[Dict]) -> List[Dict]:
+        """Render the unmatched-jobs summary (CN + EN) as messages (see render_alert_messages)"""
+        if not jobs:
+            return []
+
+        job_ids = [job['id'] for job in jobs]
+        group = self._content_key("summary", ",".join(job_ids))
+        return [
+            {
+                'key': f"{group}:{language}",
+                'group': group,
+                'job_ids': job_ids,
+                'language': language,
+                'text': self._format_unmatched_summary(jobs, language=language),
+            }
+            for language in ('zh', 'en')
+        ]
+
+    async def deliver(self, messages: List[Dict]) -> List[Optional[int]]:
+        """
+        Send rendered messages through the rate-limited dispatcher
 
-        logger.info(f"Sent {success_count}/{len(jobs)} job alerts")
-        return success_count
+        Messages in the same group are sent in order; groups are sent
+        concurrently.
 
-    async def send_unmatched_summary(self, jobs: List[Dict]) -> bool:
+        Args:
+            messages: Messages from render_alert_messages / render_unmatched_summary_messages
+
+        Returns:
+            Telegram message_id for each input message, or None if it was not delivered
         """
-        Send summaries of newly posted jobs that don't match criteria (Chinese + English)
+        group_indices: Dict[str, List[int]] = {}
+        for index, message in enumerate(messages):
+            group_indices.setdefault(message['group'], []).append(index)
+
+        indices = list(group_indices.values())
+        groups = [[self._message_payload(messages[i]['text']) for i in group] for group in indices]
+
+        metrics.inc('telegram_messages_rendered_total', len(messages))
+        with metrics.span('telegram_deliver_seconds'):
+            async with client_or_temporary(self.client) as client:
+                results = await self.dispatcher.dispatch(client, self.chat_id, groups)
+
+        message_ids: List[Optional[int]] = [None] * len(messages)
+        for group, ids in zip(indices, results):
+            for index, message_id in zip(group, ids):
+                message_ids[index] = message_id
+        return message_ids
+
+    def render_updated_message(self, job: Dict, language: str) -> str:
+        """Render an alert for a revised posting, marked as updated"""
+        marker = "<i>✏️ 已更新</i>" if language == 'zh' else "<i>✏️ Updated</i>"
+        return f"{self._format_job_message(job, language=language)}\n{marker}"
+
+    @staticmethod
+    def render_closed_message(text: str, language: str) -> str:
+        """Prefix a previously sent alert with a 'closed' marker"""
+        marker = "<b>🔒 此職缺已關閉</b>" if language == 'zh' else "<b>🔒 This posting has closed</b>"
+        return f"{marker}\n\n{text}"
+
+    async def edit_message(self, message_id: int, text: str) -> bool:
+        """
+        Replace the text of a previously sent message (editMessageText)
 
         Args:
-            jobs: List of unmatched job postings
+            message_id: Telegram message_id returned when the message was sent
+            text: New HTML message text
 
         Returns:
-            True if both messages sent successfully
+            True if the message now shows `text`
         """
-        if not jobs:
+        payload = self._message_payload(text)
+        payload['message_id'] = message_id
+
+        try:
+            async with client_or_temporary(self.client) as client:
+                await self.dispatcher.call(client, 'editMessageText', self.chat_id, json=payload)
             return True
+        except httpx.HTTPStatusError as e:
+            # Telegram rejects edits that don't change anything; the message is already up to date
+            if 'message is not modified' in e.response.text:
+                return True
+            logger.error(f"Failed to edit Telegram message {message_id}: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to edit Telegram message {message_id}: {e}")
+            return False
 
-        message_cn = self._format_unmatched_summary(jobs, language='zh')
-        message_en = self._format_unmatched_summary(jobs, language='en')
+    @staticmethod
+    def delivered_job_ids(messages: List[Dict], message_ids: List[Optional[int]]) -> set:
+        """Return IDs of jobs whose messages were all delivered"""
+        job_ids = set()
+        failed = set()
+        for message, message_id in zip(messages, message_ids):
+            job_ids.update(message['job_ids'])
+            if message_id is None:
+                failed.update(message['job_ids'])
+        return job_ids - failed
+
+    async def send_text(self, text: str) -> bool:
+        """
+        Send a plain HTML message (e.g. status or error notices)
 
+        Returns:
+            True if the message was sent successfully
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                # Send Chinese summary
-                response_cn = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": message_cn,
-                        "parse_mode": "HTML",
-                        "disable_web_page_preview": True
-                    },
-                    timeout=10
-                )
-                response_cn.raise_for_status()
-
-                # Send English summary
-                response_en = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": message_en,
-                        "parse_mode": "HTML",
-                        "disable_web_page_preview": True
-                    },
-                    timeout=10
-                )
-                response_en.raise_for_status()
-
-                logger.info(f"Unmatched jobs summaries sent (CN + EN): {len(jobs)} jobs")
-                return True
+            async with client_or_temporary(self.client) as client:
+                await self._send_message(client, text)
+            return True
         except Exception as e:
-            logger.error(f"Failed to send unmatched summary: {e}")
+            logger.error(f"Failed to send Telegram message: {e}")
             return False
 
+    async def send_batch_alerts(self, jobs: List[Dict]) -> int:
+        """
+        Send alerts for multiple jobs
+
+        Args:
+            jobs: List of job postings
+
+        Returns:
+            Number of successfully sent messages
+        """
+        messages = self.render_alert_messages(jobs)
+        message_ids = await self.deliver(messages)
+        delivered = self.delivered_job_ids(messages, message_ids)
+
+        for job in jobs:
+            if job['id'] in delivered:
+                logger.info(f"Telegram messages sent for: {job['title']}")
+
+        success_count = len(delivered)
+        stats = self.dispatcher.get_stats()
+        logger.info(
+            f"Sent {success_count}/{len(jobs)} job alerts in {len(messages)} messages "
+            f"(messages sent: {stats['sent']}, retried: {stats['retried']}, failed: {stats['failed']})"
+        )
+        return success_count
+
     def _format_unmatched_summary(self, jobs: List[Dict], language: str = 'zh') -> str:
         """Format unmatched jobs into a brief summary message (pure Chinese or pure English)
 
@@ -278,125 +540,86 @@ class TelegramNotifier:
 
         return message
 
-    def _format_debug_job_message(self, job: Dict) -> str:
-        """Format job data with ALL extracted fields for debugging in test mode"""
-        title = job.get('title', 'Unknown')
-        title_en = job.get('title_en', '')
-        location = job.get('location', 'N/A')
-        location_en = job.get('location_en', '')
-        organization = job.get('organization', 'N/A')
-        organization_en = job.get('organization_en', '')
-        start_date = job.get('start_date', 'N/A')
-        employment_type = job.get('employment_type', 'N/A')
-        employment_type_en = job.get('employment_type_en', '')
-        salary = job.get('salary', 'N/A')
-        salary_en = job.get('salary_en', '')
-        url = job.get('url', '')
-        job_id = job.get('id', 'N/A')
-        page_number = job.get('page_number', '?')
-        listing_position = job.get('listing_position', '?')
-        full_text = job.get('full_text', '')[:200]  # First 200 chars of full text
-
-        # Build comprehensive debug message
-        message = f"""<b>🔍 DEBUG: Job Listing</b>
-
-<b>📍 Page {page_number}, Position #{listing_position}</b>
-
-<b>職位 | Position:</b>
-{title}
-{title_en if title_en else ''}
+    async def send_debug_report(self, jobs: List[Dict], report_format: str = 'html') -> bool:
+        """
+        Send all debug records as one compressed document (a single sendDocument call)
 
-<b>機構 | Organization:</b>
-{organization}
-{organization_en if organization_en else ''}
+        The document caption carries a short summary so the chat is not
+        flooded with one message per job.
 
-<b>地點 | Location:</b>
-{location}
-{location_en if location_en else ''}
+        Args:
+            jobs: List of job postings
+            report_format: 'json', 'csv' or 'html'
 
-<b>開始日期 | Start Date:</b> {start_date}
+        Returns:
+            True if the document was uploaded successfully
+        """
+        filename, content, mime_type = render_debug_report(jobs, report_format)
 
-<b>職位類型 | Employment Type:</b>
-{employment_type}
-{employment_type_en if employment_type_en else ''}
+        pages = {job.get('page_number') for job in jobs}
+        missing_location = sum(1 for job in jobs if not job.get('location'))
+        caption = (
+            f"<b>🔍 DEBUG report</b>\n"
+            f"{len(jobs)} jobs across {len(pages)} pages\n"
+            f"Missing location: {missing_location}"
+        )
 
-<b>薪資 | Salary:</b>
-{salary}
-{salary_en if salary_en else ''}
+        try:
+            async with client_or_temporary(self.client) as client:
+                await self.dispatcher.call(
+                    client,
+                    'sendDocument',
+                    self.chat_id,
+                    data={"chat_id": self.chat_id, "caption": caption, "parse_mode": "HTML"},
+                    files={"document": (filename, content, mime_type)}
+                )
+            logger.info(f"Sent debug report {filename} ({len(content)} bytes, {len(jobs)} jobs)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send debug report: {e}")
+            return False
 
-<b>Full Text (first 200 chars):</b>
-<code>{full_text}</code>
+    def get_stats(self) -> Dict:
+        """Return delivery statistics (sent / retried / failed message counts)"""
+        return self.dispatcher.get_stats()
 
-<b>Job ID:</b> <code>{job_id}</code>
-"""
-        return message
+    def _token_fingerprint(self) -> str:
+        """Identify the bot token in the probe cache without storing it"""
+        return hashlib.sha256(self.bot_token.encode('utf-8')).hexdigest()[:16]
 
-    async def send_debug_batch_alerts(self, jobs: List[Dict]) -> int:
+    async def probe_connection(self, ttl: float = PROBE_TTL) -> bool:
         """
-        Send debug alerts for multiple jobs (splits long messages if needed)
+        Check that the bot token is valid via getMe, reusing a recent successful result
+
+        Doesn't block the event loop, so it can run while the browser launches.
 
         Args:
-            jobs: List of job postings
+            ttl: Seconds a successful probe stays valid (0 always calls getMe)
 
         Returns:
-            Number of successfully sent messages
+            True if the bot is reachable (or was within the TTL)
         """
-        success_count = 0
-
-        for idx, job in enumerate(jobs, 1):
-            message = self._format_debug_job_message(job)
-
-            # Telegram has a 4096 character limit, split if needed
-            if len(message) > 4000:
-                # Split into chunks
-                chunks = [message[i:i+4000] for i in range(0, len(message), 4000)]
-                for chunk in chunks:
-                    try:
-                        async with httpx.AsyncClient() as client:
-                            response = await client.post(
-                                f"{self.base_url}/sendMessage",
-                                json={
-                                    "chat_id": self.chat_id,
-                                    "text": chunk,
-                                    "parse_mode": "HTML",
-                                    "disable_web_page_preview": True
-                                },
-                                timeout=10
-                            )
-                            response.raise_for_status()
-                            success_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to send Telegram debug message (chunk): {e}")
-            else:
-                try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.post(
-                            f"{self.base_url}/sendMessage",
-                            json={
-                                "chat_id": self.chat_id,
-                                "text": message,
-                                "parse_mode": "HTML",
-                                "disable_web_page_preview": True
-                            },
-                            timeout=10
-                        )
-                        response.raise_for_status()
-                        logger.info(f"Sent debug message for job {idx}/{len(jobs)}: {job.get('title', 'Unknown')}")
-                        success_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to send Telegram debug message: {e}")
-
-        logger.info(f"Sent {success_count}/{len(jobs)} debug alerts")
-        return success_count
+        fingerprint = self._token_fingerprint()
+        try:
+            with open(self.PROBE_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            if cached.get('token') == fingerprint and time.time() - cached.get('checked_at', 0) < ttl:
+                logger.info("Telegram bot connection verified (cached)")
+                return True
+        except (OSError, ValueError):
+            pass
 
-    def test_connection(self) -> bool:
-        """Test if the Telegram bot token is valid"""
         try:
-            import httpx
-            response = httpx.get(f"{self.base_url}/getMe", timeout=10)
-            response.raise_for_status()
-            logger.info("Telegram bot connection successful")
-            return True
+            async with client_or_temporary(self.client) as client:
+                response = await client.get(f"{self.base_url}/getMe")
+                response.raise_for_status()
         except Exception as e:
             logger.error(f"Failed to connect to Telegram: {e}")
             return False
+
+        logger.info("Telegram bot connection successful")
+        try:
+            await write_json_async(self.PROBE_CACHE_FILE, {'token': fingerprint, 'checked_at': time.time()})
+        except Exception as e:
+            logger.debug(f"Failed to cache Telegram probe: {e}")
+        return True
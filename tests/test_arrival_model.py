@@ -0,0 +1,21 @@
+"""Persistence of ArrivalRateModel"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from arrival_model import ArrivalRateModel
+
+
+def test_recorded_checks_are_saved_off_the_loop(tmp_path):
+    path = tmp_path / 'arrival_model.json'
+    model = ArrivalRateModel(path=path)
+    start = datetime(2026, 3, 2, 9, 0)
+    model.record_check(start, start + timedelta(minutes=30), new_postings=2)
+    assert not path.exists()
+
+    asyncio.run(model.save_async())
+
+    loaded = ArrivalRateModel(path=path)
+    assert loaded.counts == model.counts
+    assert loaded.weeks == model.weeks
+    assert loaded.updated == start + timedelta(minutes=30)
@@ -0,0 +1,47 @@
+"""Crawl checkpoints are only used when the scraper is given a checkpoint file"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from scraper import JobScraper
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    path = tmp_path / 'crawl_checkpoint.json'
+    path.write_text(json.dumps({
+        'listing': JobScraper.URL, 'started_at': time.time(), 'updated_at': time.time(),
+        'pages_done': 2, 'next_page': 3, 'next_url': f"{JobScraper.URL}&page=3", 'jobs': [],
+    }), encoding='utf-8')
+    return path
+
+
+def _scraper(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(JobScraper, 'SEEN_JOBS_FILE', tmp_path / 'seen_jobs.json')
+    monkeypatch.delenv('JOB_SITE_URL', raising=False)
+    monkeypatch.delenv('HOME_LOCATION', raising=False)
+    return JobScraper(debug=False, parse_executor='inline', **kwargs)
+
+
+def test_checkpoints_are_off_by_default(tmp_path, monkeypatch, checkpoint_path):
+    monkeypatch.setattr(JobScraper, 'CHECKPOINT_FILE', checkpoint_path)
+    scraper = _scraper(tmp_path, monkeypatch)
+
+    assert scraper._load_checkpoint() is None
+    scraper._clear_checkpoint()
+    assert checkpoint_path.exists()
+
+
+def test_checkpoint_file_is_loaded_and_cleared(tmp_path, monkeypatch, checkpoint_path):
+    scraper = _scraper(tmp_path, monkeypatch, checkpoint_file=checkpoint_path)
+
+    assert scraper._load_checkpoint()['next_page'] == 3
+    scraper._clear_checkpoint()
+    assert not checkpoint_path.exists()
+
+    asyncio.run(scraper._save_checkpoint({'listing': JobScraper.URL, 'next_url': None}))
+    # Saved, but a checkpoint without a next page can't be resumed
+    assert checkpoint_path.exists() and scraper._load_checkpoint() is None
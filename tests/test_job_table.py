@@ -0,0 +1,39 @@
+"""Vectorized history criteria in JobTable"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from conftest import ROOT
+from job_table import JobTable
+from scraper import JobScraper, parse_page_html
+
+
+@pytest.fixture
+def jobs():
+    return [job for path in sorted(ROOT.glob('page_*_raw.html'))
+            for job in parse_page_html(path.read_text(encoding='utf-8'), int(path.name.split('_')[1]))]
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(JobScraper, 'SEEN_JOBS_FILE', tmp_path / 'seen_jobs.json')
+    monkeypatch.delenv('GAZETTEER_EXTRA_FILE', raising=False)
+    monkeypatch.setenv('HOME_LOCATION', '臺北市大安區')
+    monkeypatch.setenv('MAX_DISTANCE_KM', '15')
+    scraper = JobScraper(debug=False, parse_executor='inline')
+    scraper.TARGET_START_DATE_MIN = date(2025, 11, 1)
+    scraper.TARGET_START_DATE_MAX = date(2026, 1, 31)
+    yield scraper
+    scraper.close()
+
+
+def test_criteria_mask_matches_filter_jobs_with_distance_filter(jobs, scraper):
+    table = JobTable.from_jobs(jobs)
+    mask = table.criteria_mask(scraper.TARGET_LOCATIONS, scraper.EXCLUDE_KEYWORDS,
+                               scraper.TARGET_START_DATE_MIN, scraper.TARGET_START_DATE_MAX,
+                               distance_filter=scraper.distance_filter)
+
+    assert {str(job_id) for job_id in table.ids[mask]} == {job['id'] for job in scraper.filter_jobs(jobs)}
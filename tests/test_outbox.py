@@ -0,0 +1,73 @@
+"""Delivery status bookkeeping in NotificationOutbox"""
+
+import asyncio
+
+import pytest
+
+from outbox import NotificationOutbox
+
+
+class StubNotifier:
+    """Acknowledges messages with increasing message_ids, or fails every one"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+        self._next_id = 100
+
+    async def deliver(self, messages):
+        self.sent.extend(messages)
+        if self.fail:
+            return [None] * len(messages)
+        ids = list(range(self._next_id, self._next_id + len(messages)))
+        self._next_id += len(messages)
+        return ids
+
+
+def _alert(job_id: str, language: str = 'zh'):
+    return {
+        'key': f"alert:{job_id}:{language}",
+        'group': f"alert:{job_id}",
+        'job_ids': [job_id],
+        'language': language,
+        'text': f"job {job_id}",
+        'posting_key': f"posting-{job_id}",
+    }
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = NotificationOutbox(tmp_path / 'outbox.db')
+    yield outbox
+    outbox.close()
+
+
+def test_delivered_jobs_are_returned_and_recorded(outbox):
+    outbox.enqueue([_alert('a'), _alert('a', 'en'), _alert('b')])
+    delivered = asyncio.run(outbox.drain(StubNotifier()))
+
+    assert delivered == {'a', 'b'}
+    assert outbox.undelivered_job_ids() == set()
+    assert set(outbox.sent_alerts()) == {'a', 'b'}
+
+
+def test_enqueue_is_idempotent(outbox):
+    assert outbox.enqueue([_alert('a')]) == 1
+    assert outbox.enqueue([_alert('a')]) == 0
+
+
+def test_failed_messages_stay_pending_until_max_attempts(outbox, monkeypatch):
+    monkeypatch.setattr(NotificationOutbox, 'MAX_ATTEMPTS', 3)
+    outbox.enqueue([_alert('a')])
+    notifier = StubNotifier(fail=True)
+
+    for _ in range(2):
+        assert asyncio.run(outbox.drain(notifier)) == set()
+        assert outbox.undelivered_job_ids() == {'a'}
+
+    # The last attempt gives up: the message is final and no longer blocks the job
+    assert asyncio.run(outbox.drain(notifier)) == set()
+    assert outbox.undelivered_job_ids() == set()
+    assert outbox.failed_job_ids() == {'a'}
+    assert outbox.pending() == []
+    assert len(notifier.sent) == 3
@@ -0,0 +1,114 @@
+"""Parse the recorded listing pages and run the parsed jobs through the filters"""
+
+import json
+from datetime import date
+
+import pytest
+
+from conftest import ROOT
+from job import Job
+from scraper import JobScraper, parse_page_html, parse_page_records
+
+RECORDED_PAGES = sorted(ROOT.glob('page_*_raw.html'))
+
+
+def _page_number(path) -> int:
+    return int(path.name.split('_')[1])
+
+
+@pytest.fixture(scope='module')
+def jobs():
+    parsed = []
+    for path in RECORDED_PAGES:
+        parsed.extend(parse_page_html(path.read_text(encoding='utf-8'), _page_number(path)))
+    return parsed
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(JobScraper, 'SEEN_JOBS_FILE', tmp_path / 'seen_jobs.json')
+    for name in ('HOME_LOCATION', 'JOB_SITE_URL'):
+        monkeypatch.delenv(name, raising=False)
+    scraper = JobScraper(debug=False, parse_executor='inline')
+    yield scraper
+    scraper.close()
+
+
+@pytest.fixture
+def permissive(scraper):
+    """Scraper whose location and date criteria accept every parsed job"""
+    scraper.TARGET_LOCATIONS = {''}
+    scraper.TARGET_START_DATE_MIN = date(2000, 1, 1)
+    scraper.TARGET_START_DATE_MAX = date(2100, 1, 1)
+    return scraper
+
+
+def _by_title(jobs, title):
+    return next(job for job in jobs if job['title'] == title)
+
+
+def test_recorded_pages_parse_ten_jobs_each(jobs):
+    assert RECORDED_PAGES
+    assert len(jobs) == 10 * len(RECORDED_PAGES)
+    for job in jobs:
+        assert job['title'] and job['id'] and job['posting_key']
+        assert 1 <= job['listing_position'] <= 10
+
+
+def test_job_text_is_the_whole_item(jobs):
+    job = _by_title(jobs, '國仁醫院(小兒團隊)')
+    # The full item text, not a single word of it
+    assert len(job.text.split()) > 10
+    assert job['title'] in job.text
+    assert job['location'] in job.text
+    assert job['full_text'] == job.text.lower()
+
+
+def test_process_worker_records_rebuild_the_same_jobs():
+    path = RECORDED_PAGES[0]
+    html = path.read_text(encoding='utf-8')
+    rebuilt = [Job.from_dict(record) for record in parse_page_records(html, _page_number(path))]
+    assert [job.to_dict() for job in rebuilt] == [job.to_dict() for job in parse_page_html(html, _page_number(path))]
+    assert [job.text for job in rebuilt] == [job.text for job in parse_page_html(html, _page_number(path))]
+
+
+def test_job_dict_round_trip_keeps_pay(jobs):
+    job = next(job for job in jobs if job.pay.known)
+    restored = Job.from_dict(json.loads(json.dumps({**job.to_dict(), 'text': job.text}, ensure_ascii=False)))
+    assert restored.pay == job.pay
+    assert restored.full_text is restored.full_text
+
+
+def test_pediatric_postings_are_excluded(jobs, permissive):
+    pediatric = {job['id'] for job in jobs if any(k in job['full_text'] for k in JobScraper.EXCLUDE_KEYWORDS)}
+    assert _by_title(jobs, '國仁醫院(小兒團隊)')['id'] in pediatric
+
+    matched = {job['id'] for job in permissive.filter_jobs(jobs)}
+    unmatched = {job['id'] for job in permissive.get_new_unmatched_jobs(jobs)}
+    assert not matched & pediatric
+    assert pediatric <= unmatched
+    dated = {job['id'] for job in jobs if not job['start_date'].startswith('0000')}
+    assert matched == dated - pediatric
+
+
+def test_location_and_start_date_criteria(jobs, scraper):
+    scraper.TARGET_START_DATE_MIN = date(2025, 11, 1)
+    scraper.TARGET_START_DATE_MAX = date(2026, 1, 31)
+    matched = scraper.filter_jobs(jobs)
+
+    assert matched
+    for job in matched:
+        assert any(location in job['location'] for location in JobScraper.TARGET_LOCATIONS)
+    titles = {job['title'] for job in matched}
+    assert '新光醫院醫療財團法人新光吳火獅紀念醫院' in titles  # 台北市士林區
+    assert '屏東榮民總醫院龍泉分院' not in titles  # 屏東縣
+
+    # Every job is either a match or a new non-match
+    unmatched = scraper.get_new_unmatched_jobs(jobs)
+    assert len(matched) + len(unmatched) == len(jobs)
+
+
+def test_seen_jobs_are_skipped(jobs, permissive):
+    permissive.save_seen_jobs(jobs[:5])
+    assert not {job['id'] for job in jobs[:5]} & {job['id'] for job in permissive.filter_jobs(jobs)}
+    assert not {job['id'] for job in jobs[:5]} & {job['id'] for job in permissive.get_new_unmatched_jobs(jobs)}
@@ -0,0 +1,129 @@
+"""Alerts, revisions and closures across JobPipeline runs"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from job import Job
+from outbox import NotificationOutbox
+from pipeline import JobPipeline
+from scraper import JobScraper
+from telegram_notifier import TelegramNotifier
+
+
+class ListedScraper(JobScraper):
+    """Scraper whose crawl yields the jobs currently in `listing` as one page"""
+
+    listing = []
+
+    async def iter_page_jobs(self):
+        self.last_crawl_complete = True
+        self.last_crawl_duplicates = 0
+        yield list(self.listing)
+
+
+class RecordingNotifier(TelegramNotifier):
+    """Acknowledges every message and edit without calling Telegram"""
+
+    def __init__(self):
+        super().__init__('123456:token', '-100')
+        self.sent = []
+        self.edited = []
+        self._next_id = 100
+
+    async def deliver(self, messages):
+        self.sent.extend(messages)
+        ids = list(range(self._next_id, self._next_id + len(messages)))
+        self._next_id += len(messages)
+        return ids
+
+    async def edit_message(self, message_id, text):
+        self.edited.append((message_id, text))
+        return True
+
+
+class NoTranslator:
+    async def translate_jobs(self, jobs):
+        return jobs
+
+
+def _job(job_id: str, salary: str = '45,000') -> Job:
+    # Same organization, title and place: both postings share one posting_key
+    text = f"職能治療師 龜山康澤復健科診所 桃園市龜山區 2026-03-01 薪資待遇 {salary} {job_id}"
+    return Job(title='職能治療師', text=text, id=job_id, posting_key='shared-key', location='桃園市龜山區',
+               organization='龜山康澤復健科診所', start_date='2026-03-01', salary=salary)
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(JobScraper, 'SEEN_JOBS_FILE', tmp_path / 'seen_jobs.json')
+    for name in ('HOME_LOCATION', 'JOB_SITE_URL'):
+        monkeypatch.delenv(name, raising=False)
+    scraper = ListedScraper(debug=False, parse_executor='inline')
+    scraper.TARGET_START_DATE_MIN = date(2026, 1, 1)
+    scraper.TARGET_START_DATE_MAX = date(2026, 12, 31)
+    yield scraper
+    scraper.close()
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = NotificationOutbox(tmp_path / 'outbox.db')
+    yield outbox
+    outbox.close()
+
+
+def _run(scraper, outbox, listing):
+    scraper.listing = listing
+    notifier = RecordingNotifier()
+    stats = asyncio.run(JobPipeline(scraper, notifier, outbox, NoTranslator()).run())
+    return stats, notifier
+
+
+def test_live_postings_sharing_a_key_get_their_own_alerts(scraper, outbox):
+    _run(scraper, outbox, [_job('a')])
+
+    stats, notifier = _run(scraper, outbox, [_job('a'), _job('b', salary='50,000')])
+
+    assert stats['matched'] == 1 and stats['updated'] == 0 and stats['closed'] == 0
+    assert not notifier.edited
+    assert {message['job_ids'][0] for message in notifier.sent} == {'b'}
+    # The first posting's alert is still tracked next to the new one
+    assert set(outbox.sent_alerts()) == {'a', 'b'}
+
+
+def test_revised_posting_edits_its_alert(scraper, outbox):
+    _run(scraper, outbox, [_job('a')])
+
+    stats, notifier = _run(scraper, outbox, [_job('a2', salary='50,000')])
+
+    assert stats['updated'] == 1 and stats['matched'] == 0 and stats['closed'] == 0
+    assert not notifier.sent
+    assert sorted(message_id for message_id, _ in notifier.edited) == [100, 101]
+    assert set(outbox.sent_alerts()) == {'a2'}
+    assert 'a2' in scraper.seen_jobs
+
+
+def test_ambiguous_revision_sends_new_alerts(scraper, outbox):
+    _run(scraper, outbox, [_job('a')])
+
+    stats, notifier = _run(scraper, outbox, [_job('b'), _job('c', salary='50,000')])
+
+    # Two new postings could each be the revision: alert both, close the old one
+    assert stats['matched'] == 2 and stats['updated'] == 0 and stats['closed'] == 1
+    assert {message['job_ids'][0] for message in notifier.sent} == {'b', 'c'}
+    assert set(outbox.sent_alerts()) == {'b', 'c'}
+
+
+def test_empty_complete_crawl_leaves_alerts_open(scraper, outbox):
+    _run(scraper, outbox, [_job('a'), _job('b', salary='50,000')])
+    before = outbox.sent_alerts()
+
+    # E.g. a maintenance page: no postings and no next arrow still ends the crawl normally
+    stats, notifier = _run(scraper, outbox, [])
+
+    assert stats['closed'] == 0
+    assert not notifier.edited
+    assert outbox.sent_alerts() == before
+
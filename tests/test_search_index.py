@@ -0,0 +1,27 @@
+"""Indexing crawled postings in SearchIndex"""
+
+import pytest
+
+from conftest import ROOT
+from scraper import parse_page_html
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(tmp_path / 'search.db')
+    yield index
+    index.close()
+
+
+def test_job_records_are_indexed_with_their_item_text(index):
+    jobs = parse_page_html((ROOT / 'page_1_raw.html').read_text(encoding='utf-8'), 1)
+
+    assert index.add_jobs(jobs) == len(jobs)
+    assert index.add_jobs(jobs) == 0
+
+    for job in jobs:
+        stored = index.conn.execute("SELECT text FROM postings WHERE id = ?", (job['id'],)).fetchone()[0]
+        # The original item text, not the lowercased full_text
+        assert stored == job.text
+    assert index.search(jobs[0]['title'])['total'] >= 1
@@ -0,0 +1,134 @@
+"""Message splitting and packing in TelegramNotifier, rate limits and retries in TelegramDispatcher"""
+
+import asyncio
+import re
+import time
+
+import httpx
+import pytest
+
+from telegram_dispatcher import TelegramDispatcher
+from telegram_notifier import TelegramNotifier
+
+LIMIT = TelegramNotifier.MAX_MESSAGE_LENGTH
+
+
+def _tags(text, pattern):
+    return sorted(re.findall(pattern, text))
+
+
+def _visible(text):
+    return re.sub(r'<[^>]*>', '', text)
+
+
+@pytest.fixture
+def notifier():
+    return TelegramNotifier('123:test', '42', pack_messages=True)
+
+
+def test_long_line_is_cut_between_tags_and_entities(notifier):
+    line = "<b>職缺</b> <code>" + "職能治療 &amp; 復健 " * 600 + "</code> <i>end</i>"
+    chunks = notifier._split_message(line)
+
+    assert len(chunks) > 1
+    assert _visible("".join(chunks)) == _visible(line)
+    for chunk in chunks:
+        assert len(chunk) <= LIMIT
+        # Every chunk closes the tags it opens
+        assert _tags(chunk, r'<(\w+)') == _tags(chunk, r'</(\w+)')
+        assert not re.search(r'&[#\w]*$', _visible(chunk))
+    assert chunks[1].startswith("<code>")
+
+
+def test_short_lines_split_only_at_line_breaks(notifier):
+    lines = [f"<b>{number}</b> " + "x" * 90 for number in range(100)]
+    chunks = notifier._split_message("\n".join(lines))
+
+    assert all(len(chunk) <= LIMIT for chunk in chunks)
+    assert "\n".join(chunks).split("\n") == lines
+
+
+def test_packed_digests_fill_messages(notifier):
+    blocks = [f"<b>Job {number}</b>\n" + "詳細內容 " * 40 for number in range(60)]
+    packed = notifier._pack_blocks(blocks)
+
+    assert all(len(text) <= LIMIT for text, _ in packed)
+    assert [index for _, owners in packed for index in owners] == list(range(60))
+    # Every digest but the last is nearly full
+    assert all(len(text) > LIMIT - len(blocks[0]) - len(notifier.PACK_SEPARATOR) for text, _ in packed[:-1])
+
+
+class StubBotApi:
+    """Mocked Bot API answering sendMessage with the queued responses, then with successes"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []  # (monotonic time, text)
+        self._next_id = 1
+
+    def __call__(self, request):
+        self.requests.append((time.monotonic(), request.read().decode()))
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self._next_id += 1
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': self._next_id}})
+
+
+def _dispatch(api, groups, **options):
+    dispatcher = TelegramDispatcher('https://api.telegram.test/bot123:test', **options)
+    dispatcher.BACKOFF_BASE = 0.01
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api)) as client:
+            return await dispatcher.dispatch(client, '42', groups)
+
+    return asyncio.run(run()), dispatcher
+
+
+def _rate_limited(retry_after):
+    return httpx.Response(429, json={'ok': False, 'error_code': 429,
+                                     'parameters': {'retry_after': retry_after}})
+
+
+def test_429_is_retried_after_retry_after_and_pauses_the_chat():
+    api = StubBotApi(_rate_limited(0.3))
+    groups = [[{'text': f'job {number}'}] for number in range(3)]
+    results, dispatcher = _dispatch(api, groups, workers=3, per_chat_burst=10, per_chat_rate=100)
+
+    assert all(ids[0] for ids in results)
+    assert dispatcher.get_stats()['rate_limited'] == 1
+    assert dispatcher.get_stats()['sent'] == 3
+    # Every request after the 429 waited out retry_after, not just the retried one
+    limited_at = api.requests[0][0]
+    assert all(sent_at - limited_at >= 0.29 for sent_at, _ in api.requests[1:])
+
+
+def test_429_after_max_retries_fails_the_group_in_order():
+    api = StubBotApi(*[_rate_limited(0)] * 3)
+    results, dispatcher = _dispatch(api, [[{'text': 'zh'}, {'text': 'en'}]], max_retries=2, per_chat_rate=100)
+
+    assert results == [[None, None]]
+    # The English message is not sent once the Chinese one has failed
+    assert len(api.requests) == 3
+    assert dispatcher.get_stats()['failed'] == 1
+
+
+def test_response_without_message_id_is_not_delivered():
+    api = StubBotApi(httpx.Response(200, json={'ok': True, 'result': {}}))
+    results, _ = _dispatch(api, [[{'text': 'job'}]])
+
+    assert results == [[None]]
+
+
+def test_only_connect_errors_are_retried():
+    connect = StubBotApi(httpx.ConnectError('refused'))
+    results, _ = _dispatch(connect, [[{'text': 'job'}]])
+    assert results[0][0] and len(connect.requests) == 2
+
+    # A read error may come after Telegram accepted the message: resending could duplicate it
+    read = StubBotApi(httpx.ReadError('connection reset'))
+    results, _ = _dispatch(read, [[{'text': 'job'}]])
+    assert results == [[None]] and len(read.requests) == 1
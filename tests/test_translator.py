@@ -0,0 +1,41 @@
+"""Translation caching in JobTranslator"""
+
+import asyncio
+
+import httpx
+
+from translator import JobTranslator
+
+
+def _translator(responses):
+    """Translator whose API answers with the given (status, json) pairs in turn"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params['q'])
+        status, body = responses[min(len(calls), len(responses)) - 1]
+        return httpx.Response(status, json=body)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return JobTranslator(client=client, api_url='http://translate.test/translate_a/single'), calls
+
+
+def test_translations_are_cached():
+    translator, calls = _translator([(200, [[['Occupational therapist', '職能治療師']]])])
+
+    async def run():
+        return [await translator.translate_text('職能治療師') for _ in range(2)]
+
+    assert asyncio.run(run()) == ['Occupational therapist'] * 2
+    assert len(calls) == 1
+
+
+def test_failed_translations_are_not_cached():
+    translator, calls = _translator([(502, {}), (200, None), (200, [[['Occupational therapist', '職能治療師']]])])
+
+    async def run():
+        return [await translator.translate_text('職能治療師') for _ in range(4)]
+
+    # The original text stands in until a request succeeds, which is then cached
+    assert asyncio.run(run()) == ['職能治療師', '職能治療師', 'Occupational therapist', 'Occupational therapist']
+    assert len(calls) == 3
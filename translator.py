@@ -3,10 +3,15 @@ Translation module for job postings
 Uses Google Translate API to translate Chinese to English
 """
 
+import asyncio
 import logging
-from typing import Dict, Optional
+import os
+from typing import Dict, List, Optional
 import httpx
-from functools import lru_cache
+
+from http_client import client_or_temporary
+from metrics import metrics
+from job import Job
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +19,35 @@ logger = logging.getLogger(__name__)
 class JobTranslator:
     """Translates job postings to English"""
 
-    # Google Translate API endpoint (free, no key required for basic usage)
-    TRANSLATE_API = "https://translate.googleapis.com/translate_a/element.js"
+    # Google Translate API endpoint (free, no key required for basic usage);
+    # TRANSLATE_API_URL overrides it, e.g. for a local stub
+    TRANSLATE_API = "https://translate.google.com/translate_a/single"
+
+    # Upper bound on concurrent translation requests in translate_jobs()
+    DEFAULT_CONCURRENCY = 8
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, api_url: Optional[str] = None):
+        """
+        Initialize translator
 
-    def __init__(self):
-        """Initialize translator"""
+        Args:
+            client: Shared pooled HTTP client (see http_client.create_http_client).
+                    A temporary client is used per request if not provided.
+            api_url: translate_a/single endpoint (default: TRANSLATE_API_URL or TRANSLATE_API)
+        """
+        self.client = client
+        self.api_url = api_url or os.getenv('TRANSLATE_API_URL') or self.TRANSLATE_API
         self.cache = {}
+        # Side table of field value → English, shared by all translated Job records
+        self.translations: Dict[str, str] = {}
+        # In-flight translations keyed by normalized text (single-flight)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            'requests': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'api_calls': 0,
+        }
 
     async def translate_text(self, text: str, max_length: int = 500) -> str:
         """
@@ -35,82 +63,152 @@ class JobTranslator:
         if not text or len(text.strip()) == 0:
             return text
 
+        self.stats['requests'] += 1
+        metrics.inc('translation_requests_total')
+
         # Check cache first
-        cache_key = f"trans_{text[:50]}"
+        cache_key = f"trans_{text.strip()[:max_length]}"
         if cache_key in self.cache:
+            self.stats['cache_hits'] += 1
+            metrics.inc('translation_cache_hits_total')
             return self.cache[cache_key]
 
+        # Another caller is already translating this text - share its result
+        pending = self._inflight.get(cache_key)
+        if pending is not None:
+            self.stats['coalesced'] += 1
+            metrics.inc('translation_coalesced_total')
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
         try:
-            # Use simple free translation API
-            translated = await self._translate_with_google(text)
-            self.cache[cache_key] = translated
+            try:
+                # Use simple free translation API
+                self.stats['api_calls'] += 1
+                metrics.inc('translation_api_calls_total')
+                with metrics.span('translation_api_seconds'):
+                    translated = await self._translate_with_google(text)
+                self.cache[cache_key] = translated
+            except Exception as e:
+                # Not cached, so the text is translated again next time it comes up
+                logger.warning(f"Translation failed for '{text[:50]}': {e}")
+                translated = text
+            future.set_result(translated)
             return translated
-        except Exception as e:
-            logger.warning(f"Translation failed for '{text[:50]}': {e}")
-            return text
+        finally:
+            del self._inflight[cache_key]
+            if not future.done():
+                # Only reached if this caller was cancelled mid-request
+                future.cancel()
 
     async def _translate_with_google(self, text: str) -> str:
-        """Use Google Translate via simple HTTP request"""
-        try:
-            async with httpx.AsyncClient() as client:
-                # Using a simple translation endpoint
-                params = {
-                    'client': 'gtx',
-                    'sl': 'zh-CN',  # Source: Simplified Chinese (works for Traditional too)
-                    'tl': 'en',      # Target: English
-                    'dt': 't',       # Get translation
-                    'q': text[:500]  # Limit text length
+        """
+        Use Google Translate via simple HTTP request
+
+        Raises:
+            httpx.HTTPError: The request failed
+            ValueError: The response holds no translation
+        """
+        async with client_or_temporary(self.client) as client:
+            # Using a simple translation endpoint
+            params = {
+                'client': 'gtx',
+                'sl': 'zh-CN',  # Source: Simplified Chinese (works for Traditional too)
+                'tl': 'en',      # Target: English
+                'dt': 't',       # Get translation
+                'q': text[:500]  # Limit text length
+            }
+
+            response = await client.get(
+                self.api_url,
+                params=params,
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
+            )
+            response.raise_for_status()
 
-                response = await client.get(
-                    'https://translate.google.com/translate_a/single',
-                    params=params,
-                    timeout=10,
-                    headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                )
-                response.raise_for_status()
-
-                # Parse response - it returns JSON with translations
-                import json
-                data = response.json()
-
-                # Extract translated text from response
-                if data and len(data) > 0 and isinstance(data[0], list):
-                    translated_parts = []
-                    for item in data[0]:
-                        if isinstance(item, list) and len(item) > 0:
-                            translated_parts.append(item[0])
-                    return ''.join(translated_parts)
-
-                return text
-        except Exception as e:
-            logger.debug(f"Google Translate API failed: {e}")
-            # Fallback: return original text
-            return text
+            # Parse response - it returns JSON with translations
+            data = response.json()
+
+            # Extract translated text from response
+            if data and len(data) > 0 and isinstance(data[0], list):
+                translated_parts = []
+                for item in data[0]:
+                    if isinstance(item, list) and len(item) > 0:
+                        translated_parts.append(item[0])
+                return ''.join(translated_parts)
+
+            raise ValueError("Unexpected response from the translation API")
 
-    async def translate_job(self, job: Dict) -> Dict:
+    async def translate_job(self, job):
         """
         Translate all text fields in a job posting
 
         Args:
-            job: Job dictionary with Chinese text
+            job: Job record (or job dictionary) with Chinese text
 
         Returns:
-            Job dictionary with added English translations
+            The same Job, now resolving `<field>_en` through the shared
+            translations table (for a dict: a copy with `<field>_en` keys added)
         """
-        translated_job = job.copy()
-
         # Translate key fields
-        fields_to_translate = ['title', 'location', 'organization', 'employment_type', 'salary']
+        fields = [field for field in Job.TRANSLATED_FIELDS if field in job and job[field]]
 
-        for field in fields_to_translate:
-            if field in job and job[field]:
-                translated_job[f'{field}_en'] = await self.translate_text(job[field])
+        # Fields are independent, so translate them concurrently
+        results = await asyncio.gather(*(self.translate_text(job[field]) for field in fields))
 
+        if isinstance(job, Job):
+            for field, translated in zip(fields, results):
+                self.translations[job[field]] = translated
+            job.translations = self.translations
+            return job
+
+        translated_job = job.copy()
+        for field, translated in zip(fields, results):
+            translated_job[f'{field}_en'] = translated
         return translated_job
 
+    async def translate_jobs(self, jobs: List[Dict], concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict]:
+        """
+        Translate multiple job postings concurrently
+
+        Identical strings across jobs (e.g. the same location or employment
+        type) are translated once and shared by all concurrent callers.
+
+        Args:
+            jobs: List of job dictionaries with Chinese text
+            concurrency: Maximum number of jobs translated at the same time
+
+        Returns:
+            List of translated job dictionaries, in the same order as the input
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _translate(job: Dict) -> Dict:
+            async with semaphore:
+                return await self.translate_job(job)
+
+        return list(await asyncio.gather(*(_translate(job) for job in jobs)))
+
     def get_cached_size(self) -> int:
         """Return cache size"""
         return len(self.cache)
+
+    def get_stats(self) -> Dict:
+        """Return translation statistics for the current run, including the coalescing rate"""
+        stats = dict(self.stats)
+        misses = stats['requests'] - stats['cache_hits']
+        stats['coalescing_rate'] = stats['coalesced'] / misses if misses else 0.0
+        stats['cache_size'] = len(self.cache)
+        return stats
+
+    def log_stats(self):
+        """Log translation cache and in-flight coalescing statistics"""
+        stats = self.get_stats()
+        logger.info(
+            f"Translation stats: {stats['requests']} lookups, {stats['cache_hits']} cache hits, "
+            f"{stats['coalesced']} coalesced ({stats['coalescing_rate']:.0%} of misses), "
+            f"{stats['api_calls']} API calls"
+        )